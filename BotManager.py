@@ -1,21 +1,112 @@
+import asyncio
+import contextlib
 import logging
-import sys
 import time
+from collections import Counter
 from datetime import datetime
 
 from httpx import TimeoutException
 from selenium import webdriver
 from selenium.common.exceptions import (NoSuchElementException,
-                                        NoSuchWindowException)
+                                        NoSuchWindowException,
+                                        StaleElementReferenceException)
+from selenium.common.exceptions import \
+    TimeoutException as WebDriverTimeoutException
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 
-from discord_utils.send_webhook_message import (send_status_webhook_message,
-                                                send_styled_webhook_message)
+from discord_utils.alert_digest import add_digest_event
+from discord_utils.send_webhook_message import send_styled_webhook_message
 from global_state import SharedState
+from utils.budget_allocation import (DEFAULT_ALLOCATION_CONFIG, allocate_budget,
+                                     to_cents)
+from utils.decision_journal import journal
+from utils.item_filter import ItemFilter
+from utils.metrics import counter
+from utils.stage_timing import measure_stage
+from utils.tracing import start_trace
+
+SCANNED_ITEMS = counter("scanned_items_total", "Itemblocks scanned in the Loot.Farm page")
+PAGE_FILTERED_ITEMS = counter(
+    "page_filtered_items_total", "Scanned items above their buy threshold, filtered inside the page"
+)
+WITHDRAWN_ITEMS = counter("withdrawn_items_total", "Items selected for withdrawal")
+
+# Percorre os itemblocks novos dentro da página e devolve só os candidatos a compra.
+# arguments: first item id, ignored items, thresholds version, thresholds (null to keep the injected ones)
+SCAN_CANDIDATES_SCRIPT = """
+const [firstItem, ignoredItems, version, thresholds] = arguments;
+if (thresholds !== null) {
+    window.lfBuyThresholds = {version: version, map: thresholds};
+}
+const state = window.lfBuyThresholds;
+if (version > 0 && (!state || state.version !== version)) {
+    return {stale: true};
+}
+const map = version > 0 ? state.map : {};
+
+const blocks = document.querySelectorAll("#bots_inv > div[class='itemwrap'] > div[class='itemblock']");
+if (!blocks.length) {
+    return null;
+}
+const firstId = blocks[0].id;
+let firstPresent = false;
+for (const block of blocks) {
+    if (block.id === firstItem) {
+        firstPresent = true;
+        break;
+    }
+}
+const result = {
+    stale: false,
+    first_id: firstId,
+    have_new_items: !firstPresent || firstItem !== firstId,
+    scanned: 0,
+    ignored: 0,
+    filtered: 0,
+    filtered_items: [],
+    currency_prices: {},
+    candidates: [],
+};
+if (!result.have_new_items) {
+    return result;
+}
+
+const ignored = new Set(ignoredItems);
+const now = Date.now() / 1000;
+for (const block of blocks) {
+    const name = block.getAttribute("data-name");
+    const priceElement = block.querySelector(".it_price");
+    const price = priceElement ? priceElement.innerText.trim().split(" x")[0].replace(/^\\$/, "") : "";
+
+    if (ignored.has(name)) {
+        result.ignored += 1;
+        result.currency_prices[name] = price;
+        continue;
+    }
+    if (block.id === firstItem) {
+        break;
+    }
+    result.scanned += 1;
+
+    const attachments = Array.from(
+        block.querySelectorAll("div[class*='it_s'] img"), (img) => img.getAttribute("alt")
+    );
+    // itemKey: mesma chave de utils.decision_table.page_item_key
+    const itemKey = [name, ...attachments].join("|");
+    const threshold = map[itemKey];
+    if (threshold && threshold[1] >= now && !(parseFloat(price) < threshold[0])) {
+        result.filtered += 1;
+        result.filtered_items.push([block.id, name, price]);
+        continue;
+    }
+    result.candidates.push({id: block.id, name: name, price: price, attachments: attachments});
+}
+return result;
+"""
 
 
 class BotManager:
@@ -27,9 +118,12 @@ class BotManager:
         steam_password: str,
         request_login: bool,
         start_window_position: tuple = (0, 0),
+        withdraw_allocation: dict = None,
     ):
         self.bptf_token = bptf_token
-        self.ignored_items = ignored_items
+        # escolha dos itens do withdraw quando o saldo não dá para todos (utils.budget_allocation)
+        self.withdraw_allocation = {**DEFAULT_ALLOCATION_CONFIG, **(withdraw_allocation or {})}
+        self.item_filter = ItemFilter.from_config(ignored_items)
 
         self.steam_username = steam_username #TODO: encrypt username
         self.steam_password = steam_password #TODO: encrypt password
@@ -55,6 +149,11 @@ class BotManager:
         self.logger = logging.getLogger(__name__)
         self.first_item = None
         self.REQUEST_LOGIN = request_login
+        # chave do item na página -> [preço máximo de compra, expira em], injetado na página
+        self.buy_thresholds = {}
+        self.buy_thresholds_version = 0
+        # o scanner e o withdraw usam o mesmo navegador, só um comando por vez
+        self.browser_lock = asyncio.Lock()
 
     async def wait_until_main_page_load(self):
         self.wait.until(
@@ -62,11 +161,60 @@ class BotManager:
         )
         self.logger.debug("Main page loaded")
 
+    async def wait_until_visible(
+        self, locator: tuple, timeout: float, poll_interval: float = 1, lock: bool = True
+    ):
+        """
+        Waits for an element without blocking the event loop, the browser lock is only held
+        while checking, so the scanner keeps running during the wait.
+
+        Args:
+            lock (bool, optional): Take the browser lock on each check. Use False when the
+                caller already holds it (e.g. while another window is selected).
+
+        Raises:
+            WebDriverTimeoutException: If the element is not visible after timeout seconds.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            async with self.browser_lock if lock else contextlib.nullcontext():
+                elements = self.driver.find_elements(*locator)
+                if elements and elements[0].is_displayed():
+                    return elements[0]
+            if time.monotonic() >= deadline:
+                raise WebDriverTimeoutException(f"{locator} not visible after {timeout}s")
+            await asyncio.sleep(poll_interval)
+
     def refresh_inventory(self):
         self.logger.debug("Refreshing inventory")
         # use script to refresh inventory
         self.driver.execute_script("document.getElementById('UpdateBotInv').click()")
 
+    async def refresh_inventory_and_wait(self, timeout: float = 3, poll_interval: float = 0.1) -> bool:
+        """
+        Refreshes the bot inventory and waits, without blocking the event loop, until the
+        items shown before the refresh are replaced, so the next scan reads the new page.
+
+        Returns:
+            bool: False if the old items were still shown after timeout seconds.
+        """
+        async with self.browser_lock:
+            old_items = self.driver.find_elements(By.CSS_SELECTOR, "#bots_inv .itemwrap")[:1]
+            self.refresh_inventory()
+        if not old_items:
+            return True
+
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(poll_interval)
+            async with self.browser_lock:
+                try:
+                    old_items[0].is_displayed()
+                except StaleElementReferenceException:
+                    return True
+        self.logger.debug("Bot inventory not rendered again after the refresh")
+        return False
+
     def change_sorting_via_script(self, sort_number):
         self.driver.execute_script(
             f"document.querySelector('#sortULbot').children[{sort_number}].click()"
@@ -141,11 +289,12 @@ class BotManager:
             self.logger.error(f"Erro ao tentar pegar o primeiro item: {e}")
             return None
 
+    @measure_stage("scan")
     async def scan_items_after_first(self):
+        scan_started_at = time.perf_counter()
         new_items = []
         repeated_items = []
         new_items_existing_names = set()
-        haveNewItems = False
 
         if not self.first_item:
             self.logger.error("First item not stored")
@@ -167,92 +316,144 @@ class BotManager:
             await self.change_sorting_via_script(3)
             return False
         
-        try:     
-            current_inventory_items_elements = self.driver.find_elements(By.XPATH, "//*[@id='bots_inv']/div[@class='itemwrap']/div[@class='itemblock']")
-            first_element_id = current_inventory_items_elements[0].get_attribute("id")
-
-            first_item_is_present = any(item.get_attribute("id") == self.first_item for item in current_inventory_items_elements)
-            first_item_is_the_first = self.first_item == first_element_id
-            haveNewItems = (not first_item_is_present) or (first_item_is_present and not first_item_is_the_first)
-
-            if haveNewItems:
-                for item in current_inventory_items_elements:
-                    self.logger.info(f"Scanning item {item.get_attribute('data-name')}")
-                    item_name = item.get_attribute("data-name")
-                    
-                    item_price = (
-                        item.find_element(By.CLASS_NAME, "it_price")
-                        .text
-                        .strip()
-                        .split(" x")[0]
-                        .removeprefix("$")
+        try:
+            result = self.scan_page_candidates()
+            if result is None:
+                raise Exception("No items found in the bot inventory")
+
+            if result["have_new_items"]:
+                self.shared_state.IGNORED_ITEMS += result["ignored"]
+                SCANNED_ITEMS.inc(result["scanned"])
+                PAGE_FILTERED_ITEMS.inc(result["filtered"])
+                #store refined and key prices
+                for item_name, item_price in result["currency_prices"].items():
+                    if item_name == "Refined Metal":
+                        self.shared_state.REFINED_TO_USD_BUY_LOOTFARM = item_price
+                    elif item_name == "Mann Co. Supply Crate Key":
+                        self.shared_state.KEY_TO_USD_BUY_LOOTFARM = item_price
+
+                # itens descartados nessa leitura, gravados no journal em um único registro
+                filtered_items = [
+                    [item_id, item_name, item_price, "above_threshold"]
+                    for item_id, item_name, item_price in result["filtered_items"]
+                ]
+                for item in result["candidates"]:
+                    item_name = item["name"]
+                    # Nomes exatos já foram ignorados na página, o resto das regras roda aqui
+                    ignored_by = self.item_filter.match(
+                        item_name, item["price"], item["attachments"]
                     )
-
-                    if item_name in self.ignored_items:
-                        self.logger.info(f"Item {item_name} skipped")
+                    if ignored_by:
+                        self.logger.info(f"Item {item_name} skipped ({ignored_by})")
                         self.shared_state.IGNORED_ITEMS += 1
-                        #store refined and key prices
-                        if item_name == "Refined Metal":
-                            self.shared_state.REFINED_TO_USD_BUY_LOOTFARM = item_price
-                        elif item_name == "Mann Co. Supply Crate Key":
-                            self.shared_state.KEY_TO_USD_BUY_LOOTFARM = item_price
-                        continue   
-
-                    item_id = item.get_attribute("id")
-                    
-                    if item_id == self.first_item:
-                        self.logger.info(f"First item found: {item_name}")
-                        break
-
-                    item_attachments = []
-                    
-                    try:
-                        attachment_imgs = item.find_elements(By.XPATH, ".//div[contains(@class, 'it_s')]//img")
-                        for img in attachment_imgs:
-                            item_attachments.append(img.get_attribute("alt"))
-                    except Exception:
-                        self.logger.debug(f"No attachments found for {item_name}")
-                        pass
-
+                        filtered_items.append([item["id"], item_name, item["price"], ignored_by])
+                        continue
                     self.logger.info(f"Item {item_name} scanned")
 
-                    # Filtra itens existentes e ignorados
-                    if item_name in new_items_existing_names:                           
+                    # Filtra itens existentes
+                    if item_name in new_items_existing_names:
                         repeated_items.append({
-                            "item_id": item_id,
+                            "item_id": item["id"],
                             "item_name": item_name,
-                            "item_price": item_price,
-                            "item_attachments": item_attachments,
+                            "item_price": item["price"],
+                            "item_attachments": item["attachments"],
                         })
-                        continue    
+                        continue
                     new_items_existing_names.add(item_name)
+
+                    # Correlation id do item, da detecção até a decisão
+                    trace = start_trace(
+                        "item",
+                        started_at=scan_started_at,
+                        item_id=item["id"],
+                        item_name=item_name,
+                        loot_farm_price=item["price"],
+                    )
+                    if trace is not None:
+                        trace.add_span(
+                            "scan",
+                            scan_started_at,
+                            time.perf_counter(),
+                            scanned=result["scanned"],
+                            page_filtered=result["filtered"],
+                        )
                     new_items.append(
                         {
-                            "item_id": item_id,
+                            "item_id": item["id"],
                             "item_name": item_name,
-                            "item_price": item_price,
-                            "item_attachments": item_attachments,
+                            "item_price": item["price"],
+                            "item_attachments": item["attachments"],
+                            "trace": trace,
                         }
-                    )   
-                self.logger.info(f""" New items found: {len(new_items)}""")
+                    )
+                if filtered_items:
+                    journal(
+                        "filtered",
+                        dict(Counter(reason for *_, reason in filtered_items)),
+                        filtered_items,
+                    )
+                self.logger.info(
+                    f"New items found: {result['scanned']}, "
+                    f"{result['filtered']} above their buy threshold (filtered in page)"
+                )
             else:
                 self.logger.info("No new items found")
                 return False
-            self.first_item = first_element_id
+            self.first_item = result["first_id"]
         except NoSuchWindowException:
             self.logger.error("Window closed")
             raise Exception("Window closed")
-        
-        except Exception as e:                
+
+        except Exception as e:
             self.logger.error(f"Erro ao tentar pegar os itens: {e}")
             return False
-        
+
         self.logger.info(f"Scanned {len(new_items)} new items")
         return {
             "new_items": new_items,
             "repeated_items": repeated_items,
+            "scanned_items": result["scanned"],
         }
 
+    def set_buy_thresholds(self, thresholds: dict):
+        """
+        Stores the buy thresholds (see BuyDecisionTable.page_thresholds), they are
+        injected into the page on the next scan only if they changed.
+        """
+        if thresholds != self.buy_thresholds:
+            self.buy_thresholds = thresholds
+            self.buy_thresholds_version += 1
+            self.logger.debug(
+                f"Buy thresholds updated: {len(thresholds)} items (version {self.buy_thresholds_version})"
+            )
+
+    def scan_page_candidates(self):
+        """
+        Scans the new itemblocks (until the stored first item) inside the page and returns
+        only the ones under their buy threshold or without a threshold yet.
+        The thresholds are sent again only when the page lost them (refresh) or they changed.
+
+        Returns:
+            dict: The result of SCAN_CANDIDATES_SCRIPT or None if there are no itemblocks.
+        """
+        result = self.driver.execute_script(
+            SCAN_CANDIDATES_SCRIPT,
+            self.first_item,
+            list(self.item_filter.names),
+            self.buy_thresholds_version,
+            None,
+        )
+        if result is not None and result["stale"]:
+            self.logger.debug(f"Injecting {len(self.buy_thresholds)} buy thresholds into the page")
+            result = self.driver.execute_script(
+                SCAN_CANDIDATES_SCRIPT,
+                self.first_item,
+                list(self.item_filter.names),
+                self.buy_thresholds_version,
+                self.buy_thresholds,
+            )
+        return result
+
     async def get_bot_inventory_items(self):
         bot_inv = self.driver.find_element(By.ID, "bots_inv")
         existing_names = set()
@@ -264,7 +465,7 @@ class BotManager:
             try:
                 item_name = item.get_attribute("data-name")
 
-                if item_name in existing_names or item_name in self.ignored_items:
+                if item_name in existing_names or item_name in self.item_filter:
                     self.logger.debug(f"Item {item_name} skipped")
                     continue
 
@@ -292,6 +493,11 @@ class BotManager:
                 except Exception as e:
                     self.logger.error(f"Erro ao tentar pegar os anexos do item: {e}")
 
+                # Regras de preço e anexos
+                if self.item_filter.match(item_name, item_price, item_attachments):
+                    self.logger.debug(f"Item {item_name} skipped")
+                    continue
+
                 item_data.append(
                     {
                         "item_id": item_id,
@@ -300,7 +506,7 @@ class BotManager:
                         "item_attachments": item_attachments,
                     }
                 )
-                self.logger.info(f"Item {item_name} stored")
+                self.logger.info("Item %s stored", item_name)
 
             except Exception as e:
                 self.logger.error(f"Erro ao tentar pegar os dados do item: {e}")
@@ -316,86 +522,140 @@ class BotManager:
         self.logger.info(f"Bot inventory scanned: {len(item_data)} items")
         return item_data
 
+    @measure_stage("withdraw")
     async def withdraw_items(self, items):
+        withdraw_started_at = time.perf_counter()
         self.logger.info(f"Withdrawing {len(items)} items")
-        removed_items = []
-        # Calculate total cost and update shared state *before* attempting withdrawals
-        total_cost = 0.00
         profit_value = 0.00
-
-        for item in items:
-            self.shared_state.PROFITABLE_ITEMS += 1
-            total_cost += float(item["loot_farm_price"]) 
-
-        # Ensure sufficient funds before proceeding with withdrawals
-        if total_cost > self.shared_state.REMAINING_MONEY:
-            self.logger.info("Insufficient funds for withdrawal. Removing items...")
-            while total_cost > self.shared_state.REMAINING_MONEY:
-                removed_item = items.pop()
-                removed_items.append(removed_item)
-                total_cost -= removed_item["loot_farm_price"]
-                self.logger.debug(f"Removed item: {removed_item['name']}")
-            
-            self.logger.info(f"Items removed. New total cost: {total_cost}")
+        self.shared_state.PROFITABLE_ITEMS += len(items)
+
+        # Itens que cabem no saldo com o maior lucro (mochila exata em centavos): o dinheiro
+        # reservado para esses itens na avaliação mais o que ainda está livre
+        budget = self.shared_state.budget
+        # a mochila pode levar centenas de ms, fora do event loop
+        items, removed_items = await asyncio.to_thread(
+            allocate_budget,
+            items,
+            budget.held(item.get("reservation") for item in items) + budget.available(),
+            max_items=self.withdraw_allocation["max_items_per_trade"],
+            objective=self.withdraw_allocation["objective"],
+        )
+        if removed_items:
+            total_cost = sum(to_cents(item["loot_farm_price"]) for item in items) / 100
+            self.logger.info(
+                f"Insufficient funds or trade limit: withdrawing {len(items)} items for {total_cost} USD, "
+                f"{len(removed_items)} items removed"
+            )
+            for removed_item, reason in removed_items:
+                # libera o dinheiro para os próximos itens sem esperar o trade
+                budget.release(removed_item.get("reservation"))
+                self.logger.debug(f"Removed item: {removed_item['name']} ({reason})")
 
         # Proceed with withdrawals only if there are items left after potential removal
         if items: 
-            for item in items:
-                try:
-                    self.driver.execute_script(
-                        f"document.getElementById('{item['item_id']}').querySelector('img').click()"
-                    )
-                except Exception as e:
-                    self.logger.error(f"Error withdrawing item: {e}")
-
-            self.logger.info("Selected items for withdrawal")
-
-            tradeBtn = self.driver.find_element(By.ID, "tradeButton")
-            if tradeBtn.text == "ERROR :(":
+            async with self.browser_lock:
+                for item in items:
+                    try:
+                        self.driver.execute_script(
+                            f"document.getElementById('{item['item_id']}').querySelector('img').click()"
+                        )
+                    except Exception as e:
+                        self.logger.error(f"Error withdrawing item: {e}")
+
+                self.logger.info("Selected items for withdrawal")
+                WITHDRAWN_ITEMS.inc(len(items))
+
+                # a janela do trade é a que aparecer depois do clique
+                known_windows = set(self.driver.window_handles)
+                tradeBtn = self.driver.find_element(By.ID, "tradeButton")
+                trade_error = tradeBtn.text == "ERROR :("
+                if not trade_error:
+                    tradeBtn.click()
+                    self.logger.info("Trade button clicked")
+
+            if trade_error:
                 self.logger.error("ERROR :( message found in trade button, too many items selected @TODO")
-                time.sleep(5)
-            else:
-                tradeBtn.click()
-                self.logger.info("Trade button clicked")
+                await asyncio.sleep(5)
 
             # Open trade window 
-            discord_message = f"Bought items: {datetime.now().strftime('%H:%M')} Profit: {profit_value} USD\n\n"
-
-            # document.querySelector(".AcceptButton") - esperar ate 5 minutos
-            WebDriverWait(self.driver, 300).until(
-                EC.visibility_of_element_located((By.CLASS_NAME, "AcceptButton"))
-            )
 
-            time.sleep(1)
-
-            # vai para a página de trade
-            self.driver.switch_to.window(self.driver.window_handles[1])
-            self.logger.info("Trade window opened")
-            # esperar trade_box_contents class
-            self.wait.until(
-                EC.visibility_of_element_located((By.CLASS_NAME, "trade_box_contents"))
-            )
-
-            self.logger.info("Trade page loaded")
-            self.logger.warning(f"NEED TO CHECK WHAT HAPPEN WHEN THE BOT REACHES THIS POINT")
+            # document.querySelector(".AcceptButton") - esperar ate 5 minutos, o scanner continua rodando
+            await self.wait_until_visible((By.CLASS_NAME, "AcceptButton"), timeout=300)
+
+            await asyncio.sleep(1)
+
+            async with self.browser_lock:
+                main_window = self.driver.current_window_handle
+                new_windows = [
+                    handle for handle in self.driver.window_handles if handle not in known_windows
+                ]
+                if not new_windows:
+                    raise NoSuchWindowException("Trade window not opened")
+                # vai para a página de trade
+                self.driver.switch_to.window(new_windows[-1])
+                self.logger.info("Trade window opened")
+                try:
+                    # o lock continua com o withdraw (o scanner não pode ler a janela do trade),
+                    # mas a espera não trava o event loop
+                    await self.wait_until_visible(
+                        (By.CLASS_NAME, "trade_box_contents"), timeout=30, poll_interval=0.5, lock=False
+                    )
+                    self.logger.info("Trade page loaded")
+                    self.logger.warning(f"NEED TO CHECK WHAT HAPPEN WHEN THE BOT REACHES THIS POINT")
+                finally:
+                    # fecha a janela do trade e volta para o Loot.Farm para o scanner continuar
+                    self.driver.close()
+                    self.driver.switch_to.window(main_window)
 
             for item in items:
                 profit_price = item["average_price"] - item["loot_farm_price"] 
                 self.shared_state.ESTIMATED_PROFIT += profit_price
                 profit_value += profit_price
-                discord_message += f"**{item['name']}** - Profit: ```{profit_price} USD```\n"
-
-            if len(removed_items) > 0:
-                discord_message += "\n\nProfitable items were removed due to insufficient funds:\n"
-                for item in removed_items:
-                    discord_message += f"**{item['name']}** - Price: ```{item['loot_farm_price']} USD```\n"
+                add_digest_event(
+                    "bought", item["item_id"], f"**{item['name']}** - Profit: {profit_price} USD"
+                )
 
-            send_styled_webhook_message(message=discord_message , title=f"Bot bought {len(items)} items")
+            add_digest_event(
+                "bought",
+                "total",
+                f"Bought {len(items)} items at {datetime.now().strftime('%H:%M')}, profit: {profit_value} USD",
+            )
+            for item, reason in removed_items:
+                add_digest_event(
+                    "removed",
+                    item["item_id"],
+                    f"**{item['name']}** - Price: {item['loot_farm_price']} USD ({reason.replace('_', ' ')})",
+                )
         else:
             self.logger.warning("No items left to withdraw after ensuring sufficient funds.")
+
+        withdraw_ended_at = time.perf_counter()
+        withdraw_outcome = "trade_error" if items and trade_error else "trade_opened"
+        # itens removidos pela escolha do saldo ficam com o motivo como resultado
+        outcomes = [(item, withdraw_outcome, True) for item in items]
+        outcomes += [(item, reason, False) for item, reason in removed_items]
+        for item, outcome, withdrawn in outcomes:
+            # A página do trade carregou mas o trade ainda não foi confirmado: a reserva continua
+            # segurando o dinheiro até o reconcile ler o novo saldo (ou expira se o trade não sair)
+            if outcome == "trade_opened":
+                budget.extend(item.get("reservation"))
+            else:
+                budget.release(item.get("reservation"))
+            journal(
+                "withdraw",
+                item["item_id"],
+                item["name"],
+                item["loot_farm_price"],
+                item["average_price"],
+                outcome,
+            )
+            if item.get("trace") is not None:
+                item["trace"].add_span(
+                    "withdraw", withdraw_started_at, withdraw_ended_at, withdrawn=withdrawn
+                )
         
         self.logger.info(f"Finished withdrawing {len(items)} items, profit: {profit_value} USD, remaining money: {self.shared_state.REMAINING_MONEY} USD")
-        time.wait(15)
+        await asyncio.sleep(15)
 
     async def get_available_money(self):
         self.logger.info("Getting available money")
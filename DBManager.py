@@ -1,16 +1,38 @@
 import asyncio
-from datetime import datetime
-import json
 import logging
 import sqlite3
+import time
 from httpx import AsyncClient
 import requests
 import motor.motor_asyncio
 from pymongo.server_api import ServerApi
-from static.defindexes import strange_part_defindexes, strange_parts, spells
-from discord_utils.send_webhook_message import send_styled_webhook_message
+from discord_utils.alert_digest import add_digest_event
 from apis import apis
+from db_migrations import run_migrations
+from db_retention import DBRetention
+from stock_history import StockHistory
 from global_state import SharedState
+from utils.pricing_strategies import create_pricing_strategy
+from utils.snapshot_aggregates import (DEFAULT_TOP_N, store_snapshot_aggregates,
+                                       top_listings_average)
+from utils.decision_table import BuyDecisionTable, is_profitable, is_too_expensive
+from utils.decision_journal import journal
+from utils.item_filter import ItemFilter
+from utils.item_names import normalize_item_name
+from utils.listing_valuation import ListingValuation
+from utils.listings import Listing, reformat_listings
+from utils.config_logger import side_file_logger
+from utils.metrics import counter
+from utils.snapshot_codec import decode_listings, encode_listings
+from utils.stage_timing import measure_stage
+from utils.tracing import activate_trace, annotate, finish_trace, span
+
+
+SNAPSHOT_CACHE_LOOKUPS = counter(
+    "snapshot_cache_lookups_total", "Lookups in the Backpack.tf snapshot cache by result"
+)
+PROFITABLE_ITEMS_LOG = side_file_logger("profitable_items")
+SNAPSHOT_CACHE_ERROR_LOG = side_file_logger("snapshot_cache_error")
 
 
 class DBManager:
@@ -22,7 +44,10 @@ class DBManager:
         bptf_token: str,
         bptf_api_key: str,
         profit_threshold: float,
-        ignored_items: list[str],
+        ignored_items: list[str] | dict,
+        retention_policy: dict = None,
+        pricing_strategy: dict = None,
+        listing_quantity: int = DEFAULT_TOP_N,
     ):
         # Conexão com o MongoDB
         self.client = motor.motor_asyncio.AsyncIOMotorClient(
@@ -40,11 +65,32 @@ class DBManager:
         self.logger = logging.getLogger(__name__)
         self.profit_threshold = profit_threshold
         self.shared_state = SharedState.get_instance()
-        self.ignored_items = ignored_items
+        self.item_filter = ItemFilter.from_config(ignored_items)
+        # Estratégia usada para transformar as listings do backpack.tf no preço do item
+        self.pricing_strategy = create_pricing_strategy(pricing_strategy)
+        # Quantidade de listings do top_avg_usd calculado ao salvar cada snapshot, a mesma
+        # usada na avaliação dos itens novos para a média sair direto da coluna
+        self.aggregate_top_n = listing_quantity
 
         # Conexão com o SQLite
         self.conn = sqlite3.connect("main.db")
         self.cursor = self.conn.cursor()
+        # Políticas de retenção e limite de tamanho do main.db
+        self.retention = DBRetention(self.conn, retention_policy)
+        # Histórico (só as mudanças) do estoque e preços da loot.farm
+        self.stock_history = StockHistory(self.conn)
+        # Cópia em colunas (NumPy) das listings em cache, usada na avaliação em lote
+        self.valuation = ListingValuation()
+        # Tabela de decisão de compra (nome -> preço máximo), atualizada em segundo plano
+        self.decision_table = BuyDecisionTable(profit_threshold)
+        counter(
+            "decision_table_lookups_total",
+            "Lookups in the buy decision table by result",
+            lambda: [
+                ({"result": "hit"}, self.decision_table.hits),
+                ({"result": "miss"}, self.decision_table.misses),
+            ],
+        )
 
         # Instância da classe de APIs
         self.APImanager = apis(bptf_token=bptf_token, bptf_api_key=bptf_api_key)
@@ -62,7 +108,7 @@ class DBManager:
                 intent TEXT,
                 diff REAL,
                 currency TEXT,
-                fetchedAt TEXT,
+                fetchedAt INTEGER,
                 origin TEXT
             )
             """
@@ -74,7 +120,7 @@ class DBManager:
             CREATE TABLE IF NOT EXISTS api_call_log (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 endpoint TEXT UNIQUE,
-                fetchedAt TEXT
+                fetchedAt INTEGER
             )
             """
         )
@@ -107,7 +153,7 @@ class DBManager:
                 name TEXT UNIQUE,
                 steam_appid INTEGER,
                 listings TEXT,
-                fetched_at TEXT
+                fetched_at INTEGER
             )
             """
         )
@@ -221,6 +267,10 @@ class DBManager:
 
         self.conn.commit()
 
+        # Aplica as migrações pendentes (timestamps em epoch, índices, ...)
+        schema_version = run_migrations(self.conn)
+        self.logger.info(f"Database schema version: {schema_version}")
+
     def insert_currency_price(
         self,
         price,
@@ -228,51 +278,77 @@ class DBManager:
         diff,
         origin,
         name,
-        fetched_at=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        fetched_at=None,
         currency="usd",
     ):
+        if fetched_at is None:
+            fetched_at = int(time.time())
+
         self.cursor.execute(
             "INSERT INTO currencies_prices (price, intent, diff, currency, fetchedAt, origin, name) VALUES (?, ?, ?, ?, ?, ?, ?)",
             (price, intent, diff, currency, fetched_at, origin, name),
         )
         self.conn.commit()
 
-    async def insert_item(self, name, price, have, max_qty, rate) -> None:
+    def insert_restock_event(self, items: int, detected_at: int = None) -> None:
+        """Stores a restock (new items in the Loot.Farm page) for the polling cadence."""
+        if detected_at is None:
+            detected_at = int(time.time())
+
         self.cursor.execute(
-            "INSERT INTO loot_farm_inventory (name, price, have, max, rate) VALUES (?, ?, ?, ?, ?)",
-            (name, price, have, max_qty, rate),
+            "INSERT INTO restock_events (detected_at, items) VALUES (?, ?)",
+            (detected_at, items),
         )
         self.conn.commit()
 
-    async def store_loot_farm_api(self, items):
-        self.cursor.execute("DELETE FROM loot_farm_inventory")
-        self.conn.commit()
-        self.logger.info("Deleted old loot_farm_inventory table")
+    def get_restock_history(self, days: int) -> list[tuple[int, int]]:
+        """
+        Returns:
+            list[tuple[int, int]]: (detected_at, items) of the restocks of the last days.
+        """
+        self.cursor.execute(
+            "SELECT detected_at, items FROM restock_events WHERE detected_at >= ? ORDER BY detected_at",
+            (int(time.time()) - int(days * 24 * 3600),),
+        )
+        return self.cursor.fetchall()
 
+    async def store_loot_farm_api(self, items):
+        rows = []
         for item in items:
             itemPrice = item["price"] * 0.01
             item_name = item["name"]
             item_have = item["have"]
             item_max = item["max"]
 
-            if item_name in self.ignored_items:
+            if self.item_filter.match(item_name, itemPrice):
                 continue
 
             if item_have == 0 or item_max == 0 or item_have == item_max:
                 continue
 
-            await self.insert_item(
-                name=item_name,
-                price=itemPrice,
-                have=item_have,
-                rate=item["rate"],
-                max_qty=item_max,
-            )
+            rows.append((item_name, itemPrice, item_have, item_max, item["rate"]))
 
-    async def fetch_and_store_loot_farm_api(self, game) -> None:
+        # histórico e inventário em uma única transação (um commit por refresh)
+        try:
+            # o histórico guarda todos os itens, mesmo os ignorados
+            self.stock_history.record(items, commit=False)
+            self.cursor.execute("DELETE FROM loot_farm_inventory")
+            self.cursor.executemany(
+                "INSERT INTO loot_farm_inventory (name, price, have, max, rate) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            # o estado em memória do histórico pode ter avançado com as linhas desfeitas
+            self.stock_history.item_ids = None
+            raise
+        self.logger.info(f"Replaced loot_farm_inventory with {len(rows)} items")
+
+    async def fetch_and_store_loot_farm_api(self, game, cache_duration_hours=1) -> None:
         try:
             if not self.should_make_api_call(
-                f"loot-farm-{game}", cache_duration_hours=1
+                f"loot-farm-{game}", cache_duration_hours=cache_duration_hours
             ):
                 raise Exception("Not making API call, cache is still valid")
 
@@ -290,62 +366,68 @@ class DBManager:
         # pegar todos os items que tiver o have > 0
         # self.cursor.execute("SELECT name, price FROM loot_farm_inventory")
         self.cursor.execute(
-            "SELECT name, price, have, max, rate FROM loot_farm_inventory WHERE have > 0 AND max != have"
+            "SELECT name, price, rate FROM loot_farm_inventory WHERE have > 0 AND max != have"
         )
         items = self.cursor.fetchall()
         total_items_processed = 0
 
+        # Averages of every cached item computed at once, only cache misses go to the API
+        cache_duration_hours = 1
+        cached_averages = {}
+        cached_expires_at = {}
+        if self.pricing_strategy.uses_aggregates:
+            cached_averages = self.get_batch_top_averages(3, cache_duration_hours)
+            # a varredura leva mais de uma hora (1 s por item): cada média só vale até o
+            # snapshot do item expirar, depois o item passa pelo cache normal
+            cached_expires_at = {
+                name: aggregates["fetched_at"] + int(cache_duration_hours * 3600)
+                for name, aggregates in self.get_snapshot_aggregates(cache_duration_hours).items()
+            }
+
         for item in items:
             item_name = item[0]
             item_price = item[1]
-            item_have = item[2]
-            item_max = item[3]
-            item_rate = item[4]
+            item_rate = item[2]
+
+            if self.item_filter.match(item_name, item_price):
+                continue
 
-            # Adapt item-names for the snapshot API if necessary
             if item_name.startswith("Unusual"):
                 # this function ignores unusual effects because the api does not say the effect
                 continue
-            elif (
-                item_name.startswith(
-                    ("Professional Killstreak", "Killstreak", "Specialized Killstreak")
-                )
-                and item_name.endswith("Kit")
-            ) or item_name.endswith("Unusualifier"):
-                item_name = f"Non-Craftable {item_name}"
-                self.logger.warning(f"New item name: {item_name}")
-            elif " Series" in item_name:
-                item_name = item_name.replace(" Series", "")
-                self.logger.warning(f"New item name: {item_name}")
-            # convert # to %23
-            elif "#" in item_name:
-                item_name = item_name.replace("#", "%23")
+
+            # Adapt item-names for the snapshot API if necessary
+            item_name = normalize_item_name(item_name)
+            if item_name != item[0]:
                 self.logger.warning(f"New item name: {item_name}")
 
             try:
-                snapshot_listings = await self.fetch_item_snapshot_with_cache(item_name)
-                if not snapshot_listings:
+                average_price = None
+                if time.time() < cached_expires_at.get(item_name, 0):
+                    average_price = cached_averages.get(item_name)
+                price_source = "aggregate"
+                if average_price is None:
+                    average_price = await self.fetch_item_price(item_name, 3, cache_duration_hours)
+                    price_source = "snapshot"
+                if average_price is None:
                     raise ValueError(
                         f"Item '{item_name}' not found in Backpack.TF or no listings found"
                     )
-
-                # sort listings by price
-                snapshot_listings.sort(key=lambda x: x["price"])
-                top_listings = snapshot_listings[:3]
-
-                # Calculate the average price from the top listings using usd_estimated
-                average_price = sum(
-                    [listing["usd_estimated"] for listing in top_listings]
-                ) / len(top_listings)
+                journal("price", None, item_name, self.pricing_strategy.name, 3, average_price, price_source)
 
                 # Check for profitability
-                if item_price + self.profit_threshold < average_price:
+                decision_label = "not_profitable"
+                if is_profitable(item_price, average_price, self.profit_threshold):
+                    decision_label = "profitable"
                     # write profieble item in a file
-                    file = open("logs/profitable_items.txt", "a")
-                    file.write(
-                        f"item: {item_name} \n Loot.Farm: {item_price}\n Backpack.TF (Avg of top 3): {average_price} \n item_Rate: {item_rate} \n ------------------------------------ \n"
+                    PROFITABLE_ITEMS_LOG.info(
+                        f"item: {item_name} \n Loot.Farm: {item_price}\n Backpack.TF ({self.pricing_strategy.name} of top 3): {average_price} \n item_Rate: {item_rate} \n ------------------------------------ "
                     )
                     self.logger.info(f"Profitable item found: {item_name}")
+                # itens da varredura completa não têm id
+                journal(
+                    "decision", None, item_name, item_price, average_price, self.profit_threshold, decision_label
+                )
 
             except (ValueError, KeyError, requests.exceptions.RequestException) as e:
                 self.logger.error(f"Error processing item '{item_name}': {e}")
@@ -354,7 +436,6 @@ class DBManager:
                     other_vars={
                         "item_name": item_name,
                         "item_price": item_price,
-                        "snapshot_listings": snapshot_listings,
                     },
                 )
             finally:
@@ -537,7 +618,7 @@ class DBManager:
         else:
             return None
 
-    async def reformat_snapshot(self, payload: dict) -> dict:
+    async def reformat_snapshot(self, payload: dict) -> list[Listing]:
         """
         Reformat the Backpack.tf API snapshot response.
         obs: remove listings that are not buy listings and have blacklisted keywords
@@ -546,90 +627,18 @@ class DBManager:
             payload (dict): The Backpack.tf API response payload.
 
         Returns:
-            dict: The reformatted snapshot data.
+            list[Listing]: The filtered listings or None if no listing is left.
         """
 
         if not payload:
-            return dict()
-
-        listings = payload.get("listings", [])
-        formatted_listings = []
-
-        for listing in listings:
-            # Check if the listing is reasonable
-
-            intent = listing.get("intent", "sell")
-            only_buyout = listing.get("buyout", True)
-
-            if intent == "sell":
-                continue
-
-            # remove listings that are not buyout | Most of the time, the buyout listings are the best ones (bots) while the others are not
-            if only_buyout == 0:
-                continue
-
-            # remove listings that contains spell attributes
-            has_spell_or_strange_part = False
-            if "item" in listing and "attributes" in listing["item"]:
-                for attribute in listing["item"]["attributes"]:
-
-                    defindex = int(attribute.get("defindex", -1))
-                    float_value = float(attribute.get("float_value", -1))
-                    # Verifica se é spell
-                    if defindex in spells:
-                        has_spell_or_strange_part = True
-                        break  # Sai do loop se encontrar um spell
-
-                    # Verifica se é strange part
-                    if (
-                        defindex in strange_part_defindexes
-                        and float_value in strange_parts
-                    ):
-                        has_spell_or_strange_part = True
-                        break  # Sai do loop se encontrar uma strange part
-
-            if has_spell_or_strange_part:
-                continue
-
-            steamid = listing.get("steamid", 0)
-            currencies = listing.get("currencies", {})
-            listed_at = listing.get(
-                "timestamp", datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            )
-            bumped_at = listing.get("bump", listed_at)
-            trade_offers_preferred = listing.get("offers")
-            only_buyout = listing.get("buyout", True)
-            item = listing.get("item", {})
-            price = listing.get("price", None)
-
-            refined_metal_lootfarm_sell_price = (
-                self.shared_state.REFINED_TO_USD_SELL_LOOTFARM
-            )
+            return None
 
-            if price is not None and price > 0:
-                try:
-                    usd_estimated = float(price) * float(
-                        refined_metal_lootfarm_sell_price
-                    )
-                except Exception as e:
-                    self.logger.error(f"Failed to calculate USD estimated: {e}")
-                    usd_estimated = self.currencies_to_usd(currencies)
-            else:
-                usd_estimated = self.currencies_to_usd(currencies)
-
-            formatted_listing = {
-                "steamid": steamid,
-                "currencies": currencies,
-                "usd_estimated": usd_estimated,
-                "trade_offers_preferred": trade_offers_preferred,
-                "bumped_at": bumped_at,
-                "intent": intent,
-                "only_buyout": only_buyout,
-                "price": price,
-                "listed_at": listed_at,
-                "item": item,
-            }
-            formatted_listings.append(formatted_listing)
+        # The currency values are captured once for the whole snapshot
+        formatted_listings = reformat_listings(
+            payload.get("listings", []),
+            refined_to_usd=self.shared_state.REFINED_TO_USD_SELL_LOOTFARM,
+            key_to_usd=self.shared_state.KEY_TO_USD_SELL_LOOTFARM,
+        )
 
         if len(formatted_listings) == 0:
             return None
@@ -638,56 +647,47 @@ class DBManager:
 
     async def fetch_item_snapshot_with_cache(
         self, item_name: str, cache_duration_hours: int = 1
-    ) -> list[dict]:
+    ) -> list[Listing]:
         """
         Fetches item snapshot from Backpack.tf API, caching esults locally for a specified duration.
+        The listings are stored with utils.snapshot_codec.
 
         Args:
             item_name (str): The name of the item.
             cache_duration_hours (int, optional): Duration in hours to cache results. Defaults to 1.
 
         Returns:
-            dict: Fetched snapshot data or None if an error occurred.
+            list[Listing]: Snapshot listings or None if an error occurred.
         """
         try:
-            # Check last fetch time from the database
+            # Only rows fetched inside the cache window are returned (indexed TTL check)
+            min_fetched_at = int(time.time()) - int(cache_duration_hours * 3600)
             self.cursor.execute(
-                "SELECT fetched_at FROM snapshot_results WHERE name = ?", (item_name,)
+                "SELECT listings FROM snapshot_results WHERE name = ? AND fetched_at >= ?",
+                (item_name, min_fetched_at),
             )
             result = self.cursor.fetchone()
 
             if result:
-                last_fetched_at = datetime.strptime(result[0], "%Y-%m-%d %H:%M:%S")
-                time_difference = datetime.now() - last_fetched_at
-
-                if time_difference.total_seconds() < cache_duration_hours * 3600:
-                    self.logger.info(f"Using cached snapshot for {item_name}")
-                    # Fetch the listings from the database
-                    self.cursor.execute(
-                        "SELECT listings FROM snapshot_results WHERE name = ?",
-                        (item_name,),
-                    )
-                    listings_json = self.cursor.fetchone()
-                    return json.loads(listings_json[0])  # Return the cached listings
-                else:
-                    self.logger.info(
-                        f"Cache expired for {item_name}, time dif: {time_difference.total_seconds()}"
-                    )
-            else:
-                self.logger.info(
-                    f"No cached data found for {item_name}, result: {str(result)}"
-                )
+                self.logger.info("Using cached snapshot for %s", item_name)
+                SNAPSHOT_CACHE_LOOKUPS.inc(result="hit")
+                annotate(cache="hit")
+                return decode_listings(result[0])  # Return the cached listings
+
+            self.logger.info("No valid cached snapshot found for %s", item_name)
+            SNAPSHOT_CACHE_LOOKUPS.inc(result="miss")
+            annotate(cache="miss")
         except Exception as e:
             self.logger.info(
-                f"Failed to fetch item snapshot in database for {item_name}, time dif: {time_difference.total_seconds()}"
+                f"Failed to fetch item snapshot in database for {item_name}"
             )
             # write file with error
-            file = open("fetch_item_snapshot_with_cache_error.txt", "a")
-            file.write(
-                f"Failed to fetch item snapshot in database for {item_name}, time dif: {time_difference.total_seconds()}\nresult: {str(result)} \n {str(e)} \n ------------------------------------ \n"
+            SNAPSHOT_CACHE_ERROR_LOG.info(
+                f"Failed to fetch item snapshot in database for {item_name}\n {str(e)} \n ------------------------------------ "
             )
 
         if not self.shared_state.should_make_snapshot_request():
+            annotate(throttled=True)
             self.logger.warning(
                 "Exceeded the maximum number of snapshot requests for this minute (60) and the cache is expired, skipping."
             )
@@ -702,32 +702,224 @@ class DBManager:
             self.logger.error(f"Failed to fetch snapshot for {item_name}")
             return None
 
-        formatted_snapshot = await self.reformat_snapshot(snapshot)
+        listings = await self.reformat_snapshot(snapshot)
 
-        if formatted_snapshot:
-            listings_json = json.dumps(formatted_snapshot)
-            self.logger.info(f"Storing snapshot for {item_name} in the database")
-            fetched_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            steam_appid = 440
-            self.cursor.execute(
-                """
-                INSERT OR REPLACE INTO snapshot_results (name, steam_appid, listings, fetched_at) 
-                VALUES (?, ?, ?, ?)
-                """,
-                (
-                    item_name,
-                    steam_appid,
-                    listings_json,
-                    fetched_at,
-                ),
-            )
-            self.conn.commit()
-        else:
+        if not listings:
             self.logger.warning(
                 f"Empty snapshot for {item_name}. Not storing in the database."
             )
+            return listings
+
+        self.logger.info(f"Storing snapshot for {item_name} in the database")
+        fetched_at = int(time.time())
+        steam_appid = 440
+        self.cursor.execute(
+            """
+            INSERT OR REPLACE INTO snapshot_results (name, steam_appid, listings, fetched_at) 
+            VALUES (?, ?, ?, ?)
+            """,
+            (
+                item_name,
+                steam_appid,
+                encode_listings(listings),
+                fetched_at,
+            ),
+        )
+        store_snapshot_aggregates(self.cursor, item_name, listings, self.aggregate_top_n)
+        self.conn.commit()
+
+        return listings
+
+    def get_snapshot_top_average(
+        self, item_name: str, listing_quantity: int, cache_duration_hours: int = 1
+    ) -> float:
+        """
+        Gets the average usd_estimated of the listing_quantity cheapest listings of a cached snapshot.
+        Uses the aggregate computed at ingest when possible, otherwise decodes the cached listings.
+
+        Args:
+            item_name (str): The name of the item (as sent to the snapshot API).
+            listing_quantity (int): The number of listings to consider.
+            cache_duration_hours (int, optional): Maximum age of the snapshot. Defaults to 1.
+
+        Returns:
+            float: The average price or None if there is no valid cached snapshot.
+        """
+        min_fetched_at = int(time.time()) - int(cache_duration_hours * 3600)
+        self.cursor.execute(
+            "SELECT top_n, top_avg_usd FROM snapshot_results WHERE name = ? AND fetched_at >= ?",
+            (item_name, min_fetched_at),
+        )
+        result = self.cursor.fetchone()
+        if not result:
+            SNAPSHOT_CACHE_LOOKUPS.inc(result="miss")
+            annotate(cache="miss")
+            return None
+
+        SNAPSHOT_CACHE_LOOKUPS.inc(result="hit")
+        annotate(cache="hit")
+        top_n, top_avg_usd = result
+        if top_n == listing_quantity:
+            return top_avg_usd
+
+        self.cursor.execute(
+            "SELECT listings FROM snapshot_results WHERE name = ?", (item_name,)
+        )
+        return top_listings_average(decode_listings(self.cursor.fetchone()[0]), listing_quantity)
+
+    async def fetch_item_top_average(
+        self, item_name: str, listing_quantity: int, cache_duration_hours: int = 1
+    ) -> float:
+        """
+        Same as get_snapshot_top_average, fetching the snapshot from Backpack.tf on a cache miss.
+
+        Returns:
+            float: The average price or None if the item has no listings.
+        """
+        average_price = self.get_snapshot_top_average(
+            item_name, listing_quantity, cache_duration_hours
+        )
+        if average_price is not None:
+            self.logger.info(f"Using cached aggregates for {item_name}")
+            return average_price
+
+        snapshot_listings = await self.fetch_item_snapshot_with_cache(
+            item_name, cache_duration_hours
+        )
+        if not snapshot_listings:
+            return None
+
+        return top_listings_average(snapshot_listings, listing_quantity)
+
+    @measure_stage("snapshot_fetch")
+    async def fetch_item_price(
+        self, item_name: str, listing_quantity: int, cache_duration_hours: int = 1
+    ) -> float:
+        """
+        Prices an item from its Backpack.tf buy listings with the configured pricing strategy.
+        The mean strategy is answered by the aggregates stored at ingest, the others load the cached listings.
+
+        Args:
+            item_name (str): The name of the item (as sent to the snapshot API).
+            listing_quantity (int): The number of listings to consider.
+            cache_duration_hours (int, optional): Maximum age of the snapshot. Defaults to 1.
+
+        Returns:
+            float: The price in USD or None if the item has no listings.
+        """
+        if self.pricing_strategy.uses_aggregates:
+            return await self.fetch_item_top_average(
+                item_name, listing_quantity, cache_duration_hours
+            )
+
+        snapshot_listings = await self.fetch_item_snapshot_with_cache(
+            item_name, cache_duration_hours
+        )
+        if not snapshot_listings:
+            return None
 
-        return formatted_snapshot
+        return self.pricing_strategy.price(snapshot_listings, listing_quantity)
+
+    def get_batch_top_averages(
+        self, listing_quantity: int, cache_duration_hours: int = 1, reload: bool = True
+    ) -> dict:
+        """
+        Values every cached listing with the current Loot.Farm key and refined rates and
+        computes the top listings average of every cached item in one vectorized pass.
+
+        Args:
+            listing_quantity (int): The number of listings to consider.
+            cache_duration_hours (int, optional): Maximum age of the snapshots. Defaults to 1.
+            reload (bool, optional): Reload the listings from the database. Defaults to True,
+                use False to only reprice the loaded listings after a currency rate change.
+
+        Returns:
+            dict: item name -> average price.
+        """
+        if reload or self.valuation.loaded_at is None:
+            loaded_listings = self.valuation.load(self.cursor, cache_duration_hours)
+            self.logger.info(f"Loaded {loaded_listings} cached listings for batch valuation")
+
+        if self.valuation.revalue(
+            refined_to_usd=self.shared_state.REFINED_TO_USD_SELL_LOOTFARM,
+            key_to_usd=self.shared_state.KEY_TO_USD_SELL_LOOTFARM,
+        ):
+            self.logger.info(f"Revalued {len(self.valuation)} cached listings")
+
+        return self.valuation.top_n_averages(listing_quantity)
+
+    def refresh_decision_table(
+        self, listing_quantity: int, cache_duration_hours: int = 1
+    ) -> int:
+        """
+        Rebuilds the buy decision table from the cached snapshots and the current currency rates.
+        Each entry expires together with the snapshot cache of its item.
+
+        Args:
+            listing_quantity (int): The number of listings to consider, the same used by compare_items_prices.
+            cache_duration_hours (int, optional): Maximum age of the snapshots. Defaults to 1.
+
+        Returns:
+            int: The number of items in the table.
+        """
+        cache_duration_seconds = int(cache_duration_hours * 3600)
+        expires_at = {
+            name: aggregates["fetched_at"] + cache_duration_seconds
+            for name, aggregates in self.get_snapshot_aggregates(
+                cache_duration_hours
+            ).items()
+        }
+
+        if self.pricing_strategy.uses_aggregates:
+            prices = self.get_batch_top_averages(listing_quantity, cache_duration_hours)
+        else:
+            prices = {}
+            self.cursor.execute(
+                "SELECT name, listings FROM snapshot_results WHERE fetched_at >= ?",
+                (int(time.time()) - cache_duration_seconds,),
+            )
+            for name, listings in self.cursor.fetchall():
+                prices[name] = self.pricing_strategy.price(
+                    decode_listings(listings), listing_quantity
+                )
+
+        self.decision_table.rebuild(prices, expires_at, listing_quantity)
+        self.logger.info(f"Buy decision table refreshed with {len(self.decision_table)} items")
+        return len(self.decision_table)
+
+    def get_snapshot_aggregates(self, cache_duration_hours: int = None) -> dict:
+        """
+        Gets the aggregates of every cached snapshot.
+
+        Args:
+            cache_duration_hours (int, optional): Only return snapshots newer than this. Defaults to all of them.
+
+        Returns:
+            dict: item name -> listing_count, min_price, median_usd, top_n, top_avg_usd, freshest_bump and fetched_at.
+        """
+        min_fetched_at = 0
+        if cache_duration_hours is not None:
+            min_fetched_at = int(time.time()) - int(cache_duration_hours * 3600)
+
+        self.cursor.execute(
+            """
+            SELECT name, listing_count, min_price, median_usd, top_n, top_avg_usd, freshest_bump, fetched_at
+            FROM snapshot_results WHERE fetched_at >= ?
+            """,
+            (min_fetched_at,),
+        )
+        return {
+            row[0]: {
+                "listing_count": row[1],
+                "min_price": row[2],
+                "median_usd": row[3],
+                "top_n": row[4],
+                "top_avg_usd": row[5],
+                "freshest_bump": row[6],
+                "fetched_at": row[7],
+            }
+            for row in self.cursor.fetchall()
+        }
 
     def currencies_to_usd(self, currencies: dict) -> float:
         """
@@ -777,110 +969,156 @@ class DBManager:
         profitable_items = []
         self.logger.info("Comparing item prices")
         for item in items:
-            self.logger.info(f"Checking item '{item['item_name']}' for profitability")
-            item_name = item["item_name"]
-            item_id = item["item_id"]
-            item_loot_farm_price = float(item["item_price"])
-            item_attachments = item["item_attachments"]
-
-            if (
-                item_loot_farm_price > self.shared_state.MAX_ITEM_PRICE
-                and self.shared_state.MAX_ITEM_PRICE > 0
-            ) or item_loot_farm_price > self.shared_state.REMAINING_MONEY:
-                self.logger.warning(f"Item '{item_name}' is too expensive, skipping")
-                continue
-
-            unusual_effect_id = await self.get_dafindex_from_tf2_item_table(
-                item_attachments, "tf2_items_effects"
-            )
-
-            # Adapt item-names for the snapshot API if necessary
-            if (
-                item_name.startswith(
-                    ("Professional Killstreak", "Killstreak", "Specialized Killstreak")
-                )
-                and item_name.endswith("Kit")
-            ) or item_name.endswith("Unusualifier"):
-                item_name = f"Non-Craftable {item_name}"
-                self.logger.warning(f"New item name: {item_name}")
-            elif " Series" in item_name:
-                item_name = item_name.replace(" Series", "")
-                self.logger.warning(f"New item name: {item_name}")
-            elif unusual_effect_id:
-                self.logger.warning(
-                    f"unusual_effect_id for item '{item_name}' with unusual effect"
-                )
-                item_name = item_name.replace("Unusual", unusual_effect_id["name"])
-                self.logger.warning(f"New item name: {item_name}")
-            # convert # to %23
-            elif "#" in item_name:
-                item_name = item_name.replace("#", "%23")
-                self.logger.warning(f"New item name: {item_name}")
-
-            try:
-                snapshot_listings = await self.fetch_item_snapshot_with_cache(item_name)
-
-                if not snapshot_listings:
-                    raise ValueError(
-                        f"Item '{item_name}' not found in Backpack.TF or no listings found"
+            trace = item.get("trace")
+            decision_label = None
+            average_price = None
+            # evaluate é medido por item (o lote inteiro não diz quanto um item espera pela decisão)
+            with activate_trace(trace), span("evaluate"), measure_stage("evaluate"):
+                self.logger.info(f"Checking item '{item['item_name']}' for profitability")
+                item_name = item["item_name"]
+                item_id = item["item_id"]
+                item_loot_farm_price = float(item["item_price"])
+                item_attachments = item["item_attachments"]
+
+                if is_too_expensive(
+                    item_loot_farm_price,
+                    self.shared_state.MAX_ITEM_PRICE,
+                    self.shared_state.budget.available(),
+                ):
+                    self.logger.warning(f"Item '{item_name}' is too expensive, skipping")
+                    finish_trace(trace, decision="too_expensive")
+                    journal(
+                        "decision",
+                        item_id,
+                        item_name,
+                        item_loot_farm_price,
+                        None,
+                        self.profit_threshold,
+                        "too_expensive",
                     )
+                    continue
+
+                # Itemblock already evaluated: the snapshot name comes from the alias (dict lookup),
+                # the effect lookup and the name normalization only run for new itemblocks
+                unusual_effect_id = None
+                known_name = self.decision_table.resolve_alias(item_name, item_attachments)
+                annotate(alias="hit" if known_name is not None else "miss")
+                if known_name is not None:
+                    item_name = known_name
+                else:
+                    with span("schema_lookup"):
+                        unusual_effect_id = await self.get_dafindex_from_tf2_item_table(
+                            item_attachments, "tf2_items_effects"
+                        )
 
-                # sort listings by price
-                snapshot_listings.sort(key=lambda x: x["price"])
-
-                top_listings = snapshot_listings[:listing_quantity]
+                    # Adapt item-names for the snapshot API if necessary
+                    with measure_stage("normalize"):
+                        item_name = normalize_item_name(
+                            item_name, unusual_effect_id["name"] if unusual_effect_id else None
+                        )
+                    if item_name != item["item_name"]:
+                        self.logger.warning(f"New item name: {item_name}")
 
-                # Calculate the average price from the top listings using usd_estimated
-                average_price = sum(
-                    [listing["usd_estimated"] for listing in top_listings]
-                ) / len(top_listings)
+                    self.decision_table.learn_alias(item["item_name"], item_attachments, item_name)
 
-                # Check for profitability
-                if item_loot_farm_price + self.profit_threshold < average_price:
-                    send_styled_webhook_message(
-                        message=f"item: {item_name} \n Loot.Farm: {item_loot_farm_price}\n Backpack.TF (Avg of top 3): {average_price}",
-                        title="🎉 Profitable item found 🎉",
+                try:
+                    # Decision table first (dict lookup), the full path only runs on a miss
+                    decision = self.decision_table.decide(
+                        item_name, item_loot_farm_price, listing_quantity
                     )
-
-                    if item_name in repeated_names_items:
-                        profitable_items.append(
-                            {
-                                "item_id": item_id,
-                                "name": item_name,
-                                "loot_farm_price": item_loot_farm_price,
-                                "average_price": average_price,
-                            }
+                    annotate(decision_table="hit" if decision is not None else "miss")
+                    if decision is not None:
+                        average_price = decision[1]
+                    else:
+                        # Price of the top listings with the configured strategy (indexed lookup for the mean)
+                        with span("snapshot_fetch", item_name=item_name):
+                            average_price = await self.fetch_item_price(
+                                item_name, listing_quantity
+                            )
+
+                    if average_price is None:
+                        raise ValueError(
+                            f"Item '{item_name}' not found in Backpack.TF or no listings found"
                         )
-
-                    profitable_items.append(
-                        {
-                            "item_id": item_id,
-                            "name": item_name,
-                            "loot_farm_price": item_loot_farm_price,
-                            "average_price": average_price,
-                        }
+                    journal(
+                        "price",
+                        item_id,
+                        item_name,
+                        self.pricing_strategy.name,
+                        listing_quantity,
+                        average_price,
+                        "decision_table" if decision is not None else "snapshot",
                     )
 
-                    self.logger.info(
-                        f"Item '{item_name}' is profitable: Loot.Farm: {item_loot_farm_price}, "
-                        f"Backpack.tf (Avg of top 3): {average_price}"
+                    # Check for profitability
+                    decision_label = "not_profitable"
+                    if is_profitable(item_loot_farm_price, average_price, self.profit_threshold):
+                        decision_label = "insufficient_funds"
+                        # items with a repeated name are withdrawn twice, each one with its reservation
+                        for _ in range(2 if item_name in repeated_names_items else 1):
+                            # reserva o saldo agora, outro avaliador não pode gastar o mesmo dinheiro
+                            reservation = self.shared_state.budget.reserve(item_loot_farm_price, item_name)
+                            if reservation is None:
+                                break
+                            decision_label = "profitable"
+                            profitable_items.append(
+                                {
+                                    "item_id": item_id,
+                                    "name": item_name,
+                                    "loot_farm_price": item_loot_farm_price,
+                                    "average_price": average_price,
+                                    "trace": trace,
+                                    "reservation": reservation,
+                                }
+                            )
+
+                        if decision_label == "profitable":
+                            add_digest_event(
+                                "profitable",
+                                item_id,
+                                f"**{item_name}** Loot.Farm: {item_loot_farm_price} | Backpack.TF ({self.pricing_strategy.name} of top {listing_quantity}): {average_price}",
+                            )
+                            self.logger.info(
+                                f"Item '{item_name}' is profitable: Loot.Farm: {item_loot_farm_price}, "
+                                f"Backpack.tf ({self.pricing_strategy.name} of top {listing_quantity}): {average_price}"
+                            )
+                        else:
+                            self.logger.warning(
+                                f"Item '{item_name}' is profitable but the balance is reserved for other items, skipping"
+                            )
+
+                except (ValueError, KeyError, requests.exceptions.RequestException) as e:
+                    decision_label = "error"
+                    annotate(error=str(e))
+                    self.logger.error(f"Error processing item '{item_name}': {e}")
+                    self.shared_state.debug_error(
+                        error=e,
+                        other_vars={
+                            "item_name": item_name,
+                            "unusual_effect_id": unusual_effect_id,
+                            "item_attachments": item_attachments,
+                            "item": item,
+                            "loot_farm_price": item_loot_farm_price,
+                        },
                     )
 
-            except (ValueError, KeyError, requests.exceptions.RequestException) as e:
-                self.logger.error(f"Error processing item '{item_name}': {e}")
-                self.shared_state.debug_error(
-                    error=e,
-                    other_vars={
-                        "item_name": item_name,
-                        "unusual_effect_id": unusual_effect_id,
-                        "item_attachments": item_attachments,
-                        "item": item,
-                        "loot_farm_price": item_loot_farm_price,
-                        "snapshot_listings": snapshot_listings,
-                    },
-                )
-            finally:
-                await asyncio.sleep(delay_between_requests)
+            journal(
+                "decision",
+                item_id,
+                item_name,
+                item_loot_farm_price,
+                average_price,
+                self.profit_threshold,
+                decision_label,
+            )
+            # profitable items are finished after the withdraw
+            if decision_label == "profitable":
+                if trace is not None:
+                    trace.root.set(decision=decision_label, average_price=average_price)
+            else:
+                finish_trace(trace, decision=decision_label)
+            # fora do evaluate, a espera entre as requisições não entra no tempo do item
+            await asyncio.sleep(delay_between_requests)
 
         self.logger.info(f"Found {len(profitable_items)} profitable items")
         return profitable_items
@@ -897,12 +1135,13 @@ class DBManager:
             bool: True se a chamada deve ser feita, False caso contrário.
         """
 
-        # Verifica a última chamada para esse tipo de API
-        self.cursor.execute(
-            "SELECT fetchedAt FROM api_call_log WHERE endpoint = ? ORDER BY fetchedAt DESC LIMIT 1",
-            (endpoint,),
-        )
+        # Verifica se existe uma chamada recente para esse tipo de API
+        min_fetched_at = int(time.time()) - int(cache_duration_hours * 3600)
         try:
+            self.cursor.execute(
+                "SELECT 1 FROM api_call_log WHERE endpoint = ? AND fetchedAt >= ? LIMIT 1",
+                (endpoint, min_fetched_at),
+            )
             result = self.cursor.fetchone()
         except Exception as e:
             self.logger.error(
@@ -911,11 +1150,8 @@ class DBManager:
             return True
 
         if result:
-            last_call_timestamp = datetime.strptime(result[0], "%Y-%m-%d %H:%M:%S")
-            time_difference = datetime.now() - last_call_timestamp
-            if time_difference.total_seconds() < cache_duration_hours * 3600:
-                self.logger.info(f"Using cached data for {endpoint}")
-                return False
+            self.logger.info(f"Using cached data for {endpoint}")
+            return False
 
         return True
 
@@ -927,7 +1163,7 @@ class DBManager:
             endpoint (str): O endpoint da API chamado.
         """
 
-        fetched_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        fetched_at = int(time.time())
         self.cursor.execute(
             "INSERT OR REPLACE INTO api_call_log (endpoint, fetchedAt) VALUES (?, ?)",
             (endpoint, fetched_at),
@@ -1025,6 +1261,7 @@ class DBManager:
 
         self.conn.commit()
 
+    @measure_stage("schema_lookup")
     async def get_dafindex_from_tf2_item_table(self, search_values, table_name):
         """
         Fetches the defindex of a TF2 item from the specified table.
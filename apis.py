@@ -6,6 +6,20 @@ from asyncio import sleep
 
 from httpx import AsyncClient
 
+from utils.config_logger import side_file_logger
+from utils.metrics import counter, histogram
+from utils.tracing import span
+
+HTTP_REQUESTS = counter("http_requests_total", "HTTP requests made to the external APIs")
+HTTP_REQUEST_DURATION = histogram(
+    "http_request_duration_seconds", "Duration of the HTTP requests made to the external APIs"
+)
+RATE_LIMIT_WAIT = counter(
+    "rate_limit_wait_seconds_total", "Seconds waited after a rate limited (429) response"
+)
+# Requisições de snapshot para debug (logs/snapshot_request.txt)
+SNAPSHOT_REQUEST_LOG = side_file_logger("snapshot_request")
+
 with open("./static/stn_schema.json", "r") as f:
     stn_schema = json.load(f)
 
@@ -24,13 +38,25 @@ class apis:
             "key": self.api_key,
             "token": self.api_key,
         }
-        self.http_client = AsyncClient()
+        self.http_client = AsyncClient(
+            event_hooks={"request": [self._on_request], "response": [self._on_response]}
+        )
         self.default_headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3"
         }
         self.logger = logging.getLogger(__name__)
         self.last_snapshot_time = -1
 
+    async def _on_request(self, request):
+        request.extensions["started_at"] = time.perf_counter()
+
+    async def _on_response(self, response):
+        request = response.request
+        HTTP_REQUESTS.inc(api=request.url.host, status=response.status_code)
+        started_at = request.extensions.get("started_at")
+        if started_at is not None:
+            HTTP_REQUEST_DURATION.observe(time.perf_counter() - started_at, api=request.url.host)
+
     #
     # Backpack.tf APIs
     #
@@ -73,20 +99,25 @@ class apis:
 
         try:
             # Build the request URL
-            snap_request = await self.http_client.get(
-                "https://backpack.tf/api/classifieds/listings/snapshot",
-                params={"token": self.token, "sku": item_name, "appid": "440"},
-                headers=self.default_headers,
-            )
+            with span("http", api="backpack.tf") as http_span:
+                snap_request = await self.http_client.get(
+                    "https://backpack.tf/api/classifieds/listings/snapshot",
+                    params={"token": self.token, "sku": item_name, "appid": "440"},
+                    headers=self.default_headers,
+                )
+                if http_span is not None:
+                    http_span.set(status=snap_request.status_code)
             self.logger.debug(
-                f"URL: {snap_request.url}, Status Code: {snap_request.status_code}"
+                "URL: %s, Status Code: %s", snap_request.url, snap_request.status_code
             )
 
             # write the request in a file to debug
-            with open("logs/snapshot_request.txt", "a") as f:
-                f.write(
-                    f"Status Code: {snap_request.status_code} | item_name: {item_name}, URL: {snap_request.url}\n"
-                )
+            SNAPSHOT_REQUEST_LOG.info(
+                "Status Code: %s | item_name: %s, URL: %s",
+                snap_request.status_code,
+                item_name,
+                snap_request.url,
+            )
 
             if snap_request.status_code != 200:
                 self.logger.info(
@@ -96,11 +127,13 @@ class apis:
                     self.logger.info(
                         f"Rate limited to get snapshot for {item_name} url: {snap_request.url}"
                     )
-                    await sleep(5)
+                    RATE_LIMIT_WAIT.inc(5, api="backpack.tf")
+                    with span("rate_limit_wait", seconds=5):
+                        await sleep(5)
                 return None
 
             snapshot = snap_request.json()
-            self.logger.info(f"Snapshot for {item_name} fetched successfully")
+            self.logger.info("Snapshot for %s fetched successfully", item_name)
 
             if not snapshot:
                 self.logger.error(f"Failed to fetch snapshot for {item_name}")
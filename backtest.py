@@ -0,0 +1,211 @@
+"""
+Offline backtest of the buy parameters.
+
+Replays the restocks recorded in the Loot.Farm stock history (stock_history.StockHistory)
+against the cached Backpack.tf snapshots with the same rules as compare_items_prices
+(ignored items, item name normalization, pricing strategy, max_item_price, remaining money
+and profit_threshold), for every combination of the parameters, in a process pool.
+
+Usage (from the repository root):
+    python backtest.py --profit-threshold 0.05 0.1 0.2 --listing-quantity 1 2 3 \\
+        --max-item-price 0 10 --strategy mean median --days 90 --budget 100
+
+The snapshot cache only has the last snapshot of each item, so every restock is priced
+with it: the result is an estimate of the decisions, not of the past Backpack.tf prices.
+"""
+
+import argparse
+import itertools
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from stock_history import StockHistory
+from utils.decision_table import is_profitable, is_too_expensive
+from utils.item_filter import ItemFilter
+from utils.item_names import normalize_item_name
+from utils.load_config import load_config
+from utils.pricing_strategies import create_pricing_strategy
+from utils.snapshot_codec import decode_listings
+
+config = load_config("config.json")
+
+# Dados de cada processo do pool (carregados uma vez no initializer)
+_restocks = None
+_listings = None
+_prices = {}
+
+
+def load_restocks(conn: sqlite3.Connection, days: float, item_filter: ItemFilter) -> tuple[list, int]:
+    """
+    The restocks of the history as the bot would have scanned them.
+
+    Returns:
+        tuple[list, int]: (price in USD, items added, Backpack.tf name) ordered by time, and
+            the number of restocks skipped by the ignored items.
+    """
+    restocks = []
+    ignored = 0
+    for name, _, items_added, price in StockHistory(conn).restocks(days=days):
+        # o efeito dos unusual não está no histórico da loot.farm (mesma regra da varredura completa)
+        if name.startswith("Unusual") or item_filter.match(name, price):
+            ignored += 1
+            continue
+        restocks.append((price, items_added, normalize_item_name(name)))
+    return restocks, ignored
+
+
+def load_listings(conn: sqlite3.Connection) -> dict:
+    """Backpack.tf name -> listings of every cached snapshot, whatever its age."""
+    return {
+        name: decode_listings(listings)
+        for name, listings in conn.execute("SELECT name, listings FROM snapshot_results")
+    }
+
+
+def _init_worker(restocks: list, listings: dict) -> None:
+    global _restocks, _listings
+    _restocks = restocks
+    _listings = listings
+
+
+def _item_prices(strategy_options: dict, listing_quantity: int) -> dict:
+    """Price of every cached item with a strategy, shared by the runs of the same process."""
+    key = (tuple(sorted(strategy_options.items())), listing_quantity)
+    prices = _prices.get(key)
+    if prices is None:
+        strategy = create_pricing_strategy(strategy_options)
+        prices = _prices[key] = {
+            name: strategy.price(listings, listing_quantity) for name, listings in _listings.items()
+        }
+    return prices
+
+
+def run_backtest(parameters: dict) -> dict:
+    """
+    Replays every restock with one combination of the parameters.
+
+    Args:
+        parameters (dict): strategy (pricing_strategy options), listing_quantity,
+            profit_threshold, max_item_price and budget (0 means no limit).
+
+    Returns:
+        dict: The parameters and the result of the run.
+    """
+    prices = _item_prices(parameters["strategy"], parameters["listing_quantity"])
+    profit_threshold = parameters["profit_threshold"]
+    max_item_price = parameters["max_item_price"]
+    remaining_money = parameters["budget"] if parameters["budget"] > 0 else float("inf")
+
+    evaluated = unpriced = too_expensive = profitable = bought = 0
+    capital_used = estimated_profit = 0.0
+    for price, items_added, name in _restocks:
+        average_price = prices.get(name)
+        if average_price is None:
+            unpriced += 1
+            continue
+        evaluated += 1
+
+        if is_too_expensive(price, max_item_price, remaining_money):
+            too_expensive += 1
+            continue
+        if not is_profitable(price, average_price, profit_threshold):
+            continue
+
+        profitable += 1
+        # compra as unidades que o saldo permite
+        units = items_added
+        if price > 0 and remaining_money != float("inf"):
+            units = min(units, int(remaining_money // price))
+        bought += units
+        remaining_money -= units * price
+        capital_used += units * price
+        estimated_profit += units * (average_price - price)
+
+    return {
+        **parameters,
+        "evaluated": evaluated,
+        "unpriced": unpriced,
+        "too_expensive": too_expensive,
+        "profitable": profitable,
+        "hit_rate": profitable / evaluated if evaluated else 0.0,
+        "bought": bought,
+        "capital_used": round(capital_used, 2),
+        "estimated_profit": round(estimated_profit, 2),
+        "roi": estimated_profit / capital_used if capital_used else 0.0,
+    }
+
+
+def parameter_grid(args) -> list[dict]:
+    return [
+        {
+            "strategy": {"name": strategy},
+            "listing_quantity": listing_quantity,
+            "profit_threshold": profit_threshold,
+            "max_item_price": max_item_price,
+            "budget": args.budget,
+        }
+        # agrupado por estratégia e quantidade, os preços são calculados uma vez por processo
+        for strategy, listing_quantity, profit_threshold, max_item_price in itertools.product(
+            args.strategy, args.listing_quantity, args.profit_threshold, args.max_item_price
+        )
+    ]
+
+
+def format_report(results: list, top: int) -> str:
+    header = (
+        f"{'strategy':<14}{'qty':>4}{'threshold':>10}{'max price':>10}"
+        f"{'evaluated':>10}{'hit rate':>9}{'bought':>8}{'capital':>11}{'profit':>11}{'roi':>8}"
+    )
+    lines = [header, "-" * len(header)]
+    for result in sorted(results, key=lambda result: result["estimated_profit"], reverse=True)[:top]:
+        lines.append(
+            f"{result['strategy']['name']:<14}{result['listing_quantity']:>4}"
+            f"{result['profit_threshold']:>10.2f}{result['max_item_price']:>10.2f}"
+            f"{result['evaluated']:>10}{result['hit_rate']:>9.1%}{result['bought']:>8}"
+            f"{result['capital_used']:>11.2f}{result['estimated_profit']:>11.2f}{result['roi']:>8.1%}"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest the buy parameters on the recorded history.")
+    parser.add_argument("--db", default="main.db")
+    parser.add_argument("--days", type=float, default=90, help="Days of history to replay")
+    parser.add_argument("--profit-threshold", type=float, nargs="+", default=[config.get("profit_threshold", 0.1)])
+    parser.add_argument("--listing-quantity", type=int, nargs="+", default=[config.get("listing_quantity", 2)])
+    parser.add_argument("--max-item-price", type=float, nargs="+", default=[config.get("max_item_price", 0)])
+    parser.add_argument(
+        "--strategy",
+        nargs="+",
+        default=[(config.get("pricing_strategy") or {}).get("name", "mean")],
+        help="Pricing strategies (default parameters)",
+    )
+    parser.add_argument("--budget", type=float, default=0, help="Money available to buy, 0 for no limit")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    conn = sqlite3.connect(f"file:{args.db}?mode=ro", uri=True)
+    restocks, ignored = load_restocks(conn, args.days, ItemFilter.from_config(config.get("ignored_items", [])))
+    listings = load_listings(conn)
+    conn.close()
+    load_time = time.perf_counter() - start_time
+
+    grid = parameter_grid(args)
+    with ProcessPoolExecutor(
+        max_workers=args.workers, initializer=_init_worker, initargs=(restocks, listings)
+    ) as pool:
+        results = list(pool.map(run_backtest, grid, chunksize=max(len(grid) // (args.workers * 4), 1)))
+
+    print(
+        f"{len(restocks)} restocks in {args.days:g} days ({ignored} ignored), {len(listings)} cached snapshots, "
+        f"{len(grid)} configurations in {time.perf_counter() - start_time:.1f}s (load {load_time:.1f}s)\n"
+    )
+    print(format_report(results, args.top))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Checks that utils.item_names.normalize_item_name gives the same names as the inline rules
+of compare_items_prices and times both over every loot_farm_inventory name.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_item_names [path/to/main.db]
+"""
+
+import sqlite3
+import sys
+import time
+
+from utils.item_names import clear_name_cache, name_cache_info, normalize_item_name
+
+# Efeito usado nos itens Unusual, como se o item tivesse o anexo do efeito
+UNUSUAL_EFFECT = "Burning Flames"
+
+
+def legacy_normalize(item_name, unusual_effect):
+    """The compare_items_prices rules before utils.item_names."""
+    if (
+        item_name.startswith(
+            ("Professional Killstreak", "Killstreak", "Specialized Killstreak")
+        )
+        and item_name.endswith("Kit")
+    ) or item_name.endswith("Unusualifier"):
+        item_name = f"Non-Craftable {item_name}"
+    elif " Series" in item_name:
+        item_name = item_name.replace(" Series", "")
+    elif unusual_effect:
+        item_name = item_name.replace("Unusual", unusual_effect)
+    elif "#" in item_name:
+        item_name = item_name.replace("#", "%23")
+    return item_name
+
+
+def time_per_name(func, items, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        for item_name, unusual_effect in items:
+            func(item_name, unusual_effect)
+        best = min(best, time.perf_counter() - start_time)
+    return best / len(items)
+
+
+def main():
+    db_path = sys.argv[1] if len(sys.argv) > 1 else "main.db"
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    names = [name for (name,) in conn.execute("SELECT name FROM loot_farm_inventory")]
+    conn.close()
+
+    items = [
+        (name, UNUSUAL_EFFECT if name.startswith("Unusual") else None) for name in names
+    ]
+
+    mismatches = [item for item in items if legacy_normalize(*item) != normalize_item_name(*item)]
+    renamed = sum(1 for item in items if normalize_item_name(*item) != item[0])
+    print(f"{len(items)} names, {renamed} renamed, {len(items) - len(mismatches)}/{len(items)} match the inline rules")
+    assert not mismatches, mismatches[:5]
+
+    legacy_time = time_per_name(legacy_normalize, items)
+
+    clear_name_cache()
+    start_time = time.perf_counter()
+    for item in items:
+        normalize_item_name(*item)
+    cold_time = (time.perf_counter() - start_time) / len(items)
+    warm_time = time_per_name(normalize_item_name, items)
+
+    print(f"\ninline rules:     {legacy_time * 1e9:8.0f} ns/name ({1 / legacy_time / 1e6:.2f} M names/s)")
+    print(f"memo, cold cache: {cold_time * 1e9:8.0f} ns/name ({1 / cold_time / 1e6:.2f} M names/s)")
+    print(f"memo, warm cache: {warm_time * 1e9:8.0f} ns/name ({1 / warm_time / 1e6:.2f} M names/s)")
+    print(f"\n{name_cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
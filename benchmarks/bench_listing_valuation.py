@@ -0,0 +1,83 @@
+"""
+Times a currency rate change over the whole snapshot cache: per listing Python
+revaluation + sort/average per item vs utils.listing_valuation (NumPy).
+
+Usage (from the repository root):
+    python -m benchmarks.bench_listing_valuation [path/to/main.db]
+
+main.db is copied to memory and migrated there, the file is never changed.
+"""
+
+import math
+import sqlite3
+import sys
+import time
+
+from db_migrations import run_migrations
+from utils.listing_valuation import ListingValuation
+from utils.snapshot_aggregates import top_listings_average
+from utils.snapshot_codec import decode_listings
+
+LISTING_QUANTITY = 3
+RATES = [(0.04, 2.56), (0.041, 2.58), (0.039, 2.55)]
+
+
+def python_revalue(snapshots, refined_to_usd, key_to_usd):
+    averages = {}
+    for name, listings in snapshots.items():
+        revalued = [
+            listing._replace(
+                usd_estimated=listing.price * refined_to_usd
+                if listing.price is not None and listing.price > 0
+                else listing.keys * key_to_usd + listing.metal * refined_to_usd
+            )
+            for listing in listings
+        ]
+        average = top_listings_average(revalued, LISTING_QUANTITY)
+        if average is not None:
+            averages[name] = average
+    return averages
+
+
+def main():
+    db_path = sys.argv[1] if len(sys.argv) > 1 else "main.db"
+    conn = sqlite3.connect(":memory:")
+    source = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    source.backup(conn)
+    source.close()
+    run_migrations(conn)
+
+    snapshots = {
+        name: decode_listings(listings)
+        for name, listings in conn.execute("SELECT name, listings FROM snapshot_results")
+    }
+
+    valuation = ListingValuation()
+    start_time = time.perf_counter()
+    valuation.load(conn.cursor())
+    load_time = time.perf_counter() - start_time
+
+    python_times, numpy_times = [], []
+    for refined_to_usd, key_to_usd in RATES:
+        start_time = time.perf_counter()
+        expected = python_revalue(snapshots, refined_to_usd, key_to_usd)
+        python_times.append(time.perf_counter() - start_time)
+
+        start_time = time.perf_counter()
+        valuation.revalue(refined_to_usd, key_to_usd)
+        averages = valuation.top_n_averages(LISTING_QUANTITY)
+        numpy_times.append(time.perf_counter() - start_time)
+
+        # Paridade com o cálculo em Python
+        assert expected.keys() == averages.keys()
+        for name, average in expected.items():
+            assert math.isclose(average, averages[name], rel_tol=1e-9), name
+
+    print(f"{len(snapshots)} snapshots, {len(valuation)} listings from {db_path}\n")
+    print(f"columnar load: {load_time * 1e3:.2f} ms (once)")
+    print(f"rate tick, python per listing: {min(python_times) * 1e3:.2f} ms")
+    print(f"rate tick, numpy vectorized:   {min(numpy_times) * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
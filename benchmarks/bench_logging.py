@@ -0,0 +1,85 @@
+"""
+Time spent in the caller by the logger.info calls of the per-item loops, the old
+synchronous file handler vs the queue handler of utils.config_logger (the records are
+formatted and written by the listener thread).
+
+The records are logged in bursts (one scanned page) with a pause between them, like the
+event loop waiting for the next page, and only the time inside the bursts is counted.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_logging [bursts] [records per burst]
+"""
+
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from utils.config_logger import JsonFormatter, LogPipeline
+
+ITEM_NAME = "Strange Professional Killstreak Rocket Launcher"
+# Pausa entre as páginas
+BURST_PAUSE = 0.01
+
+
+def time_per_record(logger, bursts, burst_size):
+    elapsed = 0
+    for burst in range(bursts):
+        start_time = time.perf_counter()
+        for index in range(burst_size):
+            logger.info("Item %s stored (%d)", ITEM_NAME, index)
+        elapsed += time.perf_counter() - start_time
+        time.sleep(BURST_PAUSE)
+    return elapsed / (bursts * burst_size)
+
+
+def make_logger(name, handler):
+    logger = logging.getLogger(name)
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(handler)
+    return logger
+
+
+def main():
+    bursts = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    burst_size = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    records = bursts * burst_size
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # null handler: só o custo de criar o LogRecord
+        null_time = time_per_record(make_logger("bench.null", logging.NullHandler()), bursts, burst_size)
+
+        # antes: o root logger formata e escreve no arquivo em cada chamada
+        file_handler = logging.FileHandler(os.path.join(tmp_dir, "sync.txt"))
+        file_handler.setFormatter(
+            logging.Formatter("%(asctime)s [%(levelname)s] %(message)s", datefmt="%Y-%m-%d %H:%M:%S")
+        )
+        sync_time = time_per_record(make_logger("bench.sync", file_handler), bursts, burst_size)
+        file_handler.close()
+
+        pipeline = LogPipeline(queue_size=records + 1)
+        json_handler = logging.FileHandler(os.path.join(tmp_dir, "bot.jsonl"))
+        json_handler.setFormatter(JsonFormatter())
+        pipeline.set_handlers([json_handler])
+
+        queue_logger = make_logger("bench.queue", pipeline.queue_handler)
+        queue_time = time_per_record(queue_logger, bursts, burst_size)
+        pipeline.stop()
+
+        queue_logger.setLevel(logging.WARNING)
+        disabled_time = time_per_record(queue_logger, bursts, burst_size)
+
+        with open(os.path.join(tmp_dir, "bot.jsonl")) as f:
+            written = sum(1 for _ in f)
+
+    print(f"{records} records in {bursts} bursts, {written} written by the listener")
+    print(f"\nLogRecord only:     {null_time * 1e6:7.2f} us/record")
+    print(f"sync file handler:  {sync_time * 1e6:7.2f} us/record in the caller")
+    print(f"queue handler:      {queue_time * 1e6:7.2f} us/record in the caller")
+    print(f"level disabled:     {disabled_time * 1e6:7.2f} us/record")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Checks that the mean strategy gives the same price as the old sort + average and
+times every pricing strategy against a full sort.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_pricing_strategies [path/to/main.db]
+"""
+
+import json
+import random
+import sqlite3
+import sys
+import time
+
+from utils.pricing_strategies import PRICING_STRATEGIES
+from utils.snapshot_codec import decode_listings
+
+LISTING_QUANTITY = 3
+# Tamanho dos snapshots sintéticos de itens populares (centenas de listings)
+LARGE_SNAPSHOT_SIZE = 500
+
+
+def legacy_average(listings, listing_quantity):
+    """The compare_items_prices implementation before the strategies (legacy dict listings)."""
+    listings.sort(key=lambda x: x["price"])
+    top_listings = listings[:listing_quantity]
+    return sum([listing["usd_estimated"] for listing in top_listings]) / len(top_listings)
+
+
+def time_per_snapshot(func, snapshots, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        for listings in snapshots:
+            func(listings)
+        best = min(best, time.perf_counter() - start_time)
+    return best / len(snapshots)
+
+
+def main():
+    db_path = sys.argv[1] if len(sys.argv) > 1 else "main.db"
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    rows = [listings for (listings,) in conn.execute("SELECT listings FROM snapshot_results")]
+    conn.close()
+
+    snapshots = [decode_listings(listings) for listings in rows]
+    legacy_snapshots = [
+        json.loads(listings) if isinstance(listings, str) else [listing._asdict() for listing in snapshot]
+        for listings, snapshot in zip(rows, snapshots)
+    ]
+
+    # Paridade da estratégia padrão com o comportamento antigo
+    mean_strategy = PRICING_STRATEGIES["mean"]()
+    mismatches = 0
+    for legacy_listings, listings in zip(legacy_snapshots, snapshots):
+        if any(listing["price"] is None for listing in legacy_listings):
+            continue
+        if legacy_average(list(legacy_listings), LISTING_QUANTITY) != mean_strategy.price(
+            listings, LISTING_QUANTITY
+        ):
+            mismatches += 1
+    print(f"mean strategy parity: {len(snapshots) - mismatches}/{len(snapshots)} snapshots match")
+    assert mismatches == 0
+
+    # Snapshots grandes montados com as listings de todos os snapshots embaralhadas
+    pool = [listing for listings in snapshots for listing in listings if listing.price is not None]
+    random.Random(0).shuffle(pool)
+    large_snapshots = [
+        pool[start : start + LARGE_SNAPSHOT_SIZE]
+        for start in range(0, len(pool) - LARGE_SNAPSHOT_SIZE + 1, LARGE_SNAPSHOT_SIZE)
+    ]
+    large_legacy_snapshots = [
+        [listing._asdict() for listing in listings] for listings in large_snapshots
+    ]
+
+    print(f"\n{'strategy':<16}{'cached (us)':>14}{f'{LARGE_SNAPSHOT_SIZE} listings (us)':>22}")
+    legacy_times = [
+        time_per_snapshot(lambda listings: legacy_average(list(listings), LISTING_QUANTITY), data)
+        for data in (legacy_snapshots, large_legacy_snapshots)
+    ]
+    print(f"{'legacy sort':<16}{legacy_times[0] * 1e6:>14.2f}{legacy_times[1] * 1e6:>22.2f}")
+    for name, strategy_class in PRICING_STRATEGIES.items():
+        strategy = strategy_class()
+        strategy_times = [
+            time_per_snapshot(lambda listings: strategy.price(listings, LISTING_QUANTITY), data)
+            for data in (snapshots, large_snapshots)
+        ]
+        print(f"{name:<16}{strategy_times[0] * 1e6:>14.2f}{strategy_times[1] * 1e6:>22.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Compares the legacy dict based reformat_snapshot with utils.listings.reformat_listings.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_reformat_snapshot [path/to/main.db]
+
+Snapshot payloads are rebuilt from the legacy JSON rows of snapshot_results (they keep the
+raw item of every listing), with a sell copy of each listing added so the intent filter has
+work to do like in a real Backpack.tf response.
+"""
+
+import json
+import sqlite3
+import sys
+import time
+import tracemalloc
+
+from static.defindexes import spells, strange_part_defindexes, strange_parts
+from utils.listings import reformat_listings
+
+REFINED_TO_USD = 0.04
+KEY_TO_USD = 2.56
+
+
+def legacy_reformat_snapshot(payload):
+    """The reformat_snapshot implementation before the Listing records."""
+    formatted_listings = []
+
+    for listing in payload.get("listings", []):
+        intent = listing.get("intent", "sell")
+        only_buyout = listing.get("buyout", True)
+        if intent == "sell" or only_buyout == 0:
+            continue
+
+        has_spell_or_strange_part = False
+        if "item" in listing and "attributes" in listing["item"]:
+            for attribute in listing["item"]["attributes"]:
+                defindex = int(attribute.get("defindex", -1))
+                float_value = float(attribute.get("float_value", -1))
+                if defindex in spells:
+                    has_spell_or_strange_part = True
+                    break
+                if defindex in strange_part_defindexes and float_value in strange_parts:
+                    has_spell_or_strange_part = True
+                    break
+        if has_spell_or_strange_part:
+            continue
+
+        currencies = listing.get("currencies", {})
+        listed_at = listing.get("timestamp", int(time.time()))
+        price = listing.get("price", None)
+        refined_metal_lootfarm_sell_price = REFINED_TO_USD
+
+        if price is not None and price > 0:
+            usd_estimated = float(price) * float(refined_metal_lootfarm_sell_price)
+        else:
+            usd_estimated = float(currencies.get("keys", 0.0)) * KEY_TO_USD + float(
+                currencies.get("metal", 0.0)
+            ) * float(refined_metal_lootfarm_sell_price)
+
+        formatted_listings.append(
+            {
+                "steamid": listing.get("steamid", 0),
+                "currencies": currencies,
+                "usd_estimated": usd_estimated,
+                "trade_offers_preferred": listing.get("offers"),
+                "bumped_at": listing.get("bump", listed_at),
+                "intent": intent,
+                "only_buyout": only_buyout,
+                "price": price,
+                "listed_at": listed_at,
+                "item": listing.get("item", {}),
+            }
+        )
+
+    return formatted_listings
+
+
+def load_payloads(db_path):
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    payloads = []
+    for (listings,) in conn.execute(
+        "SELECT listings FROM snapshot_results WHERE typeof(listings) = 'text'"
+    ):
+        raw_listings = []
+        for listing in json.loads(listings):
+            raw_listing = {
+                "steamid": listing["steamid"],
+                "currencies": listing["currencies"],
+                "intent": listing["intent"],
+                "buyout": listing["only_buyout"],
+                "offers": listing["trade_offers_preferred"],
+                "timestamp": listing["listed_at"],
+                "bump": listing["bumped_at"],
+                "price": listing["price"],
+                "item": listing["item"],
+            }
+            raw_listings.append(raw_listing)
+            raw_listings.append({**raw_listing, "intent": "sell"})
+        payloads.append({"listings": raw_listings})
+    conn.close()
+    return payloads
+
+
+def measure(func, payloads, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        for payload in payloads:
+            func(payload)
+        best = min(best, time.perf_counter() - start_time)
+
+    tracemalloc.start()
+    results = [func(payload) for payload in payloads]
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best / len(payloads), retained / len(payloads), results
+
+
+def main():
+    db_path = sys.argv[1] if len(sys.argv) > 1 else "main.db"
+    payloads = load_payloads(db_path)
+    if not payloads:
+        print(f"No legacy JSON snapshots found in {db_path}")
+        return
+
+    listing_count = sum(len(payload["listings"]) for payload in payloads)
+    legacy_time, legacy_memory, legacy_results = measure(
+        legacy_reformat_snapshot, payloads
+    )
+    new_time, new_memory, new_results = measure(
+        lambda payload: reformat_listings(
+            payload["listings"], REFINED_TO_USD, KEY_TO_USD
+        ),
+        payloads,
+    )
+
+    # Paridade: mesmas listings, mesmos preços
+    for legacy, new in zip(legacy_results, new_results):
+        assert [(listing["price"], listing["usd_estimated"]) for listing in legacy] == [
+            (listing.price, listing.usd_estimated) for listing in new
+        ]
+
+    print(f"{len(payloads)} snapshots, {listing_count} raw listings from {db_path}\n")
+    print(f"{'path':<12}{'time/snapshot (us)':>20}{'retained/snapshot (bytes)':>28}")
+    print(f"{'legacy dict':<12}{legacy_time * 1e6:>20.1f}{legacy_memory:>28.0f}")
+    print(f"{'Listing':<12}{new_time * 1e6:>20.1f}{new_memory:>28.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Compares the legacy JSON snapshot listings with the compact utils.snapshot_codec format.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_snapshot_codec [path/to/main.db]
+
+The database is opened read only, rows already stored in the compact format are decoded
+back to JSON text first so the comparison is always against the legacy format.
+"""
+
+import json
+import sqlite3
+import sys
+import time
+
+from utils import snapshot_codec
+from utils.snapshot_codec import decode_listings, encode_listings
+
+
+def load_legacy_rows(db_path):
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    rows = []
+    for (listings,) in conn.execute("SELECT listings FROM snapshot_results"):
+        if isinstance(listings, bytes):
+            listings = json.dumps([listing._asdict() for listing in decode_listings(listings)])
+        rows.append(listings)
+    conn.close()
+    return rows
+
+
+def time_per_call(func, values, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        for value in values:
+            func(value)
+        best = min(best, time.perf_counter() - start_time)
+    return best / len(values)
+
+
+def main():
+    db_path = sys.argv[1] if len(sys.argv) > 1 else "main.db"
+    legacy_rows = load_legacy_rows(db_path)
+    if not legacy_rows:
+        print(f"No snapshots found in {db_path}")
+        return
+
+    legacy_bytes = sum(len(row.encode()) for row in legacy_rows)
+    legacy_decode = time_per_call(json.loads, legacy_rows)
+
+    print(f"{len(legacy_rows)} snapshots from {db_path}\n")
+    print(f"{'format':<16}{'bytes on disk':>16}{'ratio':>10}{'decode/hit (us)':>18}")
+    print(f"{'legacy json':<16}{legacy_bytes:>16}{1:>10.2f}{legacy_decode * 1e6:>18.1f}")
+
+    for serializer_id in sorted(snapshot_codec._serializers):
+        name = snapshot_codec._serializers[serializer_id][0]
+        encoded_rows = [
+            encode_listings(json.loads(row), serializer=name) for row in legacy_rows
+        ]
+        encoded_bytes = sum(len(row) for row in encoded_rows)
+        decode = time_per_call(decode_listings, encoded_rows)
+        print(
+            f"{'compact ' + name:<16}{encoded_bytes:>16}{encoded_bytes / legacy_bytes:>10.2f}{decode * 1e6:>18.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
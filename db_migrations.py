@@ -0,0 +1,462 @@
+import json
+import logging
+import sqlite3
+import statistics
+import struct
+import zlib
+from datetime import datetime
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+# Formato antigo usado para salvar as datas como texto
+LEGACY_TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# As migrações não importam o código do bot: uma migração publicada tem que continuar
+# gerando o mesmo banco mesmo que utils.snapshot_codec ou utils.snapshot_aggregates mudem.
+
+# Formato versão 1 das listings do snapshot_results (utils.snapshot_codec)
+SNAPSHOT_HEADER = struct.Struct("<BB")
+SNAPSHOT_SCHEMA_VERSION = 1
+SNAPSHOT_SERIALIZER_JSON = 0
+SNAPSHOT_SERIALIZER_MSGPACK = 1
+# Quantidade de listings do top_avg_usd (utils.snapshot_aggregates.DEFAULT_TOP_N)
+SNAPSHOT_TOP_N = 3
+
+
+def epoch_from_legacy_timestamp(value):
+    """
+    Converts a legacy timestamp value to integer epoch seconds.
+
+    Args:
+        value (str | int | float | None): The stored value, usually a local-time
+            "%Y-%m-%d %H:%M:%S" string written by older versions of the bot.
+
+    Returns:
+        int: The epoch time in seconds or None if the value can't be parsed.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    try:
+        return int(datetime.strptime(value, LEGACY_TIMESTAMP_FORMAT).timestamp())
+    except (TypeError, ValueError):
+        return None
+
+
+def _listing_row(listing) -> tuple:
+    """(price, keys, metal, usd_estimated, bumped_at, steamid) of a legacy listing dict."""
+    if not isinstance(listing, dict):
+        return tuple(listing)
+    currencies = listing.get("currencies") or {}
+    return (
+        listing.get("price"),
+        currencies.get("keys", listing.get("keys", 0)),
+        currencies.get("metal", listing.get("metal", 0)),
+        listing.get("usd_estimated"),
+        listing.get("bumped_at"),
+        listing.get("steamid"),
+    )
+
+
+def _decode_snapshot_listings(value) -> list[tuple]:
+    """Listing rows of the legacy JSON text or of the version 1 binary format."""
+    if isinstance(value, str):
+        return [_listing_row(listing) for listing in json.loads(value)]
+
+    schema_version, serializer_id = SNAPSHOT_HEADER.unpack_from(value)
+    if schema_version != SNAPSHOT_SCHEMA_VERSION:
+        raise ValueError(f"Unsupported snapshot schema version: {schema_version}")
+    payload = zlib.decompress(memoryview(value)[SNAPSHOT_HEADER.size :])
+    if serializer_id == SNAPSHOT_SERIALIZER_JSON:
+        rows = json.loads(payload)
+    elif serializer_id == SNAPSHOT_SERIALIZER_MSGPACK and msgpack is not None:
+        rows = msgpack.unpackb(payload)
+    else:
+        raise ValueError(f"Unknown snapshot serializer id: {serializer_id}")
+    return [
+        (price, keys, metal, usd_estimated, bumped_at, str(steamid) if steamid is not None else None)
+        for price, keys, metal, usd_estimated, bumped_at, steamid in rows
+    ]
+
+
+def _encode_snapshot_listings(rows: list[tuple]) -> bytes:
+    """Version 1 binary format, msgpack when installed and json otherwise."""
+    encoded_rows = []
+    for row in rows:
+        row = list(row)
+        if isinstance(row[-1], str) and row[-1].isdigit():
+            row[-1] = int(row[-1])
+        encoded_rows.append(row)
+
+    if msgpack is not None:
+        serializer_id, payload = SNAPSHOT_SERIALIZER_MSGPACK, msgpack.packb(encoded_rows)
+    else:
+        serializer_id = SNAPSHOT_SERIALIZER_JSON
+        payload = json.dumps(encoded_rows, separators=(",", ":")).encode()
+    return SNAPSHOT_HEADER.pack(SNAPSHOT_SCHEMA_VERSION, serializer_id) + zlib.compress(payload, 6)
+
+
+def _snapshot_aggregates(rows: list[tuple], top_n: int = SNAPSHOT_TOP_N) -> tuple:
+    """
+    (listing_count, min_price, median_usd, top_n, top_avg_usd, freshest_bump) of the
+    listing rows, top_avg_usd being the mean usd_estimated of the top_n cheapest listings.
+    """
+    prices = [row[0] for row in rows if row[0] is not None]
+    usd_values = [row[3] for row in rows if row[3] is not None]
+    bumps = [row[4] for row in rows if row[4]]
+    cheapest = sorted((row for row in rows if row[0] is not None), key=lambda row: row[0])[:top_n]
+    top_values = [row[3] for row in cheapest if row[3] is not None]
+
+    return (
+        len(rows),
+        min(prices) if prices else None,
+        statistics.median(usd_values) if usd_values else None,
+        top_n,
+        sum(top_values) / len(top_values) if top_values else None,
+        max(bumps) if bumps else None,
+    )
+
+
+def _column_type(cursor, table_name, column_name):
+    cursor.execute(f"PRAGMA table_info({table_name})")
+    for column in cursor.fetchall():
+        if column[1] == column_name:
+            return column[2].upper()
+    return None
+
+
+def _rebuild_table(cursor, table_name, create_sql, columns, converted_column):
+    """
+    Recreates a table with a new definition, copying every row and converting
+    one column with epoch_from_legacy_timestamp.
+    """
+    new_table = f"{table_name}_new"
+    column_list = ", ".join(columns)
+    select_list = ", ".join(
+        f"epoch_from_legacy_timestamp({column})"
+        if column == converted_column
+        else column
+        for column in columns
+    )
+
+    cursor.execute(f"DROP TABLE IF EXISTS {new_table}")
+    cursor.execute(create_sql.format(table_name=new_table))
+    cursor.execute(
+        f"INSERT INTO {new_table} ({column_list}) SELECT {select_list} FROM {table_name}"
+    )
+    cursor.execute(f"DROP TABLE {table_name}")
+    cursor.execute(f"ALTER TABLE {new_table} RENAME TO {table_name}")
+
+
+def _migration_001_epoch_timestamps(cursor):
+    """Stores freshness timestamps as indexed integer epoch seconds."""
+
+    if _column_type(cursor, "currencies_prices", "fetchedAt") != "INTEGER":
+        _rebuild_table(
+            cursor,
+            "currencies_prices",
+            """
+            CREATE TABLE {table_name} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT,
+                price REAL,
+                intent TEXT,
+                diff REAL,
+                currency TEXT,
+                fetchedAt INTEGER,
+                origin TEXT
+            )
+            """,
+            ["id", "name", "price", "intent", "diff", "currency", "fetchedAt", "origin"],
+            "fetchedAt",
+        )
+
+    if _column_type(cursor, "api_call_log", "fetchedAt") != "INTEGER":
+        _rebuild_table(
+            cursor,
+            "api_call_log",
+            """
+            CREATE TABLE {table_name} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                endpoint TEXT UNIQUE,
+                fetchedAt INTEGER
+            )
+            """,
+            ["id", "endpoint", "fetchedAt"],
+            "fetchedAt",
+        )
+
+    if _column_type(cursor, "snapshot_results", "fetched_at") != "INTEGER":
+        _rebuild_table(
+            cursor,
+            "snapshot_results",
+            """
+            CREATE TABLE {table_name} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT UNIQUE,
+                steam_appid INTEGER,
+                listings TEXT,
+                fetched_at INTEGER
+            )
+            """,
+            ["id", "name", "steam_appid", "listings", "fetched_at"],
+            "fetched_at",
+        )
+
+    # Índices para as consultas de validade (TTL) e limpeza por data
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS snapshot_results_name_index ON snapshot_results (name)"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS snapshot_results_fetched_at_index ON snapshot_results (fetched_at)"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS api_call_log_fetchedAt_index ON api_call_log (fetchedAt)"
+    )
+    cursor.execute(
+        """
+        CREATE INDEX IF NOT EXISTS currencies_prices_lookup_index
+        ON currencies_prices (name, origin, currency, intent, fetchedAt)
+        """
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS currencies_prices_fetchedAt_index ON currencies_prices (fetchedAt)"
+    )
+
+
+def _migration_002_rename_comparison_results(cursor):
+    """
+    Moves the comparison_results table left over from the MongoDB comparison script out of
+    the way of the bot. The rows are kept in comparison_results_legacy.
+    """
+
+    cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'comparison_results'"
+    )
+    if cursor.fetchone():
+        cursor.execute("ALTER TABLE comparison_results RENAME TO comparison_results_legacy")
+
+
+def _migration_003_incremental_auto_vacuum(cursor):
+    """
+    Enables incremental auto_vacuum so the retention job can give free pages
+    back to the file system without a full VACUUM on every run.
+    The mode only takes effect after a VACUUM, so this migration runs outside a transaction.
+    """
+
+    cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    cursor.execute("VACUUM")
+
+
+def _migration_004_encode_snapshot_listings(cursor):
+    """Re-encodes the legacy JSON snapshot listings in the compact binary format."""
+
+    cursor.execute(
+        "SELECT id, listings FROM snapshot_results WHERE typeof(listings) = 'text'"
+    )
+    rows = cursor.fetchall()
+    for row_id, listings_json in rows:
+        try:
+            encoded = _encode_snapshot_listings(_decode_snapshot_listings(listings_json))
+        except (TypeError, ValueError, AttributeError):
+            # linha corrompida, o cache será buscado novamente
+            cursor.execute("DELETE FROM snapshot_results WHERE id = ?", (row_id,))
+            continue
+        cursor.execute(
+            "UPDATE snapshot_results SET listings = ? WHERE id = ?", (encoded, row_id)
+        )
+
+
+def _migration_005_snapshot_listings_table(cursor):
+    """
+    Stores every cached listing in the indexed snapshot_listings table and the
+    price aggregates (computed at ingest) next to each snapshot_results row.
+    """
+
+    cursor.execute("PRAGMA table_info(snapshot_results)")
+    existing_columns = {column[1] for column in cursor.fetchall()}
+    for column, column_type in (
+        ("listing_count", "INTEGER"),
+        ("min_price", "REAL"),
+        ("median_usd", "REAL"),
+        ("top_n", "INTEGER"),
+        ("top_avg_usd", "REAL"),
+        ("freshest_bump", "INTEGER"),
+    ):
+        if column not in existing_columns:
+            cursor.execute(
+                f"ALTER TABLE snapshot_results ADD COLUMN {column} {column_type}"
+            )
+
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS snapshot_listings (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            price REAL,
+            keys REAL,
+            metal REAL,
+            usd_estimated REAL,
+            bumped_at INTEGER,
+            steamid TEXT
+        )
+        """
+    )
+    # Índice de cobertura: "média das N primeiras listings" é uma única busca no índice
+    cursor.execute(
+        """
+        CREATE INDEX IF NOT EXISTS snapshot_listings_name_price_index
+        ON snapshot_listings (name, price, usd_estimated)
+        """
+    )
+    # Remove as listings quando o snapshot é removido (retenção, limite de tamanho)
+    cursor.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS snapshot_results_delete_listings
+        AFTER DELETE ON snapshot_results
+        BEGIN
+            DELETE FROM snapshot_listings WHERE name = OLD.name;
+        END
+        """
+    )
+
+    cursor.execute("SELECT name, listings FROM snapshot_results")
+    for item_name, listings in cursor.fetchall():
+        rows = _decode_snapshot_listings(listings)
+        cursor.execute("DELETE FROM snapshot_listings WHERE name = ?", (item_name,))
+        cursor.executemany(
+            """
+            INSERT INTO snapshot_listings (name, price, keys, metal, usd_estimated, bumped_at, steamid)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            [(item_name, *row) for row in rows],
+        )
+        cursor.execute(
+            """
+            UPDATE snapshot_results
+            SET listing_count = ?, min_price = ?, median_usd = ?, top_n = ?, top_avg_usd = ?, freshest_bump = ?
+            WHERE name = ?
+            """,
+            (*_snapshot_aggregates(rows), item_name),
+        )
+
+
+def _migration_006_restock_events(cursor):
+    # Histórico de restocks usado pela cadência de leitura da página (utils.poll_scheduler)
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS restock_events (
+            id INTEGER PRIMARY KEY,
+            detected_at INTEGER NOT NULL,
+            items INTEGER NOT NULL
+        )
+        """
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS restock_events_detected_at_index ON restock_events (detected_at)"
+    )
+
+
+def _migration_007_loot_farm_history(cursor):
+    # Nomes dos itens guardados uma vez só, o histórico usa o id
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS loot_farm_items (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        )
+        """
+    )
+    # Só as mudanças de estado de cada item (stock_history.StockHistory)
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS loot_farm_history (
+            item_id INTEGER NOT NULL,
+            recorded_at INTEGER NOT NULL,
+            price_cents INTEGER NOT NULL,
+            have INTEGER NOT NULL,
+            max INTEGER NOT NULL,
+            rate REAL,
+            PRIMARY KEY (item_id, recorded_at)
+        ) WITHOUT ROWID
+        """
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS loot_farm_history_recorded_at_index ON loot_farm_history (recorded_at)"
+    )
+
+
+def _migration_008_drop_snapshot_listings(cursor):
+    """
+    Drops the snapshot_listings table created by migration 005: the listings are only
+    kept in the snapshot_results blob, next to the aggregates columns. The free pages are
+    given back by the incremental vacuum of the retention job.
+    """
+    cursor.execute("DROP TRIGGER IF EXISTS snapshot_results_delete_listings")
+    cursor.execute("DROP INDEX IF EXISTS snapshot_listings_name_price_index")
+    cursor.execute("DROP TABLE IF EXISTS snapshot_listings")
+
+
+# Lista ordenada de migrações: (versão, descrição, função, roda em transação)
+# Nunca altere uma migração já publicada, adicione uma nova no final da lista
+MIGRATIONS = [
+    (1, "epoch integer timestamps", _migration_001_epoch_timestamps, True),
+    (2, "keep legacy comparison_results as comparison_results_legacy", _migration_002_rename_comparison_results, True),
+    (3, "incremental auto_vacuum", _migration_003_incremental_auto_vacuum, False),
+    (4, "compact snapshot listings", _migration_004_encode_snapshot_listings, True),
+    (5, "snapshot_listings table and aggregates", _migration_005_snapshot_listings_table, True),
+    (6, "restock_events table", _migration_006_restock_events, True),
+    (7, "loot_farm_history time series", _migration_007_loot_farm_history, True),
+    (8, "drop snapshot_listings table", _migration_008_drop_snapshot_listings, True),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def run_migrations(conn: sqlite3.Connection) -> int:
+    """
+    Applies every pending migration to the database, each one inside its own
+    transaction (except the ones that need to run outside, like VACUUM).
+    The current version is tracked with PRAGMA user_version.
+
+    Args:
+        conn (sqlite3.Connection): The connection to main.db.
+
+    Returns:
+        int: The schema version after the migrations.
+    """
+    conn.create_function(
+        "epoch_from_legacy_timestamp", 1, epoch_from_legacy_timestamp, deterministic=True
+    )
+    current_version = get_schema_version(conn)
+
+    for version, description, migration, in_transaction in MIGRATIONS:
+        if version <= current_version:
+            continue
+
+        logger.info(f"Applying database migration {version}: {description}")
+        conn.commit()
+        cursor = conn.cursor()
+        try:
+            if in_transaction:
+                cursor.execute("BEGIN")
+            migration(cursor)
+            cursor.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            logger.error(f"Database migration {version} failed", exc_info=True)
+            raise
+        current_version = version
+
+    return current_version
@@ -0,0 +1,246 @@
+import logging
+import sqlite3
+import time
+
+DAY_SECONDS = 24 * 3600
+
+# Política padrão de retenção, pode ser sobrescrita pela chave "db_retention" do config.json
+DEFAULT_RETENTION_POLICY = {
+    # dias de histórico de preços de moedas mantidos (0 = sem limite)
+    "currency_history_days": 30,
+    # depois de quantos dias o histórico de moedas é reduzido para 1 registro por dia (0 = desativado)
+    "currency_downsample_after_days": 7,
+    # snapshots mais antigos do que isso são removidos, mesmo que nunca tenham sido usados de novo
+    "snapshot_hard_ttl_hours": 24,
+    # tamanho máximo do banco de dados (0 = sem limite)
+    "max_db_size_mb": 50,
+    # intervalo entre as execuções da retenção
+    "vacuum_interval_minutes": 60,
+    # dias de histórico de restocks mantidos (0 = sem limite)
+    "restock_history_days": 28,
+    # dias de histórico do estoque da loot.farm mantidos (0 = sem limite)
+    "stock_history_days": 180,
+}
+
+
+class DBRetention:
+    """
+    Keeps main.db bounded on long-running installs: prunes and downsamples the
+    currency history, evicts expired snapshots, enforces the size budget and
+    gives the freed pages back with an incremental vacuum.
+    """
+
+    # Quantidade de snapshots removidos por rodada ao aplicar o limite de tamanho
+    EVICTION_BATCH_SIZE = 50
+
+    def __init__(self, conn: sqlite3.Connection, policy: dict = None):
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self.logger = logging.getLogger(__name__)
+        self.policy = {**DEFAULT_RETENTION_POLICY, **(policy or {})}
+
+    @property
+    def interval_seconds(self) -> float:
+        return max(float(self.policy["vacuum_interval_minutes"]), 1.0) * 60
+
+    def prune_currency_history(self) -> int:
+        """
+        Deletes currency prices older than currency_history_days.
+        The newest row of each (name, origin, currency, intent) is always kept so
+        currencies_get_newest_value keeps working after long downtimes.
+
+        Returns:
+            int: The number of deleted rows.
+        """
+        days = self.policy["currency_history_days"]
+        if not days or days <= 0:
+            return 0
+
+        cutoff = int(time.time()) - int(days * DAY_SECONDS)
+        self.cursor.execute(
+            """
+            DELETE FROM currencies_prices
+            WHERE fetchedAt < ?
+            AND id NOT IN (
+                SELECT MAX(id) FROM currencies_prices GROUP BY name, origin, currency, intent
+            )
+            """,
+            (cutoff,),
+        )
+        return self.cursor.rowcount
+
+    def downsample_currency_history(self) -> int:
+        """
+        Reduces the currency prices older than currency_downsample_after_days to
+        the last value of each day.
+
+        Returns:
+            int: The number of deleted rows.
+        """
+        days = self.policy["currency_downsample_after_days"]
+        if not days or days <= 0:
+            return 0
+
+        cutoff = int(time.time()) - int(days * DAY_SECONDS)
+        self.cursor.execute(
+            """
+            DELETE FROM currencies_prices
+            WHERE fetchedAt < ?
+            AND id NOT IN (
+                SELECT MAX(id) FROM currencies_prices
+                WHERE fetchedAt < ?
+                GROUP BY name, origin, currency, intent, fetchedAt / 86400
+            )
+            """,
+            (cutoff, cutoff),
+        )
+        return self.cursor.rowcount
+
+    def evict_expired_snapshots(self) -> int:
+        """
+        Deletes the snapshots fetched before snapshot_hard_ttl_hours.
+
+        Returns:
+            int: The number of deleted rows.
+        """
+        hours = self.policy["snapshot_hard_ttl_hours"]
+        if not hours or hours <= 0:
+            return 0
+
+        cutoff = int(time.time()) - int(hours * 3600)
+        self.cursor.execute(
+            "DELETE FROM snapshot_results WHERE fetched_at < ? OR fetched_at IS NULL",
+            (cutoff,),
+        )
+        return self.cursor.rowcount
+
+    def prune_restock_events(self) -> int:
+        """
+        Deletes the restocks detected before restock_history_days.
+
+        Returns:
+            int: The number of deleted rows.
+        """
+        days = self.policy["restock_history_days"]
+        if not days or days <= 0:
+            return 0
+
+        cutoff = int(time.time()) - int(days * DAY_SECONDS)
+        self.cursor.execute("DELETE FROM restock_events WHERE detected_at < ?", (cutoff,))
+        return self.cursor.rowcount
+
+    def prune_stock_history(self) -> int:
+        """
+        Deletes the Loot.Farm stock history older than stock_history_days.
+        The newest row of each item is always kept, it is the current state of the item.
+
+        Returns:
+            int: The number of deleted rows.
+        """
+        days = self.policy["stock_history_days"]
+        if not days or days <= 0:
+            return 0
+
+        cutoff = int(time.time()) - int(days * DAY_SECONDS)
+        self.cursor.execute(
+            """
+            DELETE FROM loot_farm_history
+            WHERE recorded_at < ?
+            AND (item_id, recorded_at) NOT IN (
+                SELECT item_id, MAX(recorded_at) FROM loot_farm_history GROUP BY item_id
+            )
+            """,
+            (cutoff,),
+        )
+        return self.cursor.rowcount
+
+    def database_size_bytes(self) -> int:
+        """Returns the size used by live pages, ignoring the free list."""
+        page_size = self.cursor.execute("PRAGMA page_size").fetchone()[0]
+        page_count = self.cursor.execute("PRAGMA page_count").fetchone()[0]
+        freelist_count = self.cursor.execute("PRAGMA freelist_count").fetchone()[0]
+        return (page_count - freelist_count) * page_size
+
+    def enforce_size_budget(self) -> int:
+        """
+        Evicts the oldest snapshots, and then the oldest currency history, until
+        the database fits in max_db_size_mb.
+
+        Returns:
+            int: The number of deleted rows.
+        """
+        max_size_mb = self.policy["max_db_size_mb"]
+        if not max_size_mb or max_size_mb <= 0:
+            return 0
+
+        budget = int(max_size_mb * 1024 * 1024)
+        deleted = 0
+
+        while self.database_size_bytes() > budget:
+            self.cursor.execute(
+                """
+                DELETE FROM snapshot_results WHERE id IN (
+                    SELECT id FROM snapshot_results ORDER BY fetched_at LIMIT ?
+                )
+                """,
+                (self.EVICTION_BATCH_SIZE,),
+            )
+            if self.cursor.rowcount == 0:
+                self.cursor.execute(
+                    """
+                    DELETE FROM currencies_prices WHERE id IN (
+                        SELECT id FROM currencies_prices
+                        WHERE id NOT IN (
+                            SELECT MAX(id) FROM currencies_prices GROUP BY name, origin, currency, intent
+                        )
+                        ORDER BY fetchedAt LIMIT ?
+                    )
+                    """,
+                    (self.EVICTION_BATCH_SIZE,),
+                )
+            if self.cursor.rowcount == 0:
+                self.logger.warning(
+                    f"Database is over the size budget ({max_size_mb} MB) but there is nothing left to evict"
+                )
+                break
+            deleted += self.cursor.rowcount
+
+        return deleted
+
+    def incremental_vacuum(self, pages: int = 0) -> None:
+        """
+        Gives free pages back to the file system (0 = all of them).
+        Needs auto_vacuum = INCREMENTAL, enabled by the database migrations.
+        """
+        # executescript roda o pragma até o fim, execute() libera só uma página por passo
+        self.conn.executescript(f"PRAGMA incremental_vacuum({int(pages)});")
+
+    def run(self) -> dict:
+        """
+        Runs every retention policy once.
+
+        Returns:
+            dict: The number of deleted rows per policy and the database size after the run.
+        """
+        start_time = time.monotonic()
+        try:
+            result = {
+                "currency_history_pruned": self.prune_currency_history(),
+                "currency_history_downsampled": self.downsample_currency_history(),
+                "snapshots_evicted": self.evict_expired_snapshots(),
+                "restock_events_pruned": self.prune_restock_events(),
+                "stock_history_pruned": self.prune_stock_history(),
+                "size_budget_evicted": self.enforce_size_budget(),
+            }
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+
+        self.incremental_vacuum()
+        result["database_size_bytes"] = self.database_size_bytes()
+
+        self.logger.info(
+            f"Database retention finished in {time.monotonic() - start_time:.2f}s: {result}"
+        )
+        return result
@@ -0,0 +1,107 @@
+import atexit
+import threading
+
+from discord_utils.send_webhook_message import send_styled_webhook_message
+from utils.load_config import load_config
+
+config = load_config("config.json")
+
+# Ordem e título das seções do resumo
+DIGEST_SECTIONS = {
+    "new_items": "🆕 New items found",
+    "profitable": "🎉 Profitable items found",
+    "bought": "🛒 Bought items",
+    "removed": "💸 Profitable items removed due to insufficient funds",
+}
+MAX_LINES_PER_SECTION = 15
+# Limite de caracteres da descrição de um embed
+MAX_DESCRIPTION_LENGTH = 4096
+
+
+class AlertDigest:
+    """
+    Collects the restock notifications (new items, profitable items, bought items) for
+    window_seconds after the first one and sends them as a single message, keeping only
+    the last event of each item. Critical alerts keep using send_styled_webhook_message.
+    """
+
+    def __init__(self, window_seconds: float = 10):
+        self.window_seconds = window_seconds
+        self.sections = {kind: {} for kind in DIGEST_SECTIONS}
+        self.events = 0
+        self.digests_sent = 0
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def add(self, kind: str, key, line: str) -> None:
+        """
+        Adds an event to the current digest, an event with the same kind and key replaces the old one.
+
+        Args:
+            kind (str): One of DIGEST_SECTIONS.
+            key: Identifies the item (item id or name).
+            line (str): The text shown in the digest.
+        """
+        if kind not in DIGEST_SECTIONS:
+            raise ValueError(
+                f"Unknown digest section '{kind}', available: {', '.join(DIGEST_SECTIONS)}"
+            )
+
+        if self.window_seconds <= 0:
+            send_styled_webhook_message(message=line, title=DIGEST_SECTIONS[kind])
+            return
+
+        with self._lock:
+            self.sections[kind][key] = line
+            self.events += 1
+            if self._timer is None:
+                self._timer = threading.Timer(self.window_seconds, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self) -> None:
+        """Sends the collected events now (called when the window ends and on shutdown)."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            sections = self.sections
+            self.sections = {kind: {} for kind in DIGEST_SECTIONS}
+
+        message = self.format_digest(sections)
+        if not message:
+            return
+        send_styled_webhook_message(message=message, title="Restock summary")
+        self.digests_sent += 1
+
+    @staticmethod
+    def format_digest(sections: dict) -> str:
+        parts = []
+        for kind, title in DIGEST_SECTIONS.items():
+            lines = list(sections[kind].values())
+            if not lines:
+                continue
+            part = f"**{title} ({len(lines)})**\n" + "\n".join(lines[:MAX_LINES_PER_SECTION])
+            if len(lines) > MAX_LINES_PER_SECTION:
+                part += f"\n... and {len(lines) - MAX_LINES_PER_SECTION} more"
+            parts.append(part)
+
+        message = "\n\n".join(parts)
+        if len(message) > MAX_DESCRIPTION_LENGTH:
+            message = message[: MAX_DESCRIPTION_LENGTH - 4] + "\n..."
+        return message
+
+
+alert_digest = AlertDigest(config.get("discord_digest_window_seconds", 10))
+
+
+def add_digest_event(kind: str, key, line: str) -> None:
+    alert_digest.add(kind, key, line)
+
+
+def flush_alert_digest() -> None:
+    alert_digest.flush()
+
+
+# Envia o resumo pendente na saída, antes do stop do dispatcher (registrado no import dele)
+atexit.register(flush_alert_digest)
@@ -1,8 +1,10 @@
 from datetime import datetime
 
-import requests
-
+from discord_utils.webhook_dispatcher import (get_webhook_dispatcher,
+                                              webhook_dispatcher_stats)
 from utils.load_config import load_config
+from utils.poll_scheduler import poll_scheduler_stats
+from utils.stage_timing import format_stage_percentiles
 
 config = load_config("config.json")
 
@@ -138,12 +140,43 @@ def send_status_webhook_message(shared_state):
         ],
     }
 
-    response = requests.post(url, json=data)
-
-    if response.status_code != 204:
-        print("Error sending message:")
-        print(response.status_code)
-        print(response.text)  # Include the error response for debugging
+    dispatcher_stats = webhook_dispatcher_stats()
+    if dispatcher_stats:
+        data["embeds"][0]["fields"][2]["value"] += (
+            f"**• Webhook queue:** {dispatcher_stats['queue_depth']} pending, "
+            f"{dispatcher_stats['dropped']} dropped, {dispatcher_stats['failed']} failed \n"
+        )
+
+    polling_stats = poll_scheduler_stats()
+    if polling_stats:
+        latency = (
+            f"p50 {polling_stats['latency_p50']:.1f}s, p95 {polling_stats['latency_p95']:.1f}s"
+            if polling_stats["latency_p50"] is not None
+            else "N/A"
+        )
+        data["embeds"][0]["fields"][2]["value"] += (
+            f"**• Poll interval:** {polling_stats['interval']:.1f}s "
+            f"({polling_stats['restocks_per_hour']:.1f} restocks/h now) \n"
+            f"**• Restock detection latency:** {latency} \n"
+        )
+
+    stage_latency = format_stage_percentiles()
+    if stage_latency:
+        data["embeds"][0]["fields"].append(
+            {"name": "__Stage latency__", "value": f"```{stage_latency}```"}
+        )
+
+    _dispatch(url, data)
+
+
+def _dispatch(url, data, wait=False):
+    """Queues the message in the background dispatcher, callers never wait for Discord."""
+    dispatcher = get_webhook_dispatcher(
+        url, max_queue_size=config.get("discord_webhook_queue_size", 200)
+    )
+    # uma mensagem descartada (fila cheia) é logada pelo dispatcher
+    if dispatcher.enqueue(data) and wait:
+        dispatcher.flush()
 
 
 def send_styled_webhook_message(
@@ -192,9 +225,5 @@ def send_styled_webhook_message(
         mention_str = " ".join([f"<@{user_id}>" for user_id in user_ids])
         data["embeds"][0]["description"] += "\n\n" + mention_str
 
-    response = requests.post(url, json=data)
-
-    if response.status_code != 204:
-        print("Error sending message:")
-        print(response.status_code)
-        print(response.text)  # Include the error response for debugging
+    # crash alerts wait for the message to be sent, the process may be exiting
+    _dispatch(url, data, wait=is_crash_alert)
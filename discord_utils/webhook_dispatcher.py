@@ -0,0 +1,233 @@
+import atexit
+import json
+import logging
+import queue
+import threading
+import time
+
+import requests
+
+from utils.metrics import counter, gauge
+
+# Limites do Discord por mensagem de webhook
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARACTERS = 6000
+
+
+def _embed_size(embed: dict) -> int:
+    """Characters of an embed counted by Discord for the 6000 characters limit."""
+    size = len(embed.get("title") or "") + len(embed.get("description") or "")
+    size += len((embed.get("footer") or {}).get("text") or "")
+    for field in embed.get("fields", []):
+        size += len(field.get("name") or "") + len(field.get("value") or "")
+    return size
+
+
+class WebhookDispatcher:
+    """
+    Sends Discord webhook messages from a background thread so the callers never wait
+    for the HTTP request. Pending messages of the same sender are merged into one
+    message with up to 10 embeds, the rate limit headers of Discord are respected and
+    the messages that don't fit in the queue are dropped (and counted).
+    """
+
+    def __init__(self, url: str, max_queue_size: int = 200, timeout: float = 10):
+        self.url = url
+        self.timeout = timeout
+        self.queue = queue.Queue(maxsize=max_queue_size)
+        self.logger = logging.getLogger(__name__)
+
+        self.sent_messages = 0
+        self.sent_requests = 0
+        self.dropped = 0
+        self.failed = 0
+        self.rate_limited = 0
+
+        # epoch em que o próximo request pode ser feito (X-RateLimit-Reset-After / Retry-After)
+        self._blocked_until = 0
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="discord-webhook-dispatcher", daemon=True
+        )
+        self._thread.start()
+
+    @property
+    def queue_depth(self) -> int:
+        return self.queue.qsize()
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.queue_depth,
+            "sent_messages": self.sent_messages,
+            "sent_requests": self.sent_requests,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "rate_limited": self.rate_limited,
+        }
+
+    def enqueue(self, data: dict) -> bool:
+        """
+        Queues a webhook payload without blocking.
+
+        Returns:
+            bool: False if the queue is full (or stopped) and the message was dropped.
+        """
+        if self._stopping.is_set():
+            self.dropped += 1
+            return False
+        try:
+            self.queue.put_nowait(data)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            self.logger.warning(
+                f"Discord webhook queue is full ({self.queue.maxsize}), message dropped"
+            )
+            return False
+
+    def flush(self, timeout: float = 10) -> bool:
+        """
+        Waits until every queued message was sent.
+
+        Returns:
+            bool: True if the queue was emptied before the timeout.
+        """
+        deadline = time.monotonic() + timeout
+        while self.queue.unfinished_tasks:
+            if time.monotonic() >= deadline or not self._thread.is_alive():
+                return False
+            time.sleep(0.05)
+        return True
+
+    def stop(self, timeout: float = 10) -> None:
+        """Sends the pending messages and stops the background thread."""
+        if self._stopping.is_set():
+            return
+        if not self.flush(timeout):
+            self.logger.warning(
+                f"Discord webhook dispatcher stopped with {self.queue_depth} messages pending"
+            )
+        self._stopping.set()
+
+    def _take_batch(self, first: dict) -> list:
+        """Takes the pending messages that can be merged with the first one."""
+        batch = [first]
+        embeds = len(first.get("embeds", []))
+        size = sum(_embed_size(embed) for embed in first.get("embeds", []))
+        while embeds < MAX_EMBEDS_PER_MESSAGE:
+            try:
+                data = self.queue.queue[0]
+            except IndexError:
+                break
+            data_embeds = data.get("embeds", [])
+            data_size = sum(_embed_size(embed) for embed in data_embeds)
+            if (
+                data.get("content")
+                or first.get("content")
+                or data.get("username") != first.get("username")
+                or data.get("avatar_url") != first.get("avatar_url")
+                or embeds + len(data_embeds) > MAX_EMBEDS_PER_MESSAGE
+                or size + data_size > MAX_EMBED_CHARACTERS
+            ):
+                break
+            batch.append(self.queue.get_nowait())
+            embeds += len(data_embeds)
+            size += data_size
+        return batch
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                first = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            batch = self._take_batch(first)
+            payload = dict(first)
+            payload["embeds"] = [embed for data in batch for embed in data.get("embeds", [])]
+            try:
+                if self._post(payload):
+                    self.sent_messages += len(batch)
+                else:
+                    self.failed += len(batch)
+            except Exception as e:
+                self.failed += len(batch)
+                self.logger.error(f"Error sending Discord webhook message: {e}")
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def _post(self, payload: dict, max_attempts: int = 3) -> bool:
+        for _ in range(max_attempts):
+            wait = self._blocked_until - time.time()
+            if wait > 0:
+                time.sleep(wait)
+
+            response = requests.post(self.url, json=payload, timeout=self.timeout)
+            self.sent_requests += 1
+
+            # Bucket esgotado: espera o reset antes do próximo request
+            if response.headers.get("X-RateLimit-Remaining") == "0":
+                reset_after = float(response.headers.get("X-RateLimit-Reset-After", 0))
+                self._blocked_until = time.time() + reset_after
+
+            if response.status_code == 429:
+                self.rate_limited += 1
+                retry_after = response.headers.get("Retry-After")
+                try:
+                    retry_after = json.loads(response.text).get("retry_after", retry_after)
+                except ValueError:
+                    pass
+                self._blocked_until = time.time() + float(retry_after or 1)
+                continue
+
+            if response.status_code not in (200, 204):
+                self.logger.error(
+                    f"Error sending Discord webhook message: {response.status_code} {response.text}"
+                )
+                return False
+            return True
+        return False
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+gauge(
+    "webhook_queue_depth",
+    "Discord webhook messages waiting to be sent",
+    lambda: _dispatcher.queue_depth if _dispatcher is not None else 0,
+)
+counter(
+    "webhook_messages_total",
+    "Discord webhook messages by result",
+    lambda: [
+        ({"result": result}, _dispatcher.stats()[result] if _dispatcher is not None else 0)
+        for result in ("sent_messages", "dropped", "failed", "rate_limited")
+    ],
+)
+
+
+def get_webhook_dispatcher(url: str, max_queue_size: int = 200) -> WebhookDispatcher:
+    """Returns the dispatcher of the url, started on the first call."""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None or _dispatcher.url != url:
+            _dispatcher = WebhookDispatcher(url, max_queue_size=max_queue_size)
+        return _dispatcher
+
+
+def webhook_dispatcher_stats() -> dict:
+    """Queue depth, sent, dropped and failed messages, or None if nothing was sent yet."""
+    return _dispatcher.stats() if _dispatcher is not None else None
+
+
+def shutdown_webhook_dispatcher(timeout: float = 10) -> None:
+    """Sends the pending messages before the bot exits."""
+    if _dispatcher is not None:
+        _dispatcher.stop(timeout)
+
+
+# Registrado no import: os módulos que enviam mensagens na saída (alert_digest) registram
+# os seus depois e o atexit roda na ordem inversa, então eles enviam antes do stop
+atexit.register(shutdown_webhook_dispatcher)
@@ -1,10 +1,11 @@
 from datetime import datetime
-import sys
 from time import time
-import traceback
 
 from discord_utils.send_webhook_message import send_styled_webhook_message
+from utils.budget_ledger import BudgetLedger
+from utils.error_sink import ErrorSink
 from utils.load_config import load_config
+from utils.metrics import counter, gauge
 
 
 class SharedState:
@@ -24,7 +25,6 @@ class SharedState:
         self.START_TIME = datetime.now()
         self.PROFITABLE_ITEMS = 0
         self.ERRORS = 0
-        self.REMAINING_MONEY = 0.00
         self.IGNORED_ITEMS = 0
         self.MAX_ITEM_PRICE = config["max_item_price"]
 
@@ -51,9 +51,67 @@ class SharedState:
         self.KEY_TO_REFINED_SELL_AUTOBOT = 0
         self.KEY_TO_REFINED_BUY_AUTOBOT = 0
 
+        # Saldo da Loot.Farm e o dinheiro reservado para os itens lucrativos até o trade
+        self.budget = BudgetLedger(
+            reservation_timeout=config.get("budget_reservation_timeout_seconds", 600),
+            settle_seconds=config.get("budget_settle_seconds", 120),
+        )
+        # o saldo é conferido periodicamente, o alerta só é enviado quando ele fica baixo
+        self.low_balance_alerted = False
+
         self.last_snapshot_request_time = None
         self.snapshot_count = 0
 
+        # Erros escritos em segundo plano, agrupados por fingerprint
+        # ({date} é formatado a cada escrita, um arquivo por dia)
+        self.error_sink = ErrorSink(
+            "logs/errors_{date}.log",
+            window_seconds=config.get("error_log_window_seconds", 60),
+        )
+
+        self.register_metrics()
+
+    def register_metrics(self):
+        """Exposes the stats variables in utils.metrics (read when the metrics are collected)."""
+        counter("new_items_total", "New items found in the Loot.Farm bot inventory", lambda: self.NEW_ITEMS)
+        counter("profitable_items_total", "Profitable items found", lambda: self.PROFITABLE_ITEMS)
+        counter("errors_total", "Errors logged with debug_error", lambda: self.ERRORS)
+        counter(
+            "errors_by_fingerprint_total",
+            "Errors logged with debug_error by fingerprint (exception type and location)",
+            lambda: [
+                ({"fingerprint": fingerprint}, count)
+                for fingerprint, count in self.error_sink.summary().items()
+            ],
+        )
+        counter("ignored_items_total", "Items skipped by the ignored_items rules", lambda: self.IGNORED_ITEMS)
+        gauge("estimated_profit_usd", "Estimated profit of the bought items", lambda: self.ESTIMATED_PROFIT)
+        gauge("balance_usd", "Loot.Farm balance", lambda: self.REMAINING_MONEY)
+        gauge(
+            "budget_reserved_usd",
+            "Money reserved for the profitable items waiting for the trade",
+            lambda: self.budget.reserved,
+        )
+        gauge(
+            "budget_reconcile_drift_usd",
+            "Difference between the Loot.Farm balance and the balance expected by the budget ledger in the last reconcile",
+            lambda: self.budget.last_drift,
+        )
+        gauge(
+            "snapshot_requests_current_minute",
+            "Backpack.tf snapshot requests made in the current minute (limit 60)",
+            lambda: self.snapshot_count,
+        )
+        self.snapshot_requests_throttled = counter(
+            "snapshot_requests_throttled_total",
+            "Snapshot requests skipped because the 60 requests per minute limit was reached",
+        )
+
+    @property
+    def REMAINING_MONEY(self) -> float:
+        """Loot.Farm balance after the trades made by the bot (see utils.budget_ledger)."""
+        return self.budget.balance
+
     @staticmethod
     def get_instance():
         if SharedState._instance is None:
@@ -61,40 +119,12 @@ class SharedState:
         return SharedState._instance
 
     def debug_error(self, error, other_vars):
+        """
+        Logs an error with its traceback and variables through the error sink (written in
+        the background, repeated errors are grouped by fingerprint).
+        """
         self.ERRORS += 1
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        line = "\n\n --------------------------------------------------------- \n\n"
-
-        exc_type, exc_value, exc_traceback = sys.exc_info()
-        file_name = exc_traceback.tb_frame.f_code.co_filename
-        line_number = exc_traceback.tb_lineno
-        function_name = exc_traceback.tb_frame.f_code.co_name
-
-        header = f"Error at [{timestamp}] in [{file_name}] at line [{line_number}] in function [{function_name}]\n"
-
-        outras_variaveis_str = ""
-        for key, value in other_vars.items():
-            # Truncate long values to avoid overwhelming the log
-            if isinstance(value, str) and len(value) > 100:
-                value = value[:100] + "..."
-            outras_variaveis_str += f"{key}: {value}\n"
-
-        # Include the traceback for more detailed error information
-        traceback_str = traceback.format_exc()
-
-        error_message = (
-            header
-            + line
-            + str(error)
-            + line
-            + outras_variaveis_str
-            + line
-            + traceback_str
-        )
-
-        # Saving the log to a file
-        with open(f"logs/errors_{self.START_TIME.strftime('%Y-%m-%d')}.log", "a") as f:
-            f.write(error_message + "\n")
+        self.error_sink.capture(error, other_vars)
 
     def check_key_price_date(self):
         """Check if the default key price is outdated and send a message if it is."""
@@ -136,14 +166,17 @@ class SharedState:
     def update_balance(self, new_balance):
         # transform the balance to float
         f_new_balance = float(new_balance)
-        if f_new_balance < 5.0:
+        if f_new_balance >= 5.0:
+            self.low_balance_alerted = False
+        elif not self.low_balance_alerted:
+            self.low_balance_alerted = True
             send_styled_webhook_message(
                 message=f"Current balance is below $5.00, is recommended to stop the bot and add more funds.\n```Current balance: ${new_balance}```",
                 color="red",
                 title="Low Balance!",
                 mention=True,
             )
-        self.REMAINING_MONEY = f_new_balance
+        self.budget.reconcile(f_new_balance)
 
     def should_make_snapshot_request(self):
         current_time = time()
@@ -157,6 +190,7 @@ class SharedState:
         self.snapshot_count += 1
 
         if self.snapshot_count > 60:
+            self.snapshot_requests_throttled.inc()
             return False
 
         return True
@@ -0,0 +1,218 @@
+import asyncio
+import logging
+
+from discord_utils.alert_digest import add_digest_event
+from discord_utils.send_webhook_message import send_styled_webhook_message
+from utils.config_logger import side_file_logger
+from utils.decision_journal import journal
+from utils.metrics import counter, gauge
+from utils.tracing import finish_trace
+
+# Configuração padrão do pipeline, pode ser sobrescrita pela chave "pipeline" do config.json
+DEFAULT_PIPELINE_CONFIG = {
+    # lotes de itens novos esperando avaliação (cheio, o scanner espera)
+    "evaluate_queue_size": 8,
+    # lotes de itens lucrativos esperando o withdraw
+    "withdraw_queue_size": 4,
+    # eventos esperando o notifier
+    "notify_queue_size": 64,
+    # quantos lotes são avaliados ao mesmo tempo
+    "evaluators": 2,
+    # quantos notifiers rodam ao mesmo tempo
+    "notifiers": 1,
+}
+
+PROFITABLE_ITEMS_LOG = side_file_logger("profitable_items")
+
+PIPELINE_BACKPRESSURE = counter(
+    "pipeline_backpressure_total", "Times a stage waited because the queue of the next stage was full"
+)
+
+
+class ItemPipeline:
+    """
+    Runs the buy path as stages connected by bounded asyncio queues:
+
+        scanner -> evaluators -> withdraw executor -> notifier
+
+    The scanner keeps detecting new items while the evaluators wait on Backpack.tf and
+    while a trade is in progress. When a queue is full the stage before it waits, so a
+    slow stage slows down the scanner instead of growing a backlog.
+    The withdraw executor is a single task (there is only one browser), the batches
+    that arrive during a trade are withdrawn together in the next one.
+    """
+
+    def __init__(
+        self,
+        bm,
+        dbm,
+        shared_state,
+        listing_quantity: int,
+        withdraw_enabled: bool,
+        config: dict = None,
+        poll_scheduler=None,
+    ):
+        self.bm = bm
+        self.dbm = dbm
+        self.shared_state = shared_state
+        self.listing_quantity = listing_quantity
+        self.withdraw_enabled = withdraw_enabled
+        self.config = {**DEFAULT_PIPELINE_CONFIG, **(config or {})}
+        # intervalo entre as leituras da página (utils.poll_scheduler), None lê sem parar
+        self.poll_scheduler = poll_scheduler
+        self.logger = logging.getLogger(__name__)
+
+        self.evaluate_queue = asyncio.Queue(maxsize=self.config["evaluate_queue_size"])
+        self.withdraw_queue = asyncio.Queue(maxsize=self.config["withdraw_queue_size"])
+        self.notify_queue = asyncio.Queue(maxsize=self.config["notify_queue_size"])
+
+        gauge(
+            "pipeline_queue_depth",
+            "Batches waiting in the queue of each pipeline stage",
+            function=lambda: [
+                ({"stage": stage}, queue.qsize()) for stage, queue in self.queues().items()
+            ],
+        )
+
+    def queues(self) -> dict:
+        return {
+            "evaluate": self.evaluate_queue,
+            "withdraw": self.withdraw_queue,
+            "notify": self.notify_queue,
+        }
+
+    async def _put(self, stage: str, queue: asyncio.Queue, item) -> None:
+        if queue.full():
+            PIPELINE_BACKPRESSURE.inc(stage=stage)
+            self.logger.debug(f"{stage} queue is full, waiting")
+        await queue.put(item)
+
+    def _report_error(self, error: Exception, other_vars: dict) -> None:
+        self.shared_state.debug_error(error, other_vars)
+        send_styled_webhook_message(
+            mention=False,
+            title="An error occurred!",
+            color="red",
+            message=f"An error occurred: {error}",
+        )
+
+    async def scanner(self):
+        """Scans the page and hands the new items to the evaluators."""
+        # a página já foi carregada pelo BotManager, a primeira leitura não espera
+        poll_delay = 0
+        while True:
+            # espera o intervalo, atualiza a página e só então lê: a leitura é do momento certo
+            await asyncio.sleep(poll_delay)
+            scanned_items = 0
+            try:
+                await self.bm.refresh_inventory_and_wait()
+                async with self.bm.browser_lock:
+                    result = await self.bm.scan_items_after_first()
+
+                if result:
+                    # itens abaixo do limite de compra já foram filtrados na página
+                    scanned_items = result.get("scanned_items", 0)
+                    self.shared_state.NEW_ITEMS += scanned_items
+                    if scanned_items and self.poll_scheduler is not None:
+                        self.dbm.insert_restock_event(scanned_items)
+                    new_items = result.get("new_items", None)
+                    if new_items:
+                        for item in new_items:
+                            journal("scan", item.get("item_id"), item.get("item_name"), item.get("item_price"))
+                        await self._put("notify", self.notify_queue, ("new_items", new_items))
+                        await self._put(
+                            "evaluate",
+                            self.evaluate_queue,
+                            (new_items, result.get("repeated_names_items", [])),
+                        )
+            except Exception as e:
+                self._report_error(e, locals())
+
+            # sem scheduler só dá a vez para as outras etapas (os comandos do Selenium são síncronos)
+            poll_delay = 0 if self.poll_scheduler is None else self.poll_scheduler.record_poll(scanned_items)
+
+    async def evaluator(self):
+        """Prices the new items, the profitable ones go to the withdraw executor."""
+        while True:
+            new_items, repeated_items = await self.evaluate_queue.get()
+            try:
+                profitable_items = await self.dbm.compare_items_prices(
+                    items=new_items,
+                    repeated_names_items=repeated_items,
+                    listing_quantity=self.listing_quantity,
+                )
+                if profitable_items:
+                    if self.withdraw_enabled:
+                        await self._put("withdraw", self.withdraw_queue, profitable_items)
+                    else:
+                        # sem withdraw a reserva não é usada
+                        for item in profitable_items:
+                            self.shared_state.budget.release(item.get("reservation"))
+                        await self._put("notify", self.notify_queue, ("profitable", profitable_items))
+            except Exception as e:
+                self._report_error(e, locals())
+            finally:
+                self.evaluate_queue.task_done()
+
+    async def withdraw_executor(self):
+        """Withdraws the profitable items, merging the batches that waited for the last trade."""
+        while True:
+            batches = [await self.withdraw_queue.get()]
+            while not self.withdraw_queue.empty():
+                batches.append(self.withdraw_queue.get_nowait())
+
+            profitable_items = [item for batch in batches for item in batch]
+            try:
+                # withdraw_items remove os itens sem saldo da lista, a notificação usa todos
+                await self.bm.withdraw_items(list(profitable_items))
+            except Exception as e:
+                for item in profitable_items:
+                    self.shared_state.budget.release(item.get("reservation"))
+                    journal(
+                        "withdraw",
+                        item["item_id"],
+                        item["name"],
+                        item["loot_farm_price"],
+                        item["average_price"],
+                        "error",
+                    )
+                self._report_error(e, locals())
+            finally:
+                await self._put("notify", self.notify_queue, ("profitable", profitable_items))
+                for _ in batches:
+                    self.withdraw_queue.task_done()
+
+    async def notifier(self):
+        """Restock summary, traces and the profitable items file."""
+        while True:
+            kind, items = await self.notify_queue.get()
+            try:
+                if kind == "new_items":
+                    # add the items to the restock summary
+                    for item in items:
+                        add_digest_event(
+                            "new_items",
+                            item.get("item_id"),
+                            f"{item.get('item_name')} - ${item.get('item_price')}",
+                        )
+                else:
+                    for item in items:
+                        finish_trace(item.get("trace"))
+                        PROFITABLE_ITEMS_LOG.info(
+                            f"item: {item.get('name')} \n Loot.Farm: {item.get('loot_farm_price')}\n Backpack.TF (Avg of top 3): {item.get('average_price')} \n ------------------------------------ "
+                        )
+            except Exception as e:
+                self._report_error(e, locals())
+            finally:
+                self.notify_queue.task_done()
+
+    async def run(self):
+        """Runs every stage until cancelled."""
+        self.logger.info(
+            f"Starting item pipeline: {self.config['evaluators']} evaluators, "
+            f"{self.config['notifiers']} notifiers, withdraw {'enabled' if self.withdraw_enabled else 'disabled'}"
+        )
+        stages = [self.scanner(), self.withdraw_executor()]
+        stages += [self.evaluator() for _ in range(max(int(self.config["evaluators"]), 1))]
+        stages += [self.notifier() for _ in range(max(int(self.config["notifiers"]), 1))]
+        await asyncio.gather(*stages)
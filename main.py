@@ -3,74 +3,22 @@ import logging
 
 from BotManager import BotManager
 from DBManager import DBManager
-from discord_utils.send_webhook_message import (send_status_webhook_message,
-                                                send_styled_webhook_message)
+from discord_utils.alert_digest import flush_alert_digest
+from discord_utils.send_webhook_message import send_status_webhook_message
+from discord_utils.webhook_dispatcher import shutdown_webhook_dispatcher
 from global_state import SharedState
-from utils.config_logger import configure_logging
+from item_pipeline import ItemPipeline
+from utils.config_logger import configure_logging, stop_logging
+from utils.item_filter import ItemFilter
+from utils.metrics import start_metrics_server
+from utils.poll_scheduler import DEFAULT_POLLING_CONFIG, create_poll_scheduler
+from utils.stage_timing import STAGE_TIMING_ENABLED, format_stage_percentiles
 from utils.load_config import load_config
 
 config = load_config("config.json")
 
-
-async def fetch_and_process_items(bm, dbm, shared_state):
-    """Coroutine para buscar e processar itens"""
-    while True:
-        try:
-            result = await bm.scan_items_after_first()
-            if result:
-                new_items = result.get("new_items", None)
-                if new_items and len(new_items) > 0:
-                    # add item name to the message
-                    message = f"New items found \n"
-                    for item in new_items:
-                        item_name = item.get("item_name")
-                        item_price = item.get("item_price")
-                        message += f"{item_name} - ${item_price} \n"
-
-                    send_styled_webhook_message(
-                        mention=False,
-                        title="New items found! 🎉",
-                        color="green",
-                        message=message,
-                    )
-
-                    repeated_items = result.get("repeated_names_items", [])
-
-                    shared_state.NEW_ITEMS += len(new_items) + len(repeated_items)
-                    profitable_items = await dbm.compare_items_prices(
-                        items=new_items,
-                        repeated_names_items=repeated_items,
-                        listing_quantity=2,
-                    )
-                    
-                    print(f"request_login {config["request_login"]} dont_withdrawn: {config["dont_withdrawn"]}")
-
-                    if (
-                        config["dont_withdrawn"] == False
-                        and config["request_login"] == True
-                    ):
-                        await bm.withdraw_items(profitable_items)
-
-                    for item in profitable_items:
-                        for item in profitable_items:
-                            item_name = item.get("item_name")
-                            loot_farm_price = item.get("loot_farm_price")
-                            average_price = item.get("average_price")
-
-                            file = open("logs/profitable_items.txt", "a")
-                            file.write(
-                                f"item: {item_name} \n Loot.Farm: {loot_farm_price}\n Backpack.TF (Avg of top 3): {average_price} \n ------------------------------------ \n"
-                            )
-
-            bm.refresh_inventory()
-        except Exception as e:
-            shared_state.debug_error(e, locals())
-            send_styled_webhook_message(
-                mention=False,
-                title="An error occurred!",
-                color="red",
-                message=f"An error occurred: {e}",
-            )
+# number of backpack.tf buy listings used to price an item
+LISTING_QUANTITY = config.get("listing_quantity", 2)
 
 
 async def fetch_bptf_currency_prices(
@@ -152,6 +100,57 @@ async def bot_send_status_via_discord(shared_state):
         # await asyncio.sleep(3600)
 
 
+async def log_stage_latency():
+    """Coroutine para registrar os percentis de latência de cada etapa"""
+    logger = logging.getLogger(__name__)
+    while STAGE_TIMING_ENABLED:
+        await asyncio.sleep(config.get("stage_timing_log_seconds", 600))
+        stage_latency = format_stage_percentiles()
+        if stage_latency:
+            logger.info(f"Stage latency:\n{stage_latency}")
+
+
+async def refresh_buy_decision_table(dbm, bm):
+    """Coroutine para atualizar a tabela de decisão de compra e os limites de preço injetados na página"""
+    logger = logging.getLogger(__name__)
+    while True:
+        try:
+            dbm.refresh_decision_table(LISTING_QUANTITY)
+            bm.set_buy_thresholds(dbm.decision_table.page_thresholds())
+        except Exception as e:
+            logger.error(f"Failed to refresh the buy decision table: {e}", exc_info=True)
+        await asyncio.sleep(config.get("decision_table_refresh_seconds", 60))
+
+
+async def run_database_retention(dbm):
+    """Coroutine para aplicar a retenção e o limite de tamanho do main.db periodicamente"""
+    logger = logging.getLogger(__name__)
+    while True:
+        try:
+            dbm.retention.run()
+        except Exception as e:
+            logger.error(f"Failed to run database retention: {e}", exc_info=True)
+        await asyncio.sleep(dbm.retention.interval_seconds)
+
+
+async def record_loot_farm_stock_history(dbm):
+    """Coroutine para gravar o histórico de estoque e preços da loot.farm"""
+    interval = config.get("stock_history_refresh_minutes", 60) * 60
+    while True:
+        await dbm.fetch_and_store_loot_farm_api(game="TF2", cache_duration_hours=interval / 3600)
+        await asyncio.sleep(interval)
+
+
+async def reconcile_budget(bm, request_login):
+    """Coroutine para conferir o saldo do budget ledger com o saldo mostrado na loot.farm"""
+    # sem login o saldo não aparece na página
+    interval = config.get("budget_reconcile_minutes", 5) * 60
+    while request_login:
+        await asyncio.sleep(interval)
+        async with bm.browser_lock:
+            await bm.get_available_money()
+
+
 async def fetch_and_store_tf2_schema(dbm):
     """buscar e armazenar o schema do TF2"""
     await dbm.fetch_tf2_schema()
@@ -168,8 +167,8 @@ async def main():
     # mango collection name
     COLLECTION_NAME = config["collection_name"]
 
-    # ignored items will not be checked for profit
-    IGNORED_ITEMS = config["ignored_items"]
+    # ignored items will not be checked for profit (compiled once, shared by the scanner and the db manager)
+    IGNORED_ITEMS = ItemFilter.from_config(config["ignored_items"])
 
     # backpack.tf token
     BPTF_TOKEN = config["bptf_token"]
@@ -188,9 +187,16 @@ async def main():
 
     REQUEST_LOGIN = config["request_login"]
 
+    # withdraw the profitable items (needs the Steam login)
+    WITHDRAW_ENABLED = config["dont_withdrawn"] == False and REQUEST_LOGIN == True
+
     # Configure logging
     configure_logging(PRINT_EVENTS)
 
+    # local Prometheus endpoint with the bot metrics (disabled without metrics_port)
+    if config.get("metrics_port"):
+        start_metrics_server(config["metrics_port"], config.get("metrics_host", "127.0.0.1"))
+
     # Initialize bot manager
     bm = BotManager(
         bptf_token=BPTF_TOKEN,
@@ -198,6 +204,7 @@ async def main():
         steam_username=STEAM_LOGIN,
         steam_password=STEAM_PASSWORD,
         request_login=REQUEST_LOGIN,
+        withdraw_allocation=config.get("withdraw_allocation"),
     )
 
     # Initialize db manager
@@ -209,6 +216,9 @@ async def main():
         bptf_api_key=BPTF_API_KEY,
         profit_threshold=PROFIT_THRESHOLD,
         ignored_items=IGNORED_ITEMS,
+        retention_policy=config.get("db_retention"),
+        pricing_strategy=config.get("pricing_strategy"),
+        listing_quantity=LISTING_QUANTITY,
     )
 
     # Start the bot
@@ -221,19 +231,52 @@ async def main():
 
     await fetch_and_store_tf2_schema(dbm),  # Fetch and store the TF2 schema
 
-    # Start coroutines
-    await asyncio.gather(
-        # Fetch Backpack.tf currency prices
-        fetch_bptf_currency_prices(dbm, shared_state),
-        # Fetch Autobot.tf currency prices
-        fetch_autobot_currency_prices(dbm, shared_state),
-        # Send status via Discord
-        bot_send_status_via_discord(shared_state),
-        # Fetch and process items
-        fetch_and_process_items(bm, dbm, shared_state),
+    # interval between the reads of the Loot.Farm page, learned from the restock history
+    polling_config = {**DEFAULT_POLLING_CONFIG, **(config.get("polling") or {})}
+    poll_scheduler = create_poll_scheduler(
+        polling_config, dbm.get_restock_history(polling_config["history_days"])
     )
 
-    logger.warning("Shutting down bot...")
+    # scanner -> evaluators -> withdraw -> notifier
+    pipeline = ItemPipeline(
+        bm,
+        dbm,
+        shared_state,
+        listing_quantity=LISTING_QUANTITY,
+        withdraw_enabled=WITHDRAW_ENABLED,
+        config=config.get("pipeline"),
+        poll_scheduler=poll_scheduler,
+    )
+
+    # Start coroutines
+    try:
+        await asyncio.gather(
+            # Fetch Backpack.tf currency prices
+            fetch_bptf_currency_prices(dbm, shared_state),
+            # Fetch Autobot.tf currency prices
+            fetch_autobot_currency_prices(dbm, shared_state),
+            # Send status via Discord
+            bot_send_status_via_discord(shared_state),
+            # Prune and vacuum main.db
+            run_database_retention(dbm),
+            # Record the Loot.Farm stock and price history
+            record_loot_farm_stock_history(dbm),
+            # Refresh the buy decision table
+            refresh_buy_decision_table(dbm, bm),
+            # Log the latency of each stage
+            log_stage_latency(),
+            # Scan, price, withdraw and notify the new items
+            pipeline.run(),
+            # Reconcile the reserved budget with the Loot.Farm balance
+            reconcile_budget(bm, REQUEST_LOGIN),
+        )
+    finally:
+        # também no Ctrl-C, no cancelamento ou numa exceção, senão o resumo pendente se perde
+        logger.warning("Shutting down bot...")
+        flush_alert_digest()
+        shutdown_webhook_dispatcher()
+        shared_state.error_sink.stop()
+        stop_logging()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,228 @@
+import logging
+import sqlite3
+import time
+
+DAY_SECONDS = 24 * 3600
+
+
+class StockHistory:
+    """
+    Time series of the Loot.Farm stock (have/max/price/rate) of every item.
+
+    Each refresh of the Loot.Farm API only writes the items whose state changed since the
+    last refresh (delta encoding): a row is the state of the item from recorded_at until
+    its next row. The rows are clustered by (item_id, recorded_at), so the per item queries
+    (restock frequency, price trajectory, sell-out speed) read a single index range.
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self.logger = logging.getLogger(__name__)
+        # nome -> id do item na tabela loot_farm_items
+        self.item_ids = None
+        # id do item -> último estado gravado (price_cents, have, max, rate)
+        self.last_state = None
+
+    def _load(self) -> None:
+        self.item_ids = dict(self.cursor.execute("SELECT name, id FROM loot_farm_items"))
+        self.last_state = {
+            item_id: (price, have, max_qty, rate)
+            for item_id, price, have, max_qty, rate in self.cursor.execute(
+                """
+                SELECT item_id, price_cents, have, max, rate
+                FROM loot_farm_history
+                WHERE (item_id, recorded_at) IN (
+                    SELECT item_id, MAX(recorded_at) FROM loot_farm_history GROUP BY item_id
+                )
+                """
+            )
+        }
+
+    def _item_id(self, name: str) -> int:
+        item_id = self.item_ids.get(name)
+        if item_id is None:
+            self.cursor.execute("INSERT INTO loot_farm_items (name) VALUES (?)", (name,))
+            item_id = self.item_ids[name] = self.cursor.lastrowid
+        return item_id
+
+    def record(self, items: list, recorded_at: int = None, commit: bool = True) -> int:
+        """
+        Records a refresh of the Loot.Farm API, only the changed items are written.
+        Items that were in stock and are missing from the refresh are recorded with have 0.
+
+        Args:
+            items (list): The items of the API (name, price in cents, have, max, rate).
+            recorded_at (int, optional): Epoch of the refresh. Defaults to now.
+            commit (bool, optional): Commit the rows. Defaults to True, use False to write
+                them in the transaction of the caller.
+
+        Returns:
+            int: The number of written rows.
+        """
+        if recorded_at is None:
+            recorded_at = int(time.time())
+        if self.item_ids is None:
+            self._load()
+
+        rows = []
+        seen = set()
+        for item in items:
+            item_id = self._item_id(item["name"])
+            seen.add(item_id)
+            state = (int(item["price"]), int(item["have"]), int(item["max"]), item["rate"])
+            if self.last_state.get(item_id) != state:
+                self.last_state[item_id] = state
+                rows.append((item_id, recorded_at, *state))
+
+        for item_id, (price, have, max_qty, rate) in self.last_state.items():
+            if item_id not in seen and have != 0:
+                self.last_state[item_id] = (price, 0, max_qty, rate)
+                rows.append((item_id, recorded_at, price, 0, max_qty, rate))
+
+        self.cursor.executemany(
+            """
+            INSERT OR REPLACE INTO loot_farm_history (item_id, recorded_at, price_cents, have, max, rate)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            rows,
+        )
+        if commit:
+            self.conn.commit()
+        self.logger.info(f"Loot.Farm stock history: {len(rows)} of {len(items)} items changed")
+        return len(rows)
+
+    def _since(self, days: float) -> int:
+        return int(time.time() - days * DAY_SECONDS)
+
+    def price_trajectory(self, name: str, days: float = 30) -> list[tuple[int, float]]:
+        """
+        Returns:
+            list[tuple[int, float]]: (recorded_at, price in USD) of every price change.
+        """
+        self.cursor.execute(
+            """
+            SELECT recorded_at, price_cents FROM (
+                SELECT recorded_at, price_cents,
+                    LAG(price_cents) OVER (ORDER BY recorded_at) AS previous_price
+                FROM loot_farm_history
+                WHERE item_id = (SELECT id FROM loot_farm_items WHERE name = ?) AND recorded_at >= ?
+            )
+            WHERE previous_price IS NULL OR previous_price != price_cents
+            """,
+            (name, self._since(days)),
+        )
+        return [(recorded_at, price * 0.01) for recorded_at, price in self.cursor.fetchall()]
+
+    def restocks(self, name: str = None, days: float = 30) -> list[tuple]:
+        """
+        The refreshes where the stock of an item went up.
+
+        Args:
+            name (str, optional): Only this item. Defaults to every item.
+
+        Returns:
+            list[tuple]: (name, recorded_at, items added, price in USD) ordered by recorded_at.
+        """
+        item_filter = "AND h.item_id = (SELECT id FROM loot_farm_items WHERE name = ?)" if name else ""
+        params = (self._since(days), name) if name else (self._since(days),)
+        self.cursor.execute(
+            f"""
+            SELECT i.name, recorded_at, have - previous_have, price_cents * 0.01 FROM (
+                SELECT h.item_id, h.recorded_at, h.have, h.price_cents,
+                    LAG(h.have) OVER (PARTITION BY h.item_id ORDER BY h.recorded_at) AS previous_have
+                FROM loot_farm_history h
+                WHERE h.recorded_at >= ? {item_filter}
+            ) AS changes
+            JOIN loot_farm_items i ON i.id = changes.item_id
+            WHERE have > previous_have
+            ORDER BY recorded_at
+            """,
+            params,
+        )
+        return self.cursor.fetchall()
+
+    def restock_frequency(self, days: float = 30, limit: int = 50) -> list[tuple[str, float]]:
+        """
+        Returns:
+            list[tuple[str, float]]: (name, restocks per day) of the most restocked items.
+        """
+        self.cursor.execute(
+            """
+            SELECT i.name, COUNT(*) AS restocks FROM (
+                SELECT item_id, have,
+                    LAG(have) OVER (PARTITION BY item_id ORDER BY recorded_at) AS previous_have
+                FROM loot_farm_history
+                WHERE recorded_at >= ?
+            ) AS changes
+            JOIN loot_farm_items i ON i.id = changes.item_id
+            WHERE have > previous_have
+            GROUP BY changes.item_id
+            ORDER BY restocks DESC
+            LIMIT ?
+            """,
+            (self._since(days), limit),
+        )
+        return [(name, count / days) for name, count in self.cursor.fetchall()]
+
+    def sell_out_speed(self, name: str, days: float = 30) -> dict:
+        """
+        How fast the stock of an item is sold.
+
+        Returns:
+            dict: sold (units), sold_per_day and the median seconds between a restock and
+                the next sale (None without sales after a restock).
+        """
+        self.cursor.execute(
+            """
+            SELECT recorded_at, have FROM loot_farm_history
+            WHERE item_id = (SELECT id FROM loot_farm_items WHERE name = ?) AND recorded_at >= ?
+            ORDER BY recorded_at
+            """,
+            (name, self._since(days)),
+        )
+        rows = self.cursor.fetchall()
+
+        sold = 0
+        restocked_at = None
+        time_to_sale = []
+        for (_, previous_have), (recorded_at, have) in zip(rows, rows[1:]):
+            if have > previous_have:
+                restocked_at = recorded_at
+            elif have < previous_have:
+                sold += previous_have - have
+                if restocked_at is not None:
+                    time_to_sale.append(recorded_at - restocked_at)
+                    restocked_at = None
+
+        time_to_sale.sort()
+        return {
+            "sold": sold,
+            "sold_per_day": sold / days,
+            "median_seconds_to_sale": time_to_sale[len(time_to_sale) // 2] if time_to_sale else None,
+        }
+
+    def state_at(self, timestamp: int) -> dict:
+        """
+        The stock of every item at a moment (the last row of each item before it), used to
+        replay the history.
+
+        Returns:
+            dict: name -> (price in USD, have, max, rate)
+        """
+        self.cursor.execute(
+            """
+            SELECT i.name, h.price_cents, h.have, h.max, h.rate
+            FROM loot_farm_history h
+            JOIN loot_farm_items i ON i.id = h.item_id
+            WHERE (h.item_id, h.recorded_at) IN (
+                SELECT item_id, MAX(recorded_at) FROM loot_farm_history
+                WHERE recorded_at <= ? GROUP BY item_id
+            )
+            """,
+            (timestamp,),
+        )
+        return {
+            name: (price * 0.01, have, max_qty, rate)
+            for name, price, have, max_qty, rate in self.cursor.fetchall()
+        }
@@ -0,0 +1,71 @@
+import importlib
+import sqlite3
+import time
+
+import pytest
+
+import db_migrations
+from stock_history import StockHistory
+from utils.item_filter import ItemFilter
+from utils.listings import Listing
+
+
+@pytest.fixture
+def backtest(tmp_path, monkeypatch):
+    # o módulo lê o config.json do diretório atual ao ser importado
+    (tmp_path / "config.json").write_text("{}")
+    monkeypatch.chdir(tmp_path)
+    module = importlib.import_module("backtest")
+    monkeypatch.setattr(module, "_prices", {})
+    return module
+
+
+def parameters(**overrides):
+    return {
+        "strategy": {"name": "mean"},
+        "listing_quantity": 2,
+        "profit_threshold": 1.0,
+        "max_item_price": 0,
+        "budget": 0,
+        **overrides,
+    }
+
+
+def listings(*usd_values):
+    return [Listing(value, 0, value, value, None, str(i)) for i, value in enumerate(usd_values)]
+
+
+def test_load_restocks_applies_the_scan_rules(backtest):
+    conn = sqlite3.connect(":memory:")
+    db_migrations._migration_007_loot_farm_history(conn.cursor())
+    history = StockHistory(conn)
+    now = int(time.time())
+    for name in ("Team Captain", "Unusual Team Captain", "Mann Co. Supply Crate Key", "Crate Series #1"):
+        history.record([{"name": name, "price": 500, "have": 0, "max": 5, "rate": 0.9}], now - 120)
+        history.record([{"name": name, "price": 500, "have": 2, "max": 5, "rate": 0.9}], now - 60)
+    # os outros itens somem da API, o estoque zerado não é um restock
+    history.record([{"name": "Team Captain", "price": 500, "have": 3, "max": 5, "rate": 0.9}], now)
+
+    restocks, ignored = backtest.load_restocks(conn, days=1, item_filter=ItemFilter.from_config(["Mann Co. Supply Crate Key"]))
+    assert sorted(restocks) == sorted(
+        [(5.0, 2, "Team Captain"), (5.0, 2, "Crate #1"), (5.0, 1, "Team Captain")]
+    )
+    assert ignored == 2
+
+
+def test_run_backtest(backtest):
+    backtest._init_worker(
+        # (preço na loot.farm, unidades, nome no backpack.tf)
+        [(5.0, 2, "Team Captain"), (9.5, 1, "Team Captain"), (3.0, 1, "Ellis' Cap"), (1.0, 1, "Unpriced")],
+        {"Team Captain": listings(10.0, 11.0, 50.0), "Ellis' Cap": listings(3.5)},
+    )
+
+    result = backtest.run_backtest(parameters())
+    assert (result["evaluated"], result["unpriced"], result["profitable"], result["bought"]) == (3, 1, 1, 2)
+    assert result["estimated_profit"] == pytest.approx(2 * (10.5 - 5.0))
+    assert result["capital_used"] == 10.0
+
+    # o saldo só paga uma unidade, depois dela nenhum item cabe no que sobrou
+    limited = backtest.run_backtest(parameters(budget=6))
+    assert (limited["bought"], limited["too_expensive"]) == (1, 2)
+    assert backtest.run_backtest(parameters(max_item_price=9))["too_expensive"] == 1
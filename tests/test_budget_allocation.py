@@ -0,0 +1,124 @@
+import itertools
+import random
+import time
+
+import pytest
+
+from utils import budget_allocation
+from utils.budget_allocation import allocate_budget, item_value, to_cents
+
+
+def make_items(count, seed=0, max_price=20):
+    rng = random.Random(seed)
+    items = []
+    for index in range(count):
+        price = round(rng.uniform(0.05, max_price), 2)
+        items.append(
+            {
+                "item_id": str(index),
+                "name": f"item {index}",
+                "loot_farm_price": price,
+                "average_price": round(price * rng.uniform(0.9, 1.6), 2),
+            }
+        )
+    return items
+
+
+def best_value(items, budget, max_items, objective):
+    """Brute force over every subset."""
+    best = 0.0
+    for size in range(len(items) + 1):
+        if max_items and size > max_items:
+            break
+        for subset in itertools.combinations(items, size):
+            if sum(to_cents(item["loot_farm_price"]) for item in subset) > to_cents(budget):
+                continue
+            if all(item_value(item, objective) > 0 for item in subset):
+                best = max(best, sum(item_value(item, objective) for item in subset))
+    return best
+
+
+def test_everything_fits():
+    items = make_items(5, seed=1)
+    profitable = [item for item in items if item_value(item, "profit") > 0]
+
+    selected, dropped = allocate_budget(items, 1000)
+
+    assert selected == profitable
+    assert {reason for _, reason in dropped} <= {"not_profitable"}
+
+
+def test_drop_reasons():
+    items = [
+        {"loot_farm_price": 5, "average_price": 4},
+        {"loot_farm_price": "30.00", "average_price": 40},
+        {"loot_farm_price": 6, "average_price": 9},
+        {"loot_farm_price": 5, "average_price": 6},
+    ]
+
+    selected, dropped = allocate_budget(items, 10)
+
+    assert selected == [items[2]]
+    assert [(item, reason) for item, reason in dropped] == [
+        (items[0], "not_profitable"),
+        (items[1], "too_expensive"),
+        (items[3], "budget"),
+    ]
+
+
+def test_trade_item_limit():
+    items = [{"loot_farm_price": 1, "average_price": 1 + profit} for profit in (3, 1, 2)]
+
+    selected, dropped = allocate_budget(items, 100, max_items=2)
+
+    assert selected == [items[0], items[2]]
+    assert dropped == [(items[1], "trade_item_limit")]
+
+
+def test_unknown_objective():
+    with pytest.raises(ValueError):
+        allocate_budget(make_items(2), 10, objective="volume")
+
+
+@pytest.mark.parametrize("objective", ["profit", "profit_per_dollar"])
+def test_exact_against_brute_force(objective):
+    rng = random.Random(3)
+    for trial in range(60):
+        items = make_items(rng.randint(0, 9), seed=trial)
+        budget = round(rng.uniform(0, 40), 2)
+        max_items = rng.choice([0, 1, 2, 3])
+
+        selected, dropped = allocate_budget(items, budget, max_items, objective)
+
+        assert len(selected) + len(dropped) == len(items)
+        assert sum(to_cents(item["loot_farm_price"]) for item in selected) <= to_cents(budget)
+        assert not max_items or len(selected) <= max_items
+        assert sum(item_value(item, objective) for item in selected) == pytest.approx(
+            best_value(items, budget, max_items, objective)
+        )
+
+
+def test_large_withdraw_is_bounded():
+    items = make_items(300, seed=7, max_price=30)
+
+    started_at = time.perf_counter()
+    selected, dropped = allocate_budget(items, 500, max_items=50)
+
+    assert time.perf_counter() - started_at < 1
+    assert 0 < len(selected) <= 50
+    assert sum(to_cents(item["loot_farm_price"]) for item in selected) <= to_cents(500)
+    assert len(selected) + len(dropped) == len(items)
+
+
+def test_greedy_fallback(monkeypatch):
+    monkeypatch.setattr(budget_allocation, "MAX_KNAPSACK_CELLS", 0)
+    items = [
+        {"loot_farm_price": 4, "average_price": 8},
+        {"loot_farm_price": 5, "average_price": 6},
+        {"loot_farm_price": 3, "average_price": 6},
+    ]
+
+    selected, dropped = allocate_budget(items, 8, max_items=2)
+
+    assert selected == [items[0], items[2]]
+    assert dropped == [(items[1], "budget")]
@@ -0,0 +1,113 @@
+import threading
+
+import pytest
+
+from utils import budget_ledger
+from utils.budget_ledger import BudgetLedger
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake_clock = FakeClock()
+    monkeypatch.setattr(budget_ledger.time, "monotonic", fake_clock)
+    return fake_clock
+
+
+def make_ledger(balance, **kwargs):
+    ledger = BudgetLedger(**kwargs)
+    ledger.reconcile(balance)
+    return ledger
+
+
+def test_reserve_until_the_balance_is_used(clock):
+    ledger = make_ledger("10.00")
+
+    first = ledger.reserve(6, "first")
+    second = ledger.reserve("4.01", "second")
+
+    assert first is not None
+    assert second is None
+    assert ledger.available() == 4
+    assert ledger.held([first, second]) == 6
+
+
+def test_release_and_commit(clock):
+    ledger = make_ledger(10)
+    released = ledger.reserve(3)
+    committed = ledger.reserve(5)
+
+    assert ledger.release(released)
+    assert not ledger.release(released)
+    assert ledger.commit(committed)
+
+    assert ledger.balance == 5
+    assert ledger.reserved == 0
+    assert ledger.available() == 5
+
+
+def test_commit_after_expiry_spends_the_amount(clock):
+    ledger = make_ledger(10, reservation_timeout=60)
+    reservation = ledger.reserve(4)
+    clock.now += 60
+
+    assert ledger.available() == 10
+    assert not ledger.commit(reservation, "4.00")
+    assert ledger.balance == 6
+
+
+def test_extend_holds_the_opened_trade(clock):
+    ledger = make_ledger(10, reservation_timeout=60)
+    reservation = ledger.reserve(4)
+    clock.now += 50
+    assert ledger.extend(reservation)
+
+    # o reconcile lê o saldo depois do trade, a reserva ainda segura o dinheiro
+    clock.now += 50
+    ledger.reconcile(6)
+    assert ledger.available() == 2
+
+    clock.now += 10
+    assert ledger.available() == 6
+    assert not ledger.extend(reservation)
+
+
+def test_reconcile_keeps_recent_commits(clock):
+    ledger = make_ledger(10, settle_seconds=120)
+    ledger.commit(ledger.reserve(4))
+
+    # a página ainda não mostra o trade
+    assert ledger.reconcile(10) == 0
+    assert ledger.balance == 6
+
+    clock.now += 120
+    assert ledger.reconcile(6) == 0
+    assert ledger.reconcile(7) == 1
+    assert ledger.last_drift == 1
+
+
+def test_concurrent_reservations_never_overspend():
+    ledger = make_ledger(100)
+    reservations = []
+
+    def reserve():
+        for _ in range(100):
+            reservation = ledger.reserve("0.37")
+            if reservation is not None:
+                reservations.append(reservation)
+
+    threads = [threading.Thread(target=reserve) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(reservations) == 270
+    assert ledger.available() == pytest.approx(0.1)
@@ -0,0 +1,61 @@
+import importlib
+import json
+import logging
+import queue
+
+import pytest
+
+
+@pytest.fixture
+def config_logger(tmp_path, monkeypatch):
+    pytest.importorskip("coloredlogs")
+    # o módulo lê o config.json do diretório atual ao ser importado, os arquivos vão para logs/
+    (tmp_path / "config.json").write_text("{}")
+    (tmp_path / "logs").mkdir()
+    monkeypatch.chdir(tmp_path)
+    return importlib.import_module("utils.config_logger")
+
+
+def test_json_formatter(config_logger):
+    record = logging.LogRecord("lootbot", logging.WARNING, __file__, 10, "Item %s skipped", ("Team Captain",), None)
+
+    entry = json.loads(config_logger.JsonFormatter().format(record))
+    assert entry["level"] == "WARNING"
+    assert entry["logger"] == "lootbot"
+    assert entry["message"] == "Item Team Captain skipped"
+    assert entry["line"] == 10
+
+
+def test_side_files_are_written_by_the_listener(config_logger, tmp_path):
+    pipeline = config_logger.LogPipeline()
+    logger = pipeline.side_logger("profitable_items")
+    for i in range(3):
+        logger.info(f"item {i}")
+    pipeline.stop()
+
+    assert (tmp_path / "logs" / "profitable_items.txt").read_text().splitlines() == [
+        "item 0",
+        "item 1",
+        "item 2",
+    ]
+
+
+def test_a_full_queue_drops_the_record(config_logger):
+    log_queue = queue.SimpleQueue()
+    handler = config_logger._NonBlockingQueueHandler(log_queue, max_size=1)
+    logger = logging.getLogger("lootbot.test_queue")
+    logger.propagate = False
+    logger.addHandler(handler)
+    try:
+        logger.warning("first")
+        logger.warning("second")
+    finally:
+        logger.removeHandler(handler)
+
+    assert log_queue.qsize() == 1
+    assert log_queue.get().getMessage() == "first"
+
+
+def test_unknown_side_file(config_logger):
+    with pytest.raises(ValueError):
+        config_logger.side_file_logger("unknown")
@@ -0,0 +1,156 @@
+import json
+import sqlite3
+
+import pytest
+
+import db_migrations
+from db_migrations import SCHEMA_VERSION, get_schema_version, run_migrations
+from utils.snapshot_codec import decode_listings
+
+LEGACY_LISTING = {
+    "price": None,
+    "currencies": {"keys": 1, "metal": 5.11},
+    "usd_estimated": 2.5,
+    "bumped_at": 1700000000,
+    "steamid": "76561198000000000",
+    "intent": "buy",
+}
+
+
+def legacy_listing(price, usd_estimated):
+    return {**LEGACY_LISTING, "price": price, "usd_estimated": usd_estimated}
+
+
+@pytest.fixture
+def legacy_db(tmp_path):
+    """A main.db written by the versions of the bot before the migrations (user_version 0)."""
+    conn = sqlite3.connect(tmp_path / "main.db")
+    conn.executescript(
+        """
+        CREATE TABLE currencies_prices (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT,
+            price REAL,
+            intent TEXT,
+            diff REAL,
+            currency TEXT,
+            fetchedAt TEXT,
+            origin TEXT
+        );
+        CREATE TABLE comparison_results (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT,
+            sqlite_price REAL,
+            mongo_price REAL
+        );
+        CREATE TABLE snapshot_results (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE,
+            steam_appid INTEGER,
+            listings TEXT,
+            fetched_at TEXT
+        );
+        CREATE TABLE api_call_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            endpoint TEXT UNIQUE,
+            fetchedAt TEXT
+        );
+        CREATE INDEX snapshot_results_name_index ON snapshot_results (name);
+        """
+    )
+    conn.executemany(
+        "INSERT INTO currencies_prices (name, price, intent, diff, currency, fetchedAt, origin) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [("Mann Co. Supply Crate Key", 1.9, "sell", 0, "usd", "2024-05-01 12:00:00", "loot.farm")],
+    )
+    conn.executemany(
+        "INSERT INTO comparison_results (name, sqlite_price, mongo_price) VALUES (?, ?, ?)",
+        [("Team Captain", 10.5, 10.2), ("Ellis' Cap", 3.1, None)],
+    )
+    conn.executemany(
+        "INSERT INTO snapshot_results (name, steam_appid, listings, fetched_at) VALUES (?, ?, ?, ?)",
+        [
+            (
+                "Team Captain",
+                440,
+                json.dumps([legacy_listing(3.0, 3.3), legacy_listing(1.0, 1.1), legacy_listing(2.0, 2.2)]),
+                "2024-05-01 12:00:00",
+            ),
+            ("Broken", 440, "{not json", "2024-05-01 12:00:00"),
+        ],
+    )
+    conn.execute(
+        "INSERT INTO api_call_log (endpoint, fetchedAt) VALUES (?, ?)",
+        ("loot-farm-TF2", "2024-05-01 12:00:00"),
+    )
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def test_upgrade_from_legacy_schema(legacy_db):
+    assert get_schema_version(legacy_db) == 0
+
+    assert run_migrations(legacy_db) == SCHEMA_VERSION
+    assert get_schema_version(legacy_db) == SCHEMA_VERSION
+
+    expected_epoch = db_migrations.epoch_from_legacy_timestamp("2024-05-01 12:00:00")
+    assert legacy_db.execute("SELECT fetchedAt FROM currencies_prices").fetchone() == (expected_epoch,)
+    assert legacy_db.execute("SELECT fetchedAt FROM api_call_log").fetchone() == (expected_epoch,)
+    assert legacy_db.execute("SELECT typeof(fetched_at) FROM snapshot_results").fetchone() == ("integer",)
+    assert legacy_db.execute("PRAGMA auto_vacuum").fetchone() == (2,)
+
+
+def test_snapshot_listings_are_encoded_once(legacy_db):
+    run_migrations(legacy_db)
+
+    tables = {row[0] for row in legacy_db.execute("SELECT name FROM sqlite_master")}
+    assert "snapshot_listings" not in tables
+    # a linha corrompida é apagada, o cache será buscado novamente
+    rows = legacy_db.execute(
+        "SELECT name, listings, listing_count, min_price, median_usd, top_n, top_avg_usd, freshest_bump FROM snapshot_results"
+    ).fetchall()
+    assert len(rows) == 1
+
+    name, listings, *aggregates = rows[0]
+    assert name == "Team Captain"
+    assert isinstance(listings, bytes)
+    assert [listing.price for listing in decode_listings(listings)] == [3.0, 1.0, 2.0]
+    assert decode_listings(listings)[0].steamid == "76561198000000000"
+    assert aggregates == [3, 1.0, 2.2, 3, pytest.approx(2.2), 1700000000]
+
+
+def test_snapshot_listings_table_is_dropped(legacy_db, monkeypatch):
+    # banco parado na versão 5, com uma linha por listing
+    monkeypatch.setattr(db_migrations, "MIGRATIONS", db_migrations.MIGRATIONS[:5])
+    assert run_migrations(legacy_db) == 5
+    assert legacy_db.execute(
+        "SELECT price, usd_estimated FROM snapshot_listings WHERE name = 'Team Captain' ORDER BY price"
+    ).fetchall() == [(1.0, 1.1), (2.0, 2.2), (3.0, 3.3)]
+
+    monkeypatch.undo()
+    assert run_migrations(legacy_db) == SCHEMA_VERSION
+
+    assert legacy_db.execute(
+        "SELECT name FROM sqlite_master WHERE name LIKE 'snapshot_listings%' OR type = 'trigger'"
+    ).fetchall() == []
+    # sem o trigger, apagar um snapshot não depende mais da tabela removida
+    legacy_db.execute("DELETE FROM snapshot_results")
+    assert legacy_db.execute("SELECT COUNT(*) FROM snapshot_results").fetchone() == (0,)
+
+
+def test_comparison_results_are_kept(legacy_db):
+    run_migrations(legacy_db)
+
+    tables = {row[0] for row in legacy_db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert "comparison_results" not in tables
+    assert legacy_db.execute(
+        "SELECT name, sqlite_price, mongo_price FROM comparison_results_legacy ORDER BY id"
+    ).fetchall() == [("Team Captain", 10.5, 10.2), ("Ellis' Cap", 3.1, None)]
+
+
+def test_migrations_are_idempotent(legacy_db):
+    run_migrations(legacy_db)
+    schema = legacy_db.execute("SELECT sql FROM sqlite_master ORDER BY name").fetchall()
+
+    assert run_migrations(legacy_db) == SCHEMA_VERSION
+    assert legacy_db.execute("SELECT sql FROM sqlite_master ORDER BY name").fetchall() == schema
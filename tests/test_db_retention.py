@@ -0,0 +1,122 @@
+import sqlite3
+
+import pytest
+
+import db_migrations
+import db_retention
+from db_retention import DAY_SECONDS, DBRetention
+
+# meio-dia, as linhas de um mesmo dia não cruzam a meia-noite
+NOW = 20000 * DAY_SECONDS + 12 * 3600
+DISABLED_POLICY = {
+    "currency_history_days": 0,
+    "currency_downsample_after_days": 0,
+    "snapshot_hard_ttl_hours": 0,
+    "max_db_size_mb": 0,
+    "restock_history_days": 0,
+    "stock_history_days": 0,
+}
+
+
+@pytest.fixture
+def conn(monkeypatch):
+    monkeypatch.setattr(db_retention.time, "time", lambda: NOW)
+    conn = sqlite3.connect(":memory:")
+    conn.executescript(
+        """
+        CREATE TABLE currencies_prices (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, price REAL, intent TEXT,
+            currency TEXT, fetchedAt INTEGER, origin TEXT
+        );
+        CREATE TABLE snapshot_results (id INTEGER PRIMARY KEY, name TEXT, fetched_at INTEGER);
+        CREATE TABLE restock_events (id INTEGER PRIMARY KEY, detected_at INTEGER, items INTEGER);
+        """
+    )
+    db_migrations._migration_007_loot_farm_history(conn.cursor())
+    yield conn
+    conn.close()
+
+
+def add_currency_prices(conn, name, ages_seconds):
+    conn.executemany(
+        "INSERT INTO currencies_prices (name, price, intent, currency, fetchedAt, origin) VALUES (?, 1, 'sell', 'usd', ?, 'loot.farm')",
+        [(name, NOW - age) for age in ages_seconds],
+    )
+
+
+def currency_ages(conn, name):
+    return [
+        NOW - fetched_at
+        for (fetched_at,) in conn.execute(
+            "SELECT fetchedAt FROM currencies_prices WHERE name = ? ORDER BY fetchedAt DESC", (name,)
+        )
+    ]
+
+
+def test_prune_currency_history_keeps_the_newest_value(conn):
+    add_currency_prices(conn, "Key", [40 * DAY_SECONDS, 35 * DAY_SECONDS, DAY_SECONDS])
+    # a única linha da moeda fica, mesmo antiga
+    add_currency_prices(conn, "Refined Metal", [60 * DAY_SECONDS])
+
+    retention = DBRetention(conn, {**DISABLED_POLICY, "currency_history_days": 30})
+    assert retention.prune_currency_history() == 2
+    assert currency_ages(conn, "Key") == [DAY_SECONDS]
+    assert currency_ages(conn, "Refined Metal") == [60 * DAY_SECONDS]
+
+
+def test_downsample_keeps_the_last_value_of_each_day(conn):
+    ten_days = 10 * DAY_SECONDS
+    add_currency_prices(
+        conn,
+        "Key",
+        [11 * DAY_SECONDS, ten_days + 120, ten_days + 60, ten_days, 3 * DAY_SECONDS + 60, 3 * DAY_SECONDS],
+    )
+
+    retention = DBRetention(conn, {**DISABLED_POLICY, "currency_downsample_after_days": 7})
+    assert retention.downsample_currency_history() == 2
+    # as linhas recentes não são reduzidas
+    assert currency_ages(conn, "Key") == [3 * DAY_SECONDS, 3 * DAY_SECONDS + 60, ten_days, 11 * DAY_SECONDS]
+
+
+def test_evict_expired_snapshots(conn):
+    conn.executemany(
+        "INSERT INTO snapshot_results (name, fetched_at) VALUES (?, ?)",
+        [("Old", NOW - 25 * 3600), ("Fresh", NOW - 3600), ("Unknown", None)],
+    )
+
+    retention = DBRetention(conn, {**DISABLED_POLICY, "snapshot_hard_ttl_hours": 24})
+    assert retention.evict_expired_snapshots() == 2
+    assert conn.execute("SELECT name FROM snapshot_results").fetchall() == [("Fresh",)]
+
+
+def test_prune_restocks_and_stock_history(conn):
+    conn.executemany(
+        "INSERT INTO restock_events (detected_at, items) VALUES (?, 1)",
+        [(NOW - 30 * DAY_SECONDS,), (NOW - DAY_SECONDS,)],
+    )
+    conn.execute("INSERT INTO loot_farm_items (id, name) VALUES (1, 'Team Captain'), (2, 'Ellis'' Cap')")
+    conn.executemany(
+        "INSERT INTO loot_farm_history (item_id, recorded_at, price_cents, have, max, rate) VALUES (?, ?, 100, 1, 10, 0.9)",
+        [(1, NOW - 200 * DAY_SECONDS), (1, NOW - DAY_SECONDS), (2, NOW - 200 * DAY_SECONDS)],
+    )
+
+    retention = DBRetention(
+        conn, {**DISABLED_POLICY, "restock_history_days": 28, "stock_history_days": 180}
+    )
+    assert retention.prune_restock_events() == 1
+    # a última linha de cada item é o estado atual e fica
+    assert retention.prune_stock_history() == 1
+    assert conn.execute("SELECT item_id, recorded_at FROM loot_farm_history ORDER BY item_id").fetchall() == [
+        (1, NOW - DAY_SECONDS),
+        (2, NOW - 200 * DAY_SECONDS),
+    ]
+
+
+def test_disabled_policies_delete_nothing(conn):
+    add_currency_prices(conn, "Key", [400 * DAY_SECONDS, 300 * DAY_SECONDS])
+    conn.execute("INSERT INTO snapshot_results (name, fetched_at) VALUES ('Old', 0)")
+
+    result = DBRetention(conn, DISABLED_POLICY).run()
+    assert result.pop("database_size_bytes") > 0
+    assert set(result.values()) == {0}
+    assert len(currency_ages(conn, "Key")) == 2
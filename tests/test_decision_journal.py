@@ -0,0 +1,70 @@
+import importlib
+import json
+import time
+
+import pytest
+
+
+@pytest.fixture
+def decision_journal(tmp_path, monkeypatch):
+    # o módulo lê o config.json do diretório atual ao ser importado
+    (tmp_path / "config.json").write_text("{}")
+    monkeypatch.chdir(tmp_path)
+    return importlib.import_module("utils.decision_journal")
+
+
+def test_segments_rotate_with_a_header(decision_journal, tmp_path):
+    directory = tmp_path / "journal"
+    writer = decision_journal.DecisionJournal(
+        directory=str(directory), segment_max_bytes=300, fsync_interval=0.01
+    )
+    # um segmento só troca depois de uma escrita, cada lote vai para o writer separado
+    for batch in range(4):
+        for i in range(batch * 5, batch * 5 + 5):
+            writer.record("scan", f"item-{i}", "Team Captain", "10.00")
+        time.sleep(0.05)
+    writer.record("filtered", {"above_threshold": 1}, [["item-20", "Ellis' Cap", "2.00", "above_threshold"]])
+    writer.stop()
+
+    paths = decision_journal.segment_paths(str(directory))
+    assert len(paths) > 1
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            header = json.loads(f.readline())
+        assert header == {
+            "schema": decision_journal.SCHEMA_VERSION,
+            "fields": {kind: list(fields) for kind, fields in decision_journal.RECORD_FIELDS.items()},
+        }
+
+    records = list(decision_journal.read_journal(str(directory)))
+    assert [record["item_id"] for record in records if record["kind"] == "scan"] == [
+        f"item-{i}" for i in range(20)
+    ]
+    assert records[-1]["kind"] == "filtered"
+    assert records[-1]["reasons"] == {"above_threshold": 1}
+
+
+def test_max_segments_deletes_the_oldest(decision_journal, tmp_path):
+    directory = tmp_path / "journal"
+    writer = decision_journal.DecisionJournal(
+        directory=str(directory), segment_max_bytes=100, fsync_interval=0.01, max_segments=2
+    )
+    for i in range(5):
+        writer.record("scan", f"item-{i}", "Team Captain", "10.00")
+        time.sleep(0.05)
+    writer.stop()
+
+    assert len(decision_journal.segment_paths(str(directory))) == 2
+
+
+def test_fsyncs_are_batched(decision_journal, tmp_path, monkeypatch):
+    fsyncs = []
+    monkeypatch.setattr(decision_journal.os, "fsync", fsyncs.append)
+    writer = decision_journal.DecisionJournal(directory=str(tmp_path / "journal"), fsync_interval=60)
+    for i in range(100):
+        writer.record("decision", f"item-{i}", "Team Captain", 8.5, 10.0, 1.0, "profitable")
+    writer.stop()
+
+    # nenhum fsync antes do intervalo, só o do stop
+    assert len(fsyncs) == 1
+    assert len(list(decision_journal.read_journal(str(tmp_path / "journal")))) == 100
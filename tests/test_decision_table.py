@@ -0,0 +1,77 @@
+import time
+
+import pytest
+
+from utils.decision_table import BuyDecisionTable, page_item_key
+
+PROFIT_THRESHOLD = 1.0
+
+
+def test_decide_uses_the_buy_rule():
+    table = BuyDecisionTable(PROFIT_THRESHOLD)
+    table.rebuild({"Team Captain": 10.0}, {"Team Captain": time.time() + 60}, listing_quantity=3)
+
+    assert table.decide("Team Captain", 8.5, 3) == (True, 10.0)
+    assert table.decide("Team Captain", 9.0, 3) == (False, 10.0)
+    assert table.hits == 2
+
+
+def test_expired_entries_are_misses():
+    table = BuyDecisionTable(PROFIT_THRESHOLD)
+    table.rebuild(
+        {"Team Captain": 10.0, "Expired Hat": 5.0},
+        {"Team Captain": time.time() + 60, "Expired Hat": time.time() - 1},
+        listing_quantity=3,
+    )
+
+    assert table.decide("Expired Hat", 1.0, 3) is None
+    # outra quantidade de listings também não serve
+    assert table.decide("Team Captain", 1.0, 5) is None
+    assert table.decide("Unknown Hat", 1.0, 3) is None
+    assert table.misses == 3
+
+
+def test_aliases_resolve_the_page_item():
+    table = BuyDecisionTable(PROFIT_THRESHOLD)
+    expires_at = time.time() + 60
+    table.rebuild(
+        {"Burning Flames Team Captain": 100.0},
+        {"Burning Flames Team Captain": expires_at},
+        listing_quantity=3,
+    )
+
+    assert table.resolve_alias("Unusual Team Captain", ["Burning Flames"]) is None
+    table.learn_alias("Unusual Team Captain", ["Burning Flames"], "Burning Flames Team Captain")
+
+    assert table.resolve_alias("Unusual Team Captain", ["Burning Flames"]) == "Burning Flames Team Captain"
+    assert table.resolve_alias("Unusual Team Captain", ["Scorching Flames"]) is None
+    assert table.page_thresholds() == {
+        page_item_key("Unusual Team Captain", ["Burning Flames"]): [99.0, expires_at]
+    }
+
+
+def test_page_thresholds_skip_expired_entries():
+    table = BuyDecisionTable(PROFIT_THRESHOLD)
+    table.rebuild(
+        {"Team Captain": 10.0, "Expired Hat": 5.0},
+        {"Team Captain": time.time() + 60, "Expired Hat": time.time() - 1},
+        listing_quantity=3,
+    )
+    table.learn_alias("Team Captain", [], "Team Captain")
+    table.learn_alias("Expired Hat", [], "Expired Hat")
+    # nome aprendido sem preço na tabela
+    table.learn_alias("Ellis' Cap", [], "Ellis' Cap")
+
+    assert list(table.page_thresholds()) == ["Team Captain"]
+
+
+@pytest.mark.parametrize("loot_farm_price", [8.0, 8.99, 9.0, 9.01, 12.0])
+def test_page_filter_matches_the_buy_rule(loot_farm_price):
+    table = BuyDecisionTable(PROFIT_THRESHOLD)
+    table.rebuild({"Team Captain": 10.0}, {"Team Captain": time.time() + 60}, listing_quantity=3)
+    table.learn_alias("Team Captain", [], "Team Captain")
+    max_buy_price, _ = table.page_thresholds()["Team Captain"]
+
+    # SCAN_CANDIDATES_SCRIPT descarta o item quando !(price < threshold[0])
+    filtered_in_page = not loot_farm_price < max_buy_price
+    assert filtered_in_page == (not table.decide("Team Captain", loot_farm_price, 3)[0])
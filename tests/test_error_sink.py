@@ -0,0 +1,49 @@
+from datetime import datetime
+
+from utils import error_sink
+from utils.error_sink import ErrorSink
+
+
+class FakeDatetime(datetime):
+    current = datetime(2026, 1, 1, 23, 59, 59)
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls.current
+
+
+def raise_error(message):
+    try:
+        raise ValueError(message)
+    except ValueError as e:
+        return e
+
+
+def test_a_file_per_day(tmp_path, monkeypatch):
+    monkeypatch.setattr(error_sink, "datetime", FakeDatetime)
+    sink = ErrorSink(str(tmp_path / "errors_{date}.log"), window_seconds=0, flush_interval=60)
+
+    sink.capture(raise_error("first"))
+    sink._write_pending()
+    # o dia muda com o bot rodando
+    monkeypatch.setattr(FakeDatetime, "current", datetime(2026, 1, 2, 0, 0, 1))
+    sink.capture(raise_error("second"), {"item_name": "Team Captain"})
+    sink.stop()
+
+    assert "first" in (tmp_path / "errors_2026-01-01.log").read_text()
+    second_day = (tmp_path / "errors_2026-01-02.log").read_text()
+    assert "second" in second_day
+    assert "item_name: Team Captain" in second_day
+
+
+def test_repeated_errors_are_summarized(tmp_path):
+    sink = ErrorSink(str(tmp_path / "errors.log"), window_seconds=60, flush_interval=60)
+
+    for i in range(5):
+        fingerprint = sink.capture(raise_error(f"error {i}"))
+    sink.stop()
+
+    content = (tmp_path / "errors.log").read_text()
+    assert content.count("Traceback") == 1
+    assert f"{fingerprint} repeated 4 times" in content
+    assert sink.summary() == {fingerprint: 5}
@@ -0,0 +1,55 @@
+import pytest
+
+from utils.item_filter import ItemFilter
+
+RULES = {
+    "names": ["Mann Co. Supply Crate Key"],
+    "prefixes": ["Strange Professional Killstreak"],
+    "patterns": [r"Case #\d+$"],
+    "qualities": ["Haunted"],
+    "price_bands": [[0, 0.05], [500, None]],
+    "attachments": ["Halloween Fire"],
+}
+
+
+@pytest.mark.parametrize(
+    "item_name, item_price, item_attachments, expected",
+    [
+        ("Mann Co. Supply Crate Key", "2.10", None, "names"),
+        ("Strange Professional Killstreak Scattergun", "30.00", None, "prefixes/patterns"),
+        ("Creepy Crawly Case #130", "1.00", None, "prefixes/patterns"),
+        ("Haunted Ghastly Gibus", "1.00", None, "prefixes/patterns"),
+        # o prefixo só vale no começo do nome
+        ("Unusual Haunted Hat", "1.00", None, None),
+        ("Team Captain", "0.03", None, "price_bands"),
+        ("Team Captain", "900.00", None, "price_bands"),
+        ("Team Captain", "", None, None),
+        ("Team Captain", "10.00", ["Halloween Fire"], "attachments"),
+        ("Team Captain", "10.00", ["Burning Flames"], None),
+    ],
+)
+def test_match(item_name, item_price, item_attachments, expected):
+    assert ItemFilter(RULES).match(item_name, item_price, item_attachments) == expected
+
+
+def test_any_attachment():
+    item_filter = ItemFilter({"any_attachment": True})
+
+    assert item_filter.match("Team Captain", "10.00", ["Burning Flames"]) == "any_attachment"
+    assert item_filter.match("Team Captain", "10.00", []) is None
+
+
+def test_from_config_accepts_the_old_list():
+    item_filter = ItemFilter.from_config(["Refined Metal", "Mann Co. Supply Crate Key"])
+
+    assert item_filter.names == {"Refined Metal", "Mann Co. Supply Crate Key"}
+    assert "Refined Metal" in item_filter
+    assert "Team Captain" not in item_filter
+    assert ItemFilter.from_config(item_filter) is item_filter
+    assert ItemFilter.from_config(None).match("Team Captain") is None
+
+
+@pytest.mark.parametrize("rules", [{"colors": ["red"]}, {"qualities": ["Shiny"]}])
+def test_invalid_rules(rules):
+    with pytest.raises(ValueError):
+        ItemFilter(rules)
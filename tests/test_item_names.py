@@ -0,0 +1,29 @@
+import pytest
+
+from utils.item_names import clear_name_cache, name_cache_info, normalize_item_name
+
+
+@pytest.mark.parametrize(
+    "item_name, unusual_effect, expected",
+    [
+        ("Specialized Killstreak Rocket Launcher Kit", None, "Non-Craftable Specialized Killstreak Rocket Launcher Kit"),
+        ("Strange Unusualifier", None, "Non-Craftable Strange Unusualifier"),
+        ("Mann Co. Supply Crate Series #85", None, "Mann Co. Supply Crate #85"),
+        ("Unusual Team Captain", "Burning Flames", "Burning Flames Team Captain"),
+        ("Unusual Team Captain", None, "Unusual Team Captain"),
+        ("Taunt: The Schadenfreude #1", None, "Taunt: The Schadenfreude %231"),
+        ("Team Captain", None, "Team Captain"),
+    ],
+)
+def test_normalize_item_name(item_name, unusual_effect, expected):
+    assert normalize_item_name(item_name, unusual_effect) == expected
+
+
+def test_names_are_memoized():
+    clear_name_cache()
+    normalize_item_name("Unusual Team Captain", "Burning Flames")
+    normalize_item_name("Unusual Team Captain", "Burning Flames")
+    normalize_item_name("Unusual Team Captain", "Scorching Flames")
+
+    info = name_cache_info()
+    assert (info.hits, info.misses) == (1, 2)
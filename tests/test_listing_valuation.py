@@ -0,0 +1,64 @@
+import sqlite3
+import time
+
+import pytest
+
+from utils.listing_valuation import ListingValuation
+from utils.listings import Listing
+from utils.snapshot_codec import encode_listings
+
+REFINED_TO_USD = 0.05
+KEY_TO_USD = 2.0
+
+
+@pytest.fixture
+def snapshot_cursor():
+    conn = sqlite3.connect(":memory:")
+    conn.execute(
+        "CREATE TABLE snapshot_results (id INTEGER PRIMARY KEY, name TEXT UNIQUE, listings BLOB, fetched_at INTEGER)"
+    )
+    now = int(time.time())
+    snapshots = [
+        (
+            "Team Captain",
+            [
+                Listing(30.0, 0, 30.0, None, 0, "1"),
+                Listing(None, 1, 5.0, None, 0, "2"),
+                Listing(10.0, 0, 10.0, None, 0, "3"),
+                Listing(20.0, 0, 20.0, None, 0, "4"),
+            ],
+            now,
+        ),
+        ("Ellis' Cap", [Listing(2.0, 0, 2.0, None, 0, "5")], now),
+        ("Expired Hat", [Listing(1.0, 0, 1.0, None, 0, "6")], now - 7200),
+    ]
+    conn.executemany(
+        "INSERT INTO snapshot_results (name, listings, fetched_at) VALUES (?, ?, ?)",
+        [(name, encode_listings(listings), fetched_at) for name, listings, fetched_at in snapshots],
+    )
+    yield conn.cursor()
+    conn.close()
+
+
+def test_load_cached_snapshots(snapshot_cursor):
+    valuation = ListingValuation()
+
+    # a listing sem preço fica de fora, assim como o snapshot expirado
+    assert valuation.load(snapshot_cursor, cache_duration_hours=1) == 4
+    assert valuation.revalue(refined_to_usd=REFINED_TO_USD, key_to_usd=KEY_TO_USD)
+
+    averages = valuation.top_n_averages(2)
+    assert averages == {
+        "Team Captain": pytest.approx((10.0 + 20.0) / 2 * REFINED_TO_USD),
+        "Ellis' Cap": pytest.approx(2.0 * REFINED_TO_USD),
+    }
+
+
+def test_revalue_only_when_the_rates_change(snapshot_cursor):
+    valuation = ListingValuation()
+    valuation.load(snapshot_cursor)
+
+    assert valuation.revalue(REFINED_TO_USD, KEY_TO_USD)
+    assert not valuation.revalue(REFINED_TO_USD, KEY_TO_USD)
+    assert valuation.revalue(REFINED_TO_USD * 2, KEY_TO_USD)
+    assert valuation.top_n_averages(1)["Expired Hat"] == pytest.approx(REFINED_TO_USD * 2)
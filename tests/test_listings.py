@@ -0,0 +1,50 @@
+import pytest
+
+from utils.listings import Listing, has_spell_or_strange_part, reformat_listings
+
+REFINED_TO_USD = 0.05
+KEY_TO_USD = 2.0
+
+
+def buy_listing(steamid, price=None, currencies=None, attributes=None, **kwargs):
+    return {
+        "steamid": steamid,
+        "intent": "buy",
+        "price": price,
+        "currencies": currencies or {},
+        "item": {"attributes": attributes or []},
+        "bump": 1700000000,
+        **kwargs,
+    }
+
+
+def test_spells_and_strange_parts():
+    assert has_spell_or_strange_part([{"defindex": 1004, "float_value": 1}])
+    # defindex como string também é aceito
+    assert has_spell_or_strange_part([{"defindex": "380", "float_value": 1}])
+    assert not has_spell_or_strange_part([{"defindex": 380, "float_value": -5}])
+    assert not has_spell_or_strange_part([{"defindex": 142, "float_value": 1}])
+    assert not has_spell_or_strange_part([])
+
+
+def test_reformat_listings():
+    listings = [
+        buy_listing("1", price=20.0),
+        # sem price, o valor sai das currencies
+        buy_listing("2", currencies={"keys": 1, "metal": 10}),
+        buy_listing("3", price=20.0, intent="sell"),
+        buy_listing("4", price=20.0, buyout=0),
+        buy_listing("5", price=20.0, attributes=[{"defindex": 1004, "float_value": 1}]),
+    ]
+
+    assert reformat_listings(listings, REFINED_TO_USD, KEY_TO_USD) == [
+        Listing(20.0, 0.0, 0.0, pytest.approx(20.0 * REFINED_TO_USD), 1700000000, "1"),
+        Listing(None, 1.0, 10.0, pytest.approx(KEY_TO_USD + 10 * REFINED_TO_USD), 1700000000, "2"),
+    ]
+
+
+def test_currencies_are_not_valued_without_the_rates():
+    listings = [buy_listing("1", currencies={"keys": 1}), buy_listing("2", price=20.0)]
+
+    formatted = reformat_listings(listings, refined_to_usd=REFINED_TO_USD, key_to_usd=0)
+    assert [listing.usd_estimated for listing in formatted] == [None, pytest.approx(1.0)]
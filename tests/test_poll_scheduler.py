@@ -0,0 +1,71 @@
+import math
+
+import pytest
+
+from utils.poll_scheduler import DAY_SECONDS, SLOT_SECONDS, PollScheduler
+
+# meia-noite, o começo da primeira faixa do dia
+START = 100 * DAY_SECONDS
+CONFIG = {
+    "min_interval_seconds": 1,
+    "max_interval_seconds": 30,
+    "burst_seconds": 120,
+    "backoff": 1.5,
+    "restock_probability": 0.02,
+    "history_days": 28,
+}
+
+
+def test_burst_after_a_restock_then_backoff():
+    scheduler = PollScheduler(CONFIG)
+
+    # sem histórico nem restock, o intervalo cresce a partir do mínimo
+    assert scheduler.record_poll(0, START) == 1.5
+    assert scheduler.record_poll(5, START + 1) == 1
+    assert scheduler.record_poll(0, START + 60) == 1
+
+    intervals = [scheduler.record_poll(0, START + 121 + i) for i in range(10)]
+    assert intervals[:3] == pytest.approx([1.5, 2.25, 3.375])
+    assert intervals[-1] == 30
+    assert scheduler.stats()["restocks"] == 1
+
+
+def test_busy_slots_keep_the_interval_short():
+    # 10 restocks por dia na mesma faixa durante todo o histórico
+    history = [
+        (START - day * DAY_SECONDS + SLOT_SECONDS // 2 + i, 1) for day in range(1, 29) for i in range(10)
+    ]
+    scheduler = PollScheduler(CONFIG, history)
+    now = START + SLOT_SECONDS // 2
+
+    rate = 280 / (28 * 3 * SLOT_SECONDS)
+    assert scheduler.restock_rate(now) == pytest.approx(rate)
+    expected = -math.log(1 - CONFIG["restock_probability"]) / rate
+    assert scheduler.history_interval(now) == pytest.approx(expected)
+
+    for i in range(20):
+        interval = scheduler.record_poll(0, now + i)
+    # o histórico é o mesmo, a não ser pelos restocks que saíram da janela nessas leituras
+    assert interval == pytest.approx(expected, rel=0.01)
+    # meio dia depois a faixa não tem restocks
+    assert scheduler.history_interval(now + DAY_SECONDS // 2) == 30
+
+
+def test_old_restocks_expire():
+    history = [(START - 30 * DAY_SECONDS, 3)]
+    scheduler = PollScheduler(CONFIG, history)
+
+    assert scheduler.restock_rate(START - 30 * DAY_SECONDS) > 0
+    scheduler.record_poll(0, START)
+    assert scheduler.restock_rate(START) == 0
+    assert sum(scheduler.slot_counts) == 0
+
+
+def test_detection_latency():
+    scheduler = PollScheduler(CONFIG)
+    scheduler.record_poll(0, START)
+    scheduler.record_poll(2, START + 4)
+
+    stats = scheduler.stats()
+    assert stats["latency_p50"] == 4
+    assert stats["polls"] == 2
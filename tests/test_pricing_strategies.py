@@ -0,0 +1,101 @@
+import random
+import time
+
+import pytest
+
+from utils.listings import Listing
+from utils.pricing_strategies import (PARTIAL_SELECTION_MIN_LISTINGS, PRICING_STRATEGIES,
+                                      BumpRecencyStrategy, MeanStrategy, MedianStrategy,
+                                      SellerDedupStrategy, TrimmedMeanStrategy,
+                                      create_pricing_strategy)
+
+
+def make_listing(price, steamid="1", bumped_at=None):
+    return Listing(price, 0, price, price, bumped_at, steamid)
+
+
+def legacy_average(listings, listing_quantity):
+    """compare_items_prices antes das estratégias: sort completo e média das primeiras."""
+    top_listings = sorted(listings, key=lambda listing: listing.price)[:listing_quantity]
+    return sum(listing.usd_estimated for listing in top_listings) / len(top_listings)
+
+
+@pytest.mark.parametrize("size", [1, 3, 10, PARTIAL_SELECTION_MIN_LISTINGS + 50])
+def test_mean_matches_the_legacy_sort_and_average(size):
+    rng = random.Random(size)
+    listings = [make_listing(round(rng.uniform(1, 100), 2), str(i)) for i in range(size)]
+    # preços repetidos: a seleção parcial também precisa ser estável
+    listings += listings[: size // 2]
+
+    for listing_quantity in (1, 3, 5):
+        assert MeanStrategy().price(listings, listing_quantity) == legacy_average(listings, listing_quantity)
+
+
+def test_listings_without_price_are_skipped():
+    listings = [make_listing(None), make_listing(10.0), make_listing(20.0)]
+
+    assert MeanStrategy().price(listings, 3) == pytest.approx(15.0)
+    assert MeanStrategy().price([make_listing(None)], 3) is None
+
+
+def test_median():
+    listings = [make_listing(price) for price in (10.0, 11.0, 90.0, 200.0)]
+
+    assert MedianStrategy().price(listings, 3) == pytest.approx(11.0)
+
+
+@pytest.mark.parametrize(
+    "prices, trim, expected",
+    [
+        # o corte é arredondado para cima: com 3 listings só a do meio fica
+        ((10.0, 11.0, 90.0), 0.2, 11.0),
+        # 2 listings não são cortadas
+        ((10.0, 20.0), 0.2, 15.0),
+        ((5.0, 10.0, 11.0, 12.0, 90.0), 0.2, 11.0),
+        ((10.0, 11.0, 90.0), 0, 37.0),
+        # 10 * 0.3 corta 3 de cada lado, não 4
+        (tuple(float(price) for price in range(1, 11)), 0.3, 5.5),
+    ],
+)
+def test_trimmed_mean(prices, trim, expected):
+    listings = [make_listing(price) for price in prices]
+
+    assert TrimmedMeanStrategy(trim).price(listings, len(listings)) == pytest.approx(expected)
+
+
+def test_trimmed_mean_rejects_invalid_trim():
+    with pytest.raises(ValueError):
+        TrimmedMeanStrategy(0.5)
+
+
+def test_bump_recency_weighs_recent_listings_more():
+    now = time.time()
+    listings = [
+        make_listing(10.0, bumped_at=now),
+        make_listing(20.0, bumped_at=now - 6 * 3600),
+    ]
+
+    # a listing de 6 horas atrás pesa metade
+    assert BumpRecencyStrategy(half_life_hours=6).price(listings, 2) == pytest.approx(
+        (10.0 + 20.0 * 0.5) / 1.5, rel=1e-3
+    )
+
+
+def test_seller_dedup_keeps_the_cheapest_listing_of_each_seller():
+    listings = [
+        make_listing(10.0, steamid="a"),
+        make_listing(12.0, steamid="a"),
+        make_listing(30.0, steamid="b"),
+    ]
+
+    assert SellerDedupStrategy().price(listings, 2) == pytest.approx(20.0)
+
+
+def test_create_pricing_strategy():
+    assert isinstance(create_pricing_strategy(), MeanStrategy)
+    strategy = create_pricing_strategy({"name": "trimmed_mean", "trim": 0.1})
+    assert isinstance(strategy, TrimmedMeanStrategy)
+    assert strategy.trim == 0.1
+    assert set(PRICING_STRATEGIES) == {"mean", "median", "trimmed_mean", "bump_recency", "seller_dedup"}
+    with pytest.raises(ValueError):
+        create_pricing_strategy({"name": "unknown"})
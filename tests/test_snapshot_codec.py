@@ -0,0 +1,62 @@
+import json
+import zlib
+
+import pytest
+
+from utils import snapshot_codec
+from utils.listings import Listing
+from utils.snapshot_codec import decode_listings, encode_listings
+
+LISTINGS = [
+    Listing(30.5, 1, 30.5, 61.5, 1700000000, "76561198000000001"),
+    Listing(None, 0, 0, None, None, None),
+    # steamid que não é numérico fica como string
+    Listing(2.0, 0, 2.0, 0.1, 1700000100, "anonymous"),
+]
+
+
+@pytest.mark.parametrize("serializer", sorted(name for name, _, _ in snapshot_codec._serializers.values()))
+def test_round_trip(serializer):
+    encoded = encode_listings(LISTINGS, serializer=serializer)
+
+    assert isinstance(encoded, bytes)
+    assert decode_listings(encoded) == LISTINGS
+
+
+def test_legacy_json_text():
+    # formato antigo: saída completa do reformat_snapshot salva como texto
+    legacy = json.dumps(
+        [
+            {
+                "price": 30.5,
+                "currencies": {"keys": 1, "metal": 30.5},
+                "usd_estimated": 61.5,
+                "bumped_at": 1700000000,
+                "steamid": "76561198000000001",
+                "item": {"name": "Team Captain"},
+            },
+            {"price": 2.0, "keys": 0, "metal": 2.0, "usd_estimated": 0.1, "steamid": "anonymous"},
+        ]
+    )
+
+    assert decode_listings(legacy) == [
+        LISTINGS[0],
+        Listing(2.0, 0, 2.0, 0.1, None, "anonymous"),
+    ]
+
+
+def test_legacy_dicts_are_encoded_compactly():
+    legacy = [LISTINGS[0]._asdict()]
+
+    assert decode_listings(encode_listings(legacy)) == [LISTINGS[0]]
+
+
+def test_unknown_versions_are_rejected():
+    payload = zlib.compress(b"[]")
+
+    with pytest.raises(ValueError):
+        decode_listings(bytes([snapshot_codec.SNAPSHOT_SCHEMA_VERSION + 1, 0]) + payload)
+    with pytest.raises(ValueError):
+        decode_listings(bytes([snapshot_codec.SNAPSHOT_SCHEMA_VERSION, 255]) + payload)
+    with pytest.raises(ValueError):
+        encode_listings(LISTINGS, serializer="pickle")
@@ -0,0 +1,74 @@
+import sqlite3
+
+import pytest
+
+import db_migrations
+from stock_history import StockHistory
+
+T0 = 1700000000
+
+
+def item(name, price, have, max_qty=10, rate=0.9):
+    return {"name": name, "price": price, "have": have, "max": max_qty, "rate": rate}
+
+
+@pytest.fixture
+def history():
+    conn = sqlite3.connect(":memory:")
+    db_migrations._migration_007_loot_farm_history(conn.cursor())
+    yield StockHistory(conn)
+    conn.close()
+
+
+def history_rows(history):
+    return history.cursor.execute(
+        """
+        SELECT i.name, h.recorded_at, h.price_cents, h.have FROM loot_farm_history h
+        JOIN loot_farm_items i ON i.id = h.item_id ORDER BY h.recorded_at, i.name
+        """
+    ).fetchall()
+
+
+def test_only_changed_items_are_written(history):
+    assert history.record([item("Team Captain", 1000, 2), item("Ellis' Cap", 200, 1)], T0) == 2
+    assert history.record([item("Team Captain", 1000, 2), item("Ellis' Cap", 200, 1)], T0 + 60) == 0
+    assert history.record([item("Team Captain", 1000, 1), item("Ellis' Cap", 200, 1)], T0 + 120) == 1
+
+    assert history_rows(history) == [
+        ("Ellis' Cap", T0, 200, 1),
+        ("Team Captain", T0, 1000, 2),
+        ("Team Captain", T0 + 120, 1000, 1),
+    ]
+
+
+def test_missing_items_are_recorded_out_of_stock_once(history):
+    history.record([item("Team Captain", 1000, 2), item("Ellis' Cap", 200, 1)], T0)
+
+    # o item some da API quando acaba
+    assert history.record([item("Team Captain", 1000, 2)], T0 + 60) == 1
+    assert history.record([item("Team Captain", 1000, 2)], T0 + 120) == 0
+    assert history_rows(history)[-1] == ("Ellis' Cap", T0 + 60, 200, 0)
+    assert history.state_at(T0 + 90)["Ellis' Cap"] == (2.0, 0, 10, 0.9)
+    assert history.state_at(T0 + 30)["Ellis' Cap"] == (2.0, 1, 10, 0.9)
+
+
+def test_last_state_is_loaded_from_the_table(history):
+    history.record([item("Team Captain", 1000, 2)], T0)
+
+    # outra instância (bot reiniciado) continua o delta do que já está gravado
+    restarted = StockHistory(history.conn)
+    assert restarted.record([item("Team Captain", 1000, 2)], T0 + 60) == 0
+    assert restarted.record([], T0 + 120) == 1
+
+
+def test_restocks_and_sales(history, monkeypatch):
+    monkeypatch.setattr("stock_history.time.time", lambda: T0 + 1000)
+    history.record([item("Team Captain", 1000, 1)], T0)
+    history.record([item("Team Captain", 1100, 3)], T0 + 100)
+    history.record([item("Team Captain", 1100, 2)], T0 + 160)
+
+    assert history.restocks("Team Captain") == [("Team Captain", T0 + 100, 2, pytest.approx(11.0))]
+    assert history.price_trajectory("Team Captain") == [(T0, 10.0), (T0 + 100, 11.0)]
+    speed = history.sell_out_speed("Team Captain")
+    assert speed["sold"] == 1
+    assert speed["median_seconds_to_sale"] == 60
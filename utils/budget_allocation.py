@@ -0,0 +1,149 @@
+import numpy as np
+
+# Configuração padrão da escolha dos itens do withdraw, pode ser sobrescrita pela chave
+# "withdraw_allocation" do config.json
+DEFAULT_ALLOCATION_CONFIG = {
+    # "profit" (maior lucro total) ou "profit_per_dollar" (maior soma do retorno de cada item)
+    "objective": "profit",
+    # itens por trade (0 sem limite)
+    "max_items_per_trade": 0,
+}
+
+OBJECTIVES = ("profit", "profit_per_dollar")
+
+# Células da tabela da mochila (itens x linhas x centavos) acima das quais a escolha é
+# gulosa: no limite cerca de 0.4 s e 40 MB
+MAX_KNAPSACK_CELLS = 100_000_000
+
+
+def to_cents(value) -> int:
+    """USD (float or the text of the page) to integer cents."""
+    return int(round(float(value) * 100))
+
+
+def item_value(item: dict, objective: str) -> float:
+    profit = float(item["average_price"]) - float(item["loot_farm_price"])
+    if objective == "profit_per_dollar":
+        return profit / max(float(item["loot_farm_price"]), 0.01)
+    return profit
+
+
+def _knapsack(costs: np.ndarray, values: np.ndarray, capacity: int, limit: int) -> list:
+    """Exact 0/1 knapsack, returns the indexes of the chosen items."""
+    # com limite, a linha j é o melhor valor com exatamente j itens (j >= 1 começa inalcançável)
+    rows = limit + 1 if limit < len(costs) else 1
+    best = np.full((rows, capacity + 1), -np.inf)
+    best[0] = 0.0
+    # backtrack compacto: um bit por célula de cada item
+    taken = []
+    for cost, value in zip(costs.tolist(), values.tolist()):
+        source = best[:-1] if rows > 1 else best
+        target = best[1:, cost:] if rows > 1 else best[:, cost:]
+        candidate = source[:, : capacity + 1 - cost] + value
+        take = candidate > target
+        np.copyto(target, candidate, where=take)
+        taken.append(np.packbits(take, axis=-1))
+
+    row, spent = np.unravel_index(np.argmax(best), best.shape)
+    chosen = []
+    for index in range(len(costs) - 1, -1, -1):
+        cost = int(costs[index])
+        if spent >= cost and (rows == 1 or row > 0):
+            column = spent - cost
+            if (taken[index][row - 1 if rows > 1 else 0, column >> 3] >> (7 - (column & 7))) & 1:
+                chosen.append(index)
+                spent -= cost
+                row -= 1 if rows > 1 else 0
+    return chosen
+
+
+def _greedy(costs: np.ndarray, values: np.ndarray, capacity: int, limit: int) -> list:
+    """Items by value per cent while they fit, for the instances too big for the knapsack."""
+    chosen = []
+    for index in np.argsort(-values / costs.clip(1), kind="stable").tolist():
+        if len(chosen) >= limit:
+            break
+        if costs[index] <= capacity:
+            chosen.append(index)
+            capacity -= int(costs[index])
+    return chosen
+
+
+def allocate_budget(
+    items: list, budget: float, max_items: int = 0, objective: str = "profit"
+) -> tuple[list, list]:
+    """
+    Chooses the items of a withdraw that fit in the balance and give the most value: an
+    exact 0/1 knapsack over the prices in integer cents, with the number of items of the
+    trade as a second dimension when there is a limit. Above MAX_KNAPSACK_CELLS the items
+    are chosen greedily by value per dollar.
+
+    Args:
+        items (list): Profitable items (loot_farm_price and average_price in USD).
+        budget (float): Money available in USD.
+        max_items (int, optional): Items per trade, 0 for no limit.
+        objective (str, optional): "profit" or "profit_per_dollar".
+
+    Returns:
+        tuple[list, list]: The chosen items (in the original order) and the dropped ones as
+            (item, reason) pairs, reason being not_profitable, too_expensive, budget or
+            trade_item_limit.
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Unknown withdraw objective '{objective}', available: {', '.join(OBJECTIVES)}")
+
+    budget_cents = max(int(float(budget) * 100 + 1e-6), 0)
+    dropped = []
+    candidates = []
+    for item in items:
+        cost = to_cents(item["loot_farm_price"])
+        value = item_value(item, objective)
+        if value <= 0:
+            dropped.append((item, "not_profitable"))
+        elif cost > budget_cents:
+            dropped.append((item, "too_expensive"))
+        else:
+            candidates.append((item, cost, value))
+
+    limit = max_items if 0 < max_items < len(candidates) else len(candidates)
+    total_cost = sum(cost for _, cost, _ in candidates)
+    # caso comum: tudo cabe no saldo e no limite do trade
+    if total_cost <= budget_cents and limit == len(candidates):
+        return [item for item, _, _ in candidates], dropped
+
+    costs = np.array([cost for _, cost, _ in candidates], dtype=np.int64)
+    values = np.array([value for _, _, value in candidates])
+    # índice em candidates de cada item que entra na mochila
+    positions = np.arange(len(candidates))
+    if limit < len(candidates):
+        # quantos itens cabem no saldo no máximo: se não passa do limite, o limite não muda nada
+        if np.searchsorted(np.cumsum(np.sort(costs)), budget_cents, side="right") <= limit:
+            limit = len(candidates)
+        else:
+            # um item com pelo menos limit itens mais baratos e mais lucrativos nunca é necessário
+            # (sempre sobra um deles fora do trade para trocar), empates são desfeitos pela posição
+            keep = [
+                np.count_nonzero(
+                    (costs <= costs[index])
+                    & (values >= values[index])
+                    & ((costs < costs[index]) | (values > values[index]) | (positions < index))
+                )
+                < limit
+                for index in positions
+            ]
+            positions = positions[np.array(keep, dtype=bool)]
+            costs, values = costs[positions], values[positions]
+
+    capacity = int(min(budget_cents, costs.sum()))
+    rows = limit + 1 if limit < len(costs) else 1
+    solver = _knapsack if len(costs) * rows * (capacity + 1) <= MAX_KNAPSACK_CELLS else _greedy
+    chosen = {int(positions[index]) for index in solver(costs, values, capacity, limit)}
+
+    selected = [item for index, (item, _, _) in enumerate(candidates) if index in chosen]
+    remaining_cents = budget_cents - sum(candidates[index][1] for index in chosen)
+    for index, (item, cost, _) in enumerate(candidates):
+        if index not in chosen:
+            # coube no saldo que sobrou, então foi o limite de itens do trade que o tirou
+            reason = "trade_item_limit" if len(chosen) >= limit and cost <= remaining_cents else "budget"
+            dropped.append((item, reason))
+    return selected, dropped
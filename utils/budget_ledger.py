@@ -0,0 +1,178 @@
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+
+from utils.budget_allocation import to_cents
+from utils.metrics import counter
+
+BUDGET_RESERVATIONS = counter(
+    "budget_reservations_total", "Budget reservations by result (reserved, rejected, committed, released, expired)"
+)
+
+
+class BudgetLedger:
+    """
+    The Loot.Farm balance and the money held for the profitable items between the buy
+    decision and the trade.
+
+    An item is reserved when it is judged profitable, the reservation is committed when
+    the trade is made (the balance goes down) or released when the item is not withdrawn.
+    Reservations that are never finished expire after reservation_timeout; a trade that
+    was opened but not confirmed keeps its reservation (extend) until a reconcile has read
+    the new balance. Every operation runs under a lock, so two evaluators can never reserve
+    the same money.
+
+    reconcile() replaces the balance with the one read from the page; the trades
+    committed in the last settle_seconds stay subtracted, in case the page does not
+    show them yet (the ledger prefers to spend less than to overspend).
+    """
+
+    def __init__(self, reservation_timeout: float = 600, settle_seconds: float = 120):
+        self.reservation_timeout = reservation_timeout
+        self.settle_seconds = settle_seconds
+        self.logger = logging.getLogger(__name__)
+
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        # tudo em centavos para as somas serem exatas
+        self.balance_cents = 0
+        self.reserved_cents = 0
+        # id -> (centavos, expira em, descrição)
+        self.reservations = {}
+        # (confirmado em, centavos) dos trades que talvez ainda não apareçam no saldo da página
+        self.recent_commits = deque()
+        self.last_drift = 0.0
+
+    @property
+    def balance(self) -> float:
+        """Balance in USD after the committed trades."""
+        return self.balance_cents / 100
+
+    @property
+    def reserved(self) -> float:
+        return self.reserved_cents / 100
+
+    def _expire(self, now: float) -> None:
+        expired = [
+            reservation_id
+            for reservation_id, (_, expires_at, _) in self.reservations.items()
+            if expires_at <= now
+        ]
+        for reservation_id in expired:
+            cents, _, label = self.reservations.pop(reservation_id)
+            self.reserved_cents -= cents
+            BUDGET_RESERVATIONS.inc(result="expired")
+            self.logger.warning(f"Budget reservation of {label} ({cents / 100} USD) expired")
+
+    def available(self) -> float:
+        """Money in USD that is neither spent nor reserved."""
+        with self._lock:
+            self._expire(time.monotonic())
+            return (self.balance_cents - self.reserved_cents) / 100
+
+    def reserve(self, amount, label: str = None) -> int:
+        """
+        Holds money for an item.
+
+        Args:
+            amount: Price in USD (float or the text of the page).
+            label (str, optional): Description of the item for the logs.
+
+        Returns:
+            int: The reservation id, or None if the available money is not enough.
+        """
+        cents = to_cents(amount)
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            if cents > self.balance_cents - self.reserved_cents:
+                BUDGET_RESERVATIONS.inc(result="rejected")
+                return None
+            reservation_id = next(self._ids)
+            self.reservations[reservation_id] = (cents, now + self.reservation_timeout, label)
+            self.reserved_cents += cents
+        BUDGET_RESERVATIONS.inc(result="reserved")
+        return reservation_id
+
+    def held(self, reservation_ids) -> float:
+        """Money in USD still held by these reservations."""
+        with self._lock:
+            return sum(
+                self.reservations[reservation_id][0]
+                for reservation_id in reservation_ids
+                if reservation_id in self.reservations
+            ) / 100
+
+    def extend(self, reservation_id: int) -> bool:
+        """
+        Holds a reservation for another reservation_timeout, for a trade whose result is
+        not known yet. Unknown ids are ignored.
+        """
+        with self._lock:
+            reservation = self.reservations.get(reservation_id)
+            if reservation is None:
+                return False
+            cents, _, label = reservation
+            self.reservations[reservation_id] = (cents, time.monotonic() + self.reservation_timeout, label)
+        return True
+
+    def commit(self, reservation_id: int, amount=None) -> bool:
+        """
+        The trade was made: the reserved money leaves the balance.
+
+        Args:
+            amount (optional): Price in USD spent if the reservation already expired.
+
+        Returns:
+            bool: False if there was no reservation (amount is still spent when given).
+        """
+        with self._lock:
+            reservation = self.reservations.pop(reservation_id, None)
+            if reservation is not None:
+                cents = reservation[0]
+                self.reserved_cents -= cents
+            elif amount is not None:
+                cents = to_cents(amount)
+            else:
+                return False
+            self.balance_cents -= cents
+            self.recent_commits.append((time.monotonic(), cents))
+        BUDGET_RESERVATIONS.inc(result="committed")
+        return reservation is not None
+
+    def release(self, reservation_id: int) -> bool:
+        """The item was not withdrawn: the money is available again. Unknown ids are ignored."""
+        with self._lock:
+            reservation = self.reservations.pop(reservation_id, None)
+            if reservation is None:
+                return False
+            self.reserved_cents -= reservation[0]
+        BUDGET_RESERVATIONS.inc(result="released")
+        return True
+
+    def reconcile(self, page_balance) -> float:
+        """
+        Replaces the balance with the one read from the Loot.Farm page.
+
+        Returns:
+            float: Difference in USD between the page and the balance the ledger expected.
+        """
+        now = time.monotonic()
+        with self._lock:
+            while self.recent_commits and now - self.recent_commits[0][0] >= self.settle_seconds:
+                self.recent_commits.popleft()
+            unsettled_cents = sum(cents for _, cents in self.recent_commits)
+            new_balance_cents = to_cents(page_balance) - unsettled_cents
+            drift_cents = new_balance_cents - self.balance_cents
+            self.balance_cents = new_balance_cents
+            self._expire(now)
+        self.last_drift = drift_cents / 100
+        if drift_cents:
+            self.logger.info(
+                f"Budget reconciled with the Loot.Farm balance: {page_balance} USD "
+                f"({unsettled_cents / 100} USD of recent trades kept), drift {self.last_drift} USD"
+            )
+        return self.last_drift
+
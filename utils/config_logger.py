@@ -1,15 +1,223 @@
+import atexit
+import json
 import logging
+import queue
+import sys
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
 import coloredlogs
 
+from utils.load_config import load_config
+from utils.metrics import counter
+
+config = load_config("config.json")
+
+# Arquivo de log estruturado (uma linha JSON por evento)
+LOG_FILE = "logs/bot.jsonl"
+LOG_MAX_BYTES = config.get("log_max_bytes", 10 * 1024 * 1024)
+LOG_BACKUP_COUNT = 5
+# Registros esperando o listener antes de serem descartados
+LOG_QUEUE_SIZE = config.get("log_queue_size", 10000)
+
+# Arquivos de debug escritos pelo mesmo listener (nome -> caminho)
+SIDE_FILES = {
+    "snapshot_request": "logs/snapshot_request.txt",
+    "profitable_items": "logs/profitable_items.txt",
+    "snapshot_cache_error": "logs/fetch_item_snapshot_with_cache_error.txt",
+    "traces": "logs/traces.jsonl",
+}
+SIDE_LOGGER_PREFIX = "lootbot.files."
+
+LOG_RECORDS_DROPPED = counter(
+    "log_records_dropped_total", "Log records dropped because the logging queue was full"
+)
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as a single JSON line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "module": record.module,
+            "line": record.lineno,
+            "thread": record.threadName,
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry["stack_info"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class _BufferedRotatingFileHandler(RotatingFileHandler):
+    """
+    RotatingFileHandler that keeps the file open and only flushes when the logging
+    queue is drained (see _RoutingHandler), instead of after every record.
+    """
+
+    def flush(self) -> None:
+        pass
+
+    def flush_buffer(self) -> None:
+        super().flush()
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    """
+    Hands the record to the listener without formatting it in the caller (the listener
+    formats it). A full queue drops the record instead of blocking the event loop.
+    """
+
+    def __init__(self, log_queue: queue.SimpleQueue, max_size: int):
+        super().__init__(log_queue)
+        self.max_size = max_size
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        # SimpleQueue é bem mais barata que queue.Queue, o limite é checado aqui
+        if self.queue.qsize() >= self.max_size:
+            LOG_RECORDS_DROPPED.inc()
+            return
+        self.queue.put_nowait(record)
+
+
+class _RoutingHandler(logging.Handler):
+    """Runs in the listener thread: side file records go to their file, the rest to the root handlers."""
+
+    def __init__(self, log_queue: queue.SimpleQueue):
+        super().__init__()
+        self.log_queue = log_queue
+        self.handlers = []
+        self.side_handlers = {}
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        side_handler = self.side_handlers.get(record.name)
+        if side_handler is not None:
+            side_handler.handle(record)
+        else:
+            for handler in self.handlers:
+                if record.levelno >= handler.level:
+                    handler.handle(record)
+
+        # fila vazia: escreve o que ficou no buffer
+        if self.log_queue.empty():
+            self.flush()
+        return True
+
+    def flush(self) -> None:
+        for handler in (*self.handlers, *self.side_handlers.values()):
+            if isinstance(handler, _BufferedRotatingFileHandler):
+                handler.flush_buffer()
+            else:
+                handler.flush()
+
+    def close(self) -> None:
+        self.flush()
+        for handler in (*self.handlers, *self.side_handlers.values()):
+            handler.close()
+        super().close()
+
+
+class LogPipeline:
+    """
+    The loggers only put the records in a queue, a QueueListener thread formats and writes
+    them (console, logs/bot.jsonl and the side files of SIDE_FILES).
+    """
+
+    def __init__(self, queue_size: int = LOG_QUEUE_SIZE):
+        self.queue = queue.SimpleQueue()
+        self.router = _RoutingHandler(self.queue)
+        self.queue_handler = _NonBlockingQueueHandler(self.queue, queue_size)
+        self.listener = QueueListener(self.queue, self.router)
+        self.listener.start()
+        self.running = True
+        atexit.register(self.stop)
+
+    def set_handlers(self, handlers: list) -> None:
+        """Replaces the handlers of the root records."""
+        old_handlers = self.router.handlers
+        self.router.handlers = list(handlers)
+        for handler in old_handlers:
+            handler.close()
+
+    def side_logger(
+        self, name: str, max_bytes: int = LOG_MAX_BYTES, backup_count: int = LOG_BACKUP_COUNT
+    ) -> logging.Logger:
+        logger_name = SIDE_LOGGER_PREFIX + name
+        if logger_name not in self.router.side_handlers:
+            handler = _BufferedRotatingFileHandler(
+                SIDE_FILES[name],
+                maxBytes=max_bytes,
+                backupCount=backup_count,
+                encoding="utf-8",
+                delay=True,
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self.router.side_handlers[logger_name] = handler
+
+        logger = logging.getLogger(logger_name)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        if self.queue_handler not in logger.handlers:
+            logger.addHandler(self.queue_handler)
+        return logger
+
+    def stop(self) -> None:
+        """Writes the records still in the queue and closes the files."""
+        if not self.running:
+            return
+        self.running = False
+        self.listener.stop()
+        self.router.close()
+
+
+_pipeline = None
+
+
+def get_log_pipeline() -> LogPipeline:
+    global _pipeline
+    if _pipeline is None:
+        _pipeline = LogPipeline()
+    return _pipeline
+
+
+def side_file_logger(
+    name: str, max_bytes: int = LOG_MAX_BYTES, backup_count: int = LOG_BACKUP_COUNT
+) -> logging.Logger:
+    """
+    Logger that writes the bare messages to one of the SIDE_FILES through the logging queue
+    (the file is opened once by the listener, not on every write).
+
+    Args:
+        name (str): One of SIDE_FILES.
+        max_bytes (int, optional): Size of the file before it is rotated (used when the file is first opened).
+        backup_count (int, optional): Rotated files kept.
+    """
+    if name not in SIDE_FILES:
+        raise ValueError(f"Unknown side file '{name}', available: {', '.join(SIDE_FILES)}")
+    return get_log_pipeline().side_logger(name, max_bytes, backup_count)
+
+
+def stop_logging() -> None:
+    """Stops the listener thread after writing the queued records (called on shutdown)."""
+    if _pipeline is not None:
+        _pipeline.stop()
+
 
 def configure_logging(print_events=0):
     """
     Configura o logging com base no valor de print_events.
+    The root logger only enqueues the records, the console and the rotating JSON lines file
+    (logs/bot.jsonl) are written by the listener thread.
 
     Args:
-        filename (str, optional): Nome do arquivo de log. Padrão: "logfile.txt".
         print_events (int, optional): Nível de detalhe dos logs. Padrão: 0 (nenhum).
     """
     # Mapeamento de valores para níveis de log
@@ -27,18 +235,25 @@ def configure_logging(print_events=0):
         print_events, logging.INFO
     )  # Nível padrão se não encontrado
 
-    filename = f"logs/ERROR_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.txt"
+    pipeline = get_log_pipeline()
 
-    coloredlogs.install(level=log_level)
+    console_handler = logging.StreamHandler(sys.stderr)
+    console_handler.setFormatter(
+        coloredlogs.ColoredFormatter(
+            "%(asctime)s %(name)s %(levelname)s %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
+        )
+    )
 
-    formatter = logging.Formatter(
-        f"%(asctime)s [%(levelname)s] %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
+    file_handler = _BufferedRotatingFileHandler(
+        LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8"
     )
+    file_handler.setFormatter(JsonFormatter())
+
+    pipeline.set_handlers([console_handler, file_handler])
 
     # Configura o logger
-    logging.basicConfig(
-        filename=filename,
-        level=log_level,
-        datefmt="%Y-%m-%d %H:%M:%S",
-        formatter=formatter,
-    )
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(pipeline.queue_handler)
+    root.setLevel(log_level)
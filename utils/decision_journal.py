@@ -0,0 +1,274 @@
+"""
+Append-only journal of the buy path: every scanned item, item filtered out of a page, price
+lookup, buy decision and withdraw outcome, one fixed-schema JSON array per line.
+
+The records are queued by the caller and written by a background thread, fsynced in
+batches and split in segments (logs/journal/journal-<date>-<seq>.jsonl). The first line
+of each segment is a header with the fields of every record kind.
+
+Reading the journal (from the repository root):
+    python -m utils.decision_journal [--kind decision] [--decision profitable] [--hours 24]
+"""
+
+import argparse
+import atexit
+import glob
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+from utils.load_config import load_config
+from utils.metrics import counter
+
+config = load_config("config.json")
+
+JOURNAL_ENABLED = config.get("journal_enabled", True)
+JOURNAL_DIR = "logs/journal"
+JOURNAL_SEGMENT_MAX_BYTES = config.get("journal_segment_max_bytes", 16 * 1024 * 1024)
+JOURNAL_FSYNC_INTERVAL = config.get("journal_fsync_interval_seconds", 1)
+# Segmentos mantidos (0 mantém todos)
+JOURNAL_MAX_SEGMENTS = config.get("journal_max_segments", 0)
+# Registros esperando o writer antes de serem descartados
+JOURNAL_QUEUE_SIZE = 10000
+
+SCHEMA_VERSION = 2
+# Campos de cada tipo de registro, gravados nessa ordem depois do timestamp e do tipo
+RECORD_FIELDS = {
+    # item novo detectado na página da Loot.Farm
+    "scan": ("item_id", "name", "price"),
+    # itens descartados em uma leitura da página: reasons conta os motivos,
+    # items tem [item_id, name, price, reason] de cada item (above_threshold ou a regra do ItemFilter)
+    "filtered": ("reasons", "items"),
+    # preço do Backpack.tf usado na decisão (source: decision_table, snapshot ou aggregate);
+    # item_id é null na varredura completa
+    "price": ("item_id", "name", "strategy", "listing_quantity", "price", "source"),
+    # decision: profitable, not_profitable, too_expensive, insufficient_funds ou error
+    "decision": ("item_id", "name", "loot_farm_price", "average_price", "profit_threshold", "decision"),
+    # outcome: trade_opened, trade_error, error ou o motivo da remoção (utils.budget_allocation)
+    "withdraw": ("item_id", "name", "loot_farm_price", "average_price", "outcome"),
+}
+
+JOURNAL_RECORDS = counter("journal_records_total", "Records written to the decision journal by kind")
+JOURNAL_RECORDS_DROPPED = counter(
+    "journal_records_dropped_total", "Decision journal records dropped because the queue was full"
+)
+
+_STOP = object()
+
+
+class DecisionJournal:
+    """
+    Writes the journal records from a background thread. record() only puts a tuple in a
+    queue, the JSON encoding, the writes and the fsyncs happen in the writer thread.
+    """
+
+    def __init__(
+        self,
+        directory: str = JOURNAL_DIR,
+        segment_max_bytes: int = JOURNAL_SEGMENT_MAX_BYTES,
+        fsync_interval: float = JOURNAL_FSYNC_INTERVAL,
+        max_segments: int = JOURNAL_MAX_SEGMENTS,
+        queue_size: int = JOURNAL_QUEUE_SIZE,
+    ):
+        """
+        Args:
+            directory (str): Directory of the segments.
+            segment_max_bytes (int): Size of a segment before a new one is started.
+            fsync_interval (float): Interval between two fsyncs, the records written between
+                them are lost if the machine crashes (not if only the bot crashes).
+            max_segments (int): Segments kept, the oldest are deleted. 0 keeps every segment.
+            queue_size (int): Records waiting to be written before new ones are dropped.
+        """
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.fsync_interval = fsync_interval
+        self.max_segments = max_segments
+        self.queue_size = queue_size
+        self.queue = queue.SimpleQueue()
+        self.logger = logging.getLogger(__name__)
+
+        os.makedirs(directory, exist_ok=True)
+        self.file = None
+        self.segment_path = None
+        self.segment_bytes = 0
+        self.last_fsync = time.monotonic()
+        self.unsynced = False
+
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="decision-journal", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def record(self, kind: str, *values) -> None:
+        """
+        Queues a record, values in the order of RECORD_FIELDS[kind].
+        A full queue drops the record instead of blocking the caller.
+        """
+        if self.queue.qsize() >= self.queue_size:
+            JOURNAL_RECORDS_DROPPED.inc(kind=kind)
+            return
+        self.queue.put((time.time(), kind, values))
+
+    def _open_segment(self) -> None:
+        prefix = os.path.join(self.directory, f"journal-{datetime.now().strftime('%Y%m%d-%H%M%S')}")
+        sequence = 0
+        while os.path.exists(f"{prefix}-{sequence}.jsonl"):
+            sequence += 1
+        self.segment_path = f"{prefix}-{sequence}.jsonl"
+        self.file = open(self.segment_path, "a", encoding="utf-8")
+        header = json.dumps({"schema": SCHEMA_VERSION, "fields": RECORD_FIELDS}, separators=(",", ":"))
+        self.file.write(header + "\n")
+        self.segment_bytes = len(header) + 1
+        self._delete_old_segments()
+
+    def _delete_old_segments(self) -> None:
+        if self.max_segments <= 0:
+            return
+        for path in segment_paths(self.directory)[: -self.max_segments]:
+            try:
+                os.remove(path)
+            except OSError as e:
+                self.logger.warning(f"Failed to delete journal segment {path}: {e}")
+
+    def _fsync(self) -> None:
+        if self.file is not None and self.unsynced:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.unsynced = False
+        self.last_fsync = time.monotonic()
+
+    def _close_segment(self) -> None:
+        if self.file is not None:
+            self._fsync()
+            self.file.close()
+            self.file = None
+
+    def _write(self, records: list) -> None:
+        if self.file is None:
+            self._open_segment()
+        lines = []
+        for timestamp, kind, values in records:
+            lines.append(json.dumps([round(timestamp, 3), kind, *values], separators=(",", ":"), default=str))
+            JOURNAL_RECORDS.inc(kind=kind)
+        data = "\n".join(lines) + "\n"
+        self.file.write(data)
+        self.segment_bytes += len(data)
+        self.unsynced = True
+
+        if self.segment_bytes >= self.segment_max_bytes:
+            self._close_segment()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            # espera o próximo registro até o próximo fsync
+            timeout = max(self.fsync_interval - (time.monotonic() - self.last_fsync), 0.001)
+            try:
+                records = [self.queue.get(timeout=timeout)]
+            except queue.Empty:
+                records = []
+            # junta tudo que já está na fila em uma única escrita
+            while True:
+                try:
+                    records.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if any(record is _STOP for record in records):
+                # registros que chegaram depois do stop também são gravados
+                stopping = True
+                records = [record for record in records if record is not _STOP]
+
+            try:
+                if records:
+                    self._write(records)
+                if stopping or time.monotonic() - self.last_fsync >= self.fsync_interval:
+                    self._fsync()
+            except OSError as e:
+                self.logger.error(f"Failed to write {len(records)} records to the decision journal: {e}")
+        self._close_segment()
+
+    def stop(self) -> None:
+        """Writes and fsyncs the pending records."""
+        if self._stopped:
+            return
+        self._stopped = True
+        self.queue.put(_STOP)
+        self._thread.join(timeout=5)
+
+
+_journal = None
+_journal_lock = threading.Lock()
+
+
+def get_journal() -> DecisionJournal:
+    """The journal of the bot (started on the first use), or None if it is disabled."""
+    global _journal
+    if not JOURNAL_ENABLED:
+        return None
+    if _journal is None:
+        with _journal_lock:
+            if _journal is None:
+                _journal = DecisionJournal()
+    return _journal
+
+
+def journal(kind: str, *values) -> None:
+    """Records an event of the buy path, values in the order of RECORD_FIELDS[kind]."""
+    decision_journal = get_journal()
+    if decision_journal is not None:
+        decision_journal.record(kind, *values)
+
+
+def segment_paths(directory: str = JOURNAL_DIR) -> list[str]:
+    """The segments from the oldest to the newest."""
+    return sorted(
+        glob.glob(os.path.join(directory, "journal-*.jsonl")),
+        key=lambda path: (os.path.basename(path).rsplit("-", 1)[0], int(path.rsplit("-", 1)[1][:-6])),
+    )
+
+
+def read_journal(directory: str = JOURNAL_DIR, kinds: set = None, since: float = None):
+    """
+    Yields the records of every segment as dicts (timestamp, kind and the fields of the
+    header of the segment). A partially written last line (crash) is skipped.
+    """
+    for path in segment_paths(directory):
+        with open(path, encoding="utf-8") as f:
+            fields = RECORD_FIELDS
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if isinstance(row, dict):
+                    fields = row.get("fields", RECORD_FIELDS)
+                    continue
+                timestamp, kind, *values = row
+                if (kinds and kind not in kinds) or (since is not None and timestamp < since):
+                    continue
+                yield {"timestamp": timestamp, "kind": kind, **dict(zip(fields.get(kind, ()), values))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print the records of the decision journal.")
+    parser.add_argument("--dir", default=JOURNAL_DIR)
+    parser.add_argument("--kind", nargs="+", choices=list(RECORD_FIELDS))
+    parser.add_argument("--decision", help="Only the decision records with this decision")
+    parser.add_argument("--hours", type=float, help="Only the last hours")
+    args = parser.parse_args()
+
+    since = time.time() - args.hours * 3600 if args.hours else None
+    kinds = set(args.kind) if args.kind else None
+    for record in read_journal(args.dir, kinds, since):
+        if args.decision and record.get("decision") != args.decision:
+            continue
+        record["timestamp"] = datetime.fromtimestamp(record["timestamp"]).isoformat(timespec="milliseconds")
+        print(json.dumps(record, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
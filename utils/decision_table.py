@@ -0,0 +1,113 @@
+import time
+
+
+def page_item_key(item_name: str, item_attachments: list = None) -> str:
+    """
+    Key of an itemblock of the loot.farm page: the data-name plus the alt of its attachments
+    (the unusual effect changes the snapshot name). Must match itemKey in BotManager.SCAN_CANDIDATES_SCRIPT.
+    """
+    if not item_attachments:
+        return item_name
+    return "|".join([item_name, *item_attachments])
+
+
+def is_too_expensive(loot_farm_price: float, max_item_price: float, remaining_money: float) -> bool:
+    """The price limits of compare_items_prices (max_item_price 0 means no limit)."""
+    return (loot_farm_price > max_item_price and max_item_price > 0) or loot_farm_price > remaining_money
+
+
+def is_profitable(loot_farm_price: float, average_price: float, profit_threshold: float) -> bool:
+    """The buy rule of compare_items_prices, also used by the decision table and the backtest."""
+    return loot_farm_price + profit_threshold < average_price
+
+
+class BuyDecisionTable:
+    """
+    Precomputed max buy price (Backpack.tf price - profit_threshold) of every cached item,
+    keyed by utils.item_names.normalize_item_name (which already includes the unusual effect).
+    Refreshed in the background so a scanned item can be bought or skipped with a dict lookup.
+    """
+
+    def __init__(self, profit_threshold: float):
+        self.profit_threshold = profit_threshold
+        # nome -> (preço médio, preço máximo de compra, expira em)
+        self.entries = {}
+        # chave do itemblock na página -> nome usado na tabela (aprendido em compare_items_prices)
+        self.aliases = {}
+        self.listing_quantity = None
+        self.built_at = None
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def rebuild(self, prices: dict, expires_at: dict, listing_quantity: int) -> None:
+        """
+        Replaces every entry of the table.
+
+        Args:
+            prices (dict): item name -> Backpack.tf price in USD.
+            expires_at (dict): item name -> epoch time when the snapshot cache of the item expires.
+            listing_quantity (int): The number of listings used to compute the prices.
+        """
+        self.entries = {
+            name: (price, price - self.profit_threshold, expires_at[name])
+            for name, price in prices.items()
+            if price is not None and name in expires_at
+        }
+        self.listing_quantity = listing_quantity
+        self.built_at = time.time()
+
+    def learn_alias(self, page_name: str, item_attachments: list, item_name: str) -> None:
+        """Remembers the snapshot name of an itemblock so its threshold can be pushed to the page."""
+        self.aliases[page_item_key(page_name, item_attachments)] = item_name
+
+    def resolve_alias(self, page_name: str, item_attachments: list) -> str:
+        """The snapshot name learned for an itemblock, or None if it was never evaluated."""
+        return self.aliases.get(page_item_key(page_name, item_attachments))
+
+    def page_thresholds(self) -> dict:
+        """
+        Thresholds of the items already seen on the loot.farm page.
+
+        Returns:
+            dict: page item key -> [max buy price, expires at] of the fresh entries.
+        """
+        now = time.time()
+        thresholds = {}
+        for page_key, item_name in self.aliases.items():
+            entry = self.entries.get(item_name)
+            if entry is not None and entry[2] >= now:
+                thresholds[page_key] = [entry[1], entry[2]]
+        return thresholds
+
+    def lookup(self, item_name: str, listing_quantity: int):
+        """
+        Returns:
+            tuple: (average price, max buy price) or None on a miss or an expired entry.
+        """
+        entry = self.entries.get(item_name)
+        if (
+            entry is None
+            or entry[2] < time.time()
+            or listing_quantity != self.listing_quantity
+        ):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[0], entry[1]
+
+    def decide(self, item_name: str, loot_farm_price: float, listing_quantity: int):
+        """
+        Decides if an item should be bought, using the same rule as compare_items_prices
+        (loot_farm_price + profit_threshold < average price).
+
+        Returns:
+            tuple: (should buy, average price) or None when the table can't decide.
+        """
+        entry = self.lookup(item_name, listing_quantity)
+        if entry is None:
+            return None
+        average_price = entry[0]
+        return is_profitable(loot_farm_price, average_price, self.profit_threshold), average_price
@@ -0,0 +1,180 @@
+import atexit
+import logging
+import queue
+import reprlib
+import threading
+import time
+import traceback
+from datetime import datetime
+
+# Tamanho máximo de cada variável capturada
+MAX_VARIABLE_LENGTH = 300
+
+_variable_repr = reprlib.Repr()
+_variable_repr.maxstring = MAX_VARIABLE_LENGTH
+_variable_repr.maxother = MAX_VARIABLE_LENGTH
+_variable_repr.maxlist = 10
+_variable_repr.maxtuple = 10
+_variable_repr.maxdict = 10
+_variable_repr.maxset = 10
+_variable_repr.maxlevel = 3
+
+
+def format_variable(value) -> str:
+    """repr of a variable capped in size (large lists and dicts are never fully stringified)."""
+    if isinstance(value, str):
+        return value if len(value) <= MAX_VARIABLE_LENGTH else value[:MAX_VARIABLE_LENGTH] + "..."
+    try:
+        return _variable_repr.repr(value)
+    except Exception as e:
+        return f"<unrepresentable {type(value).__name__}: {e}>"
+
+
+class ErrorSink:
+    """
+    Writes the errors of SharedState.debug_error from a background thread.
+    Errors are grouped by fingerprint (exception type + where it was raised): the first one
+    of each window_seconds is written with its traceback and variables, the repeated ones
+    are only counted and written as a single summary line when the window ends.
+    """
+
+    def __init__(
+        self,
+        path_pattern: str,
+        window_seconds: float = 60,
+        flush_interval: float = 2,
+        max_pending: int = 1000,
+    ):
+        """
+        Args:
+            path_pattern (str): Log file path, formatted with the current date ({date}).
+            window_seconds (float): Interval to write an error of the same fingerprint again.
+            flush_interval (float): Interval of the batched writes.
+            max_pending (int): Entries waiting to be written before new ones are dropped.
+        """
+        self.path_pattern = path_pattern
+        self.window_seconds = window_seconds
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.logger = logging.getLogger(__name__)
+
+        # fingerprint -> [total, suprimidos na janela atual, início da janela, última mensagem]
+        self.fingerprints = {}
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="error-sink", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def capture(self, error, other_vars: dict = None) -> str:
+        """
+        Records the error being handled (call it inside the except block).
+        Only the first error of a fingerprint in the window formats the traceback.
+
+        Returns:
+            str: The fingerprint of the error.
+        """
+        exc_type, exc_value, exc_traceback = type(error), error, error.__traceback__
+        frame = exc_traceback
+        while frame is not None and frame.tb_next is not None:
+            frame = frame.tb_next
+        if frame is not None:
+            code = frame.tb_frame.f_code
+            file_name, line_number, function_name = code.co_filename, frame.tb_lineno, code.co_name
+        else:
+            file_name, line_number, function_name = "<unknown>", 0, "<unknown>"
+        fingerprint = f"{exc_type.__name__}@{file_name}:{line_number}:{function_name}"
+
+        now = time.monotonic()
+        with self._lock:
+            stats = self.fingerprints.get(fingerprint)
+            if stats is not None and now - stats[2] < self.window_seconds:
+                stats[0] += 1
+                stats[1] += 1
+                stats[3] = str(error)[:MAX_VARIABLE_LENGTH]
+                return fingerprint
+
+            suppressed = stats[1] if stats is not None else 0
+            total = stats[0] + 1 if stats is not None else 1
+            self.fingerprints[fingerprint] = [total, 0, now, str(error)[:MAX_VARIABLE_LENGTH]]
+
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        line = "\n\n --------------------------------------------------------- \n\n"
+        header = (
+            f"Error at [{timestamp}] in [{file_name}] at line [{line_number}] in function "
+            f"[{function_name}] | fingerprint [{fingerprint}] | occurrence {total}"
+        )
+        if suppressed:
+            header += f" ({suppressed} repeated errors not written in the last window)"
+
+        variables = "".join(
+            f"{key}: {format_variable(value)}\n" for key, value in (other_vars or {}).items()
+        )
+        traceback_str = "".join(
+            traceback.format_exception(exc_type, exc_value, exc_traceback)
+        )
+        self._put(header + "\n" + line + str(error) + line + variables + line + traceback_str)
+        return fingerprint
+
+    def _put(self, entry: str) -> None:
+        try:
+            self.queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+
+    def summary(self) -> dict:
+        """fingerprint -> total count of the errors."""
+        with self._lock:
+            return {fingerprint: stats[0] for fingerprint, stats in self.fingerprints.items()}
+
+    def _close_windows(self, force: bool = False) -> None:
+        """Writes one line per fingerprint with the errors suppressed in an expired window."""
+        now = time.monotonic()
+        lines = []
+        with self._lock:
+            for fingerprint, stats in self.fingerprints.items():
+                if stats[1] and (force or now - stats[2] >= self.window_seconds):
+                    lines.append(
+                        f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {fingerprint} repeated "
+                        f"{stats[1]} times in the last {now - stats[2]:.0f}s "
+                        f"(total {stats[0]}), last message: {stats[3]}"
+                    )
+                    stats[1] = 0
+                    stats[2] = now
+        for summary_line in lines:
+            self._put(summary_line)
+
+    def _write_pending(self) -> None:
+        entries = []
+        while True:
+            try:
+                entries.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        if not entries:
+            return
+        path = self.path_pattern.format(date=datetime.now().strftime("%Y-%m-%d"))
+        try:
+            with open(path, "a") as f:
+                f.write("\n".join(entries) + "\n")
+        except OSError as e:
+            self.logger.error(f"Failed to write {len(entries)} errors to {path}: {e}")
+        finally:
+            for _ in entries:
+                self.queue.task_done()
+
+    def _run(self):
+        while not self._stopping.wait(self.flush_interval):
+            self._close_windows()
+            self._write_pending()
+
+    def stop(self) -> None:
+        """Writes the summaries and the pending errors."""
+        if self._stopping.is_set():
+            return
+        self._stopping.set()
+        self._thread.join(timeout=5)
+        # fecha todas as janelas com erros suprimidos
+        self._close_windows(force=True)
+        self._write_pending()
@@ -0,0 +1,124 @@
+import re
+
+# Qualidades que aparecem como prefixo no nome do item
+TF2_QUALITIES = (
+    "Normal",
+    "Genuine",
+    "Vintage",
+    "Unusual",
+    "Unique",
+    "Community",
+    "Self-Made",
+    "Strange",
+    "Haunted",
+    "Collector's",
+    "Decorated",
+    "Non-Craftable",
+)
+
+FILTER_RULES = (
+    "names",
+    "prefixes",
+    "patterns",
+    "qualities",
+    "price_bands",
+    "attachments",
+    "any_attachment",
+)
+
+
+class ItemFilter:
+    """
+    The "ignored_items" rules compiled once: exact names in a set, prefixes, qualities
+    and patterns in a single regex, price bands and attachments checked in the same pass.
+
+    Rules (every one is optional):
+        names (list): Exact item names.
+        prefixes (list): Name prefixes, e.g. "Strange Professional Killstreak".
+        patterns (list): Regular expressions searched in the name.
+        qualities (list): Qualities from the start of the name, e.g. "Unusual", "Haunted".
+        price_bands (list): [min, max] price ranges in USD to ignore, max null for no upper limit.
+        attachments (list): Attachments (spells, parts, effects) that make the item ignored.
+        any_attachment (bool): Ignore every item with an attachment.
+    """
+
+    def __init__(self, rules: dict = None):
+        rules = rules or {}
+        unknown_rules = set(rules) - set(FILTER_RULES)
+        if unknown_rules:
+            raise ValueError(
+                f"Unknown ignored_items rules: {', '.join(sorted(unknown_rules))}, "
+                f"available: {', '.join(FILTER_RULES)}"
+            )
+
+        for quality in rules.get("qualities", []):
+            if quality not in TF2_QUALITIES:
+                raise ValueError(
+                    f"Unknown quality '{quality}', available: {', '.join(TF2_QUALITIES)}"
+                )
+
+        self.names = frozenset(rules.get("names", []))
+        self.prefixes = tuple(rules.get("prefixes", [])) + tuple(
+            f"{quality} " for quality in rules.get("qualities", [])
+        )
+        self.patterns = tuple(rules.get("patterns", []))
+        self.price_bands = tuple(
+            (float(low), float("inf") if high is None else float(high))
+            for low, high in rules.get("price_bands", [])
+        )
+        self.attachments = frozenset(rules.get("attachments", []))
+        self.any_attachment = bool(rules.get("any_attachment", False))
+
+        # Prefixos e padrões em uma única expressão
+        alternatives = [f"^{re.escape(prefix)}" for prefix in self.prefixes]
+        alternatives += [f"(?:{pattern})" for pattern in self.patterns]
+        self.name_matcher = re.compile("|".join(alternatives)) if alternatives else None
+
+    @classmethod
+    def from_config(cls, ignored_items) -> "ItemFilter":
+        """
+        Args:
+            ignored_items (list | dict | ItemFilter): The "ignored_items" option of config.json,
+                a list of exact names (the old format) or a dict of rules.
+        """
+        if isinstance(ignored_items, cls):
+            return ignored_items
+        if ignored_items is None or isinstance(ignored_items, (list, tuple, set)):
+            return cls({"names": list(ignored_items or [])})
+        return cls(ignored_items)
+
+    def __contains__(self, item_name: str) -> bool:
+        return self.match(item_name) is not None
+
+    def match(
+        self, item_name: str, item_price: float = None, item_attachments: list = None
+    ) -> str:
+        """
+        Checks an item against every rule.
+
+        Args:
+            item_name (str): The Loot.Farm name of the item.
+            item_price (float, optional): The price in USD, price bands are skipped without it.
+            item_attachments (list, optional): The attachments of the item.
+
+        Returns:
+            str: The rule that ignored the item or None if it should be processed.
+        """
+        if item_name in self.names:
+            return "names"
+        if self.name_matcher is not None and self.name_matcher.search(item_name):
+            return "prefixes/patterns"
+        if item_price is not None and self.price_bands:
+            try:
+                item_price = float(item_price)
+            except ValueError:
+                item_price = None
+            for low, high in self.price_bands if item_price is not None else ():
+                if low <= item_price <= high:
+                    return "price_bands"
+        if item_attachments:
+            if self.any_attachment:
+                return "any_attachment"
+            if not self.attachments.isdisjoint(item_attachments):
+                return "attachments"
+        return None
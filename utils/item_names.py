@@ -0,0 +1,49 @@
+import re
+from functools import lru_cache
+
+# Kits e Unusualifiers só existem como Non-Craftable no Backpack.tf
+_NON_CRAFTABLE_PATTERN = re.compile(
+    r"^(?:Professional Killstreak|Specialized Killstreak|Killstreak).*Kit$|Unusualifier$"
+)
+
+# Nomes distintos do loot_farm_inventory (~3k) + variações de efeitos unusual
+NAME_CACHE_SIZE = 8192
+
+
+@lru_cache(maxsize=NAME_CACHE_SIZE)
+def normalize_item_name(item_name: str, unusual_effect: str = None) -> str:
+    """
+    Maps a Loot.Farm item name to the name used by the Backpack.tf snapshot API.
+    The result is the key shared by the snapshot cache, the buy decision table and the logs.
+
+    Rules (only the first one that matches is applied):
+        - Killstreak kits and Unusualifiers get the "Non-Craftable" prefix
+        - " Series" is removed (crates and cases)
+        - "Unusual" is replaced by the unusual effect, when there is one
+        - "#" is URL-escaped to "%23"
+
+    Args:
+        item_name (str): The name shown by Loot.Farm.
+        unusual_effect (str, optional): The name of the unusual effect attached to the item.
+
+    Returns:
+        str: The normalized item name.
+    """
+    if _NON_CRAFTABLE_PATTERN.search(item_name):
+        return f"Non-Craftable {item_name}"
+    if " Series" in item_name:
+        return item_name.replace(" Series", "")
+    if unusual_effect:
+        return item_name.replace("Unusual", unusual_effect)
+    if "#" in item_name:
+        return item_name.replace("#", "%23")
+    return item_name
+
+
+def name_cache_info():
+    """Hits, misses and size of the normalize_item_name memo."""
+    return normalize_item_name.cache_info()
+
+
+def clear_name_cache() -> None:
+    normalize_item_name.cache_clear()
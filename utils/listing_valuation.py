@@ -0,0 +1,126 @@
+import time
+
+import numpy as np
+
+from utils.snapshot_codec import decode_listings
+
+
+class ListingValuation:
+    """
+    Columnar copy of the cached snapshot listings (one array per column, sorted by
+    item and price) so the whole cache can be revalued with NumPy when the key or
+    refined rate changes, instead of invalidating the snapshots.
+    """
+
+    def __init__(self):
+        self.names = []
+        self.name_index = {}
+        self.item_index = np.empty(0, dtype=np.int32)
+        self.price = np.empty(0, dtype=np.float64)
+        self.keys = np.empty(0, dtype=np.float64)
+        self.metal = np.empty(0, dtype=np.float64)
+        # posição de cada listing dentro do seu item (0 = menor preço)
+        self.rank = np.empty(0, dtype=np.int32)
+        self.usd = np.empty(0, dtype=np.float64)
+        self.rates = None
+        self.loaded_at = None
+
+    def __len__(self):
+        return len(self.price)
+
+    def load(self, cursor, cache_duration_hours: float = None) -> int:
+        """
+        Loads the listings of every cached snapshot from snapshot_results.
+
+        Args:
+            cursor (sqlite3.Cursor): A cursor of main.db.
+            cache_duration_hours (float, optional): Only load snapshots newer than this. Defaults to all of them.
+
+        Returns:
+            int: The number of loaded listings.
+        """
+        min_fetched_at = 0
+        if cache_duration_hours is not None:
+            min_fetched_at = int(time.time()) - int(cache_duration_hours * 3600)
+
+        cursor.execute(
+            "SELECT name, listings FROM snapshot_results WHERE fetched_at >= ? ORDER BY name",
+            (min_fetched_at,),
+        )
+        rows = []
+        for name, listings in cursor.fetchall():
+            # ordenadas por preço dentro de cada item, a mesma ordem das estratégias de preço
+            priced_listings = sorted(
+                (listing for listing in decode_listings(listings) if listing.price is not None),
+                key=lambda listing: listing.price,
+            )
+            rows.extend((name, listing.price, listing.keys, listing.metal) for listing in priced_listings)
+
+        names = []
+        name_index = {}
+        item_index = np.empty(len(rows), dtype=np.int32)
+        for position, row in enumerate(rows):
+            index = name_index.get(row[0])
+            if index is None:
+                index = name_index[row[0]] = len(names)
+                names.append(row[0])
+            item_index[position] = index
+
+        columns = np.array([row[1:] for row in rows], dtype=np.float64).reshape(-1, 3)
+        self.names = names
+        self.name_index = name_index
+        self.item_index = item_index
+        self.price = columns[:, 0].copy()
+        self.keys = np.nan_to_num(columns[:, 1])
+        self.metal = np.nan_to_num(columns[:, 2])
+
+        # As linhas vêm ordenadas por item, a primeira posição de cada item dá o rank
+        first_position = np.searchsorted(item_index, np.arange(len(names), dtype=np.int32))
+        self.rank = (np.arange(len(rows)) - first_position[item_index]).astype(np.int32)
+
+        self.usd = np.full(len(rows), np.nan)
+        self.rates = None
+        self.loaded_at = time.time()
+        return len(rows)
+
+    def revalue(self, refined_to_usd: float, key_to_usd: float) -> bool:
+        """
+        Recomputes usd_estimated of every listing with the same rules as
+        utils.listings.reformat_listings. Does nothing if the rates did not change.
+
+        Returns:
+            bool: True if the listings were revalued.
+        """
+        rates = (float(refined_to_usd), float(key_to_usd))
+        if rates == self.rates:
+            return False
+
+        refined_to_usd, key_to_usd = rates
+        if refined_to_usd > 0 and key_to_usd > 0:
+            currencies_usd = self.keys * key_to_usd + self.metal * refined_to_usd
+        else:
+            currencies_usd = np.full(len(self.price), np.nan)
+
+        self.usd = np.where(self.price > 0, self.price * refined_to_usd, currencies_usd)
+        self.rates = rates
+        return True
+
+    def top_n_averages(self, listing_quantity: int) -> dict:
+        """
+        Averages the usd value of the listing_quantity cheapest listings of every item in one pass.
+
+        Returns:
+            dict: item name -> average price (items without a valid value are left out).
+        """
+        selected = (self.rank < listing_quantity) & ~np.isnan(self.usd)
+        totals = np.bincount(
+            self.item_index[selected],
+            weights=self.usd[selected],
+            minlength=len(self.names),
+        )
+        counts = np.bincount(self.item_index[selected], minlength=len(self.names))
+
+        averages = {}
+        for index in np.flatnonzero(counts):
+            averages[self.names[index]] = float(totals[index] / counts[index])
+        return averages
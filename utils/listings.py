@@ -0,0 +1,100 @@
+import time
+from typing import NamedTuple
+
+from static.defindexes import spells, strange_part_defindexes, strange_parts
+
+# Conjuntos pré-calculados usados para filtrar os atributos em uma única passada
+SPELL_DEFINDEXES = frozenset(spells)
+STRANGE_PART_DEFINDEXES = frozenset(strange_part_defindexes)
+STRANGE_PART_VALUES = frozenset(float(value) for value in strange_parts)
+FILTERED_DEFINDEXES = SPELL_DEFINDEXES | STRANGE_PART_DEFINDEXES
+
+
+class Listing(NamedTuple):
+    """A buy listing from a Backpack.tf snapshot, reduced to the fields used by the bot."""
+
+    price: float
+    keys: float
+    metal: float
+    usd_estimated: float
+    bumped_at: int
+    steamid: str
+
+
+def has_spell_or_strange_part(attributes: list[dict]) -> bool:
+    """
+    Checks if the item attributes have a spell or a strange part.
+    Only the attributes with a filtered defindex are converted.
+    """
+    for attribute in attributes:
+        defindex = attribute.get("defindex", -1)
+        if defindex.__class__ is not int:
+            defindex = int(defindex)
+        if defindex not in FILTERED_DEFINDEXES:
+            continue
+        if defindex in SPELL_DEFINDEXES:
+            return True
+        if float(attribute.get("float_value", -1)) in STRANGE_PART_VALUES:
+            return True
+    return False
+
+
+def reformat_listings(
+    listings: list[dict], refined_to_usd: float, key_to_usd: float
+) -> list[Listing]:
+    """
+    Keeps the buyout buy listings without spells or strange parts from a snapshot
+    and estimates their value in USD.
+
+    Args:
+        listings (list[dict]): The "listings" of the Backpack.tf snapshot payload.
+        refined_to_usd (float): The refined metal sell value, captured once per snapshot.
+        key_to_usd (float): The key sell value, captured once per snapshot.
+
+    Returns:
+        list[Listing]: The filtered listings.
+    """
+    refined_to_usd = float(refined_to_usd)
+    key_to_usd = float(key_to_usd)
+    # Sem os valores das moedas não é possível estimar o preço pelas currencies
+    can_convert_currencies = refined_to_usd > 0 and key_to_usd > 0
+    now = int(time.time())
+
+    formatted_listings = []
+    append = formatted_listings.append
+
+    for listing in listings:
+        # remove listings that are not buy listings or not buyout | Most of the time, the buyout listings are the best ones (bots)
+        if listing.get("intent", "sell") == "sell" or listing.get("buyout", True) == 0:
+            continue
+
+        item = listing.get("item")
+        if item:
+            attributes = item.get("attributes")
+            if attributes and has_spell_or_strange_part(attributes):
+                continue
+
+        currencies = listing.get("currencies") or {}
+        keys = float(currencies.get("keys", 0.0))
+        metal = float(currencies.get("metal", 0.0))
+        price = listing.get("price")
+
+        if price is not None and price > 0:
+            usd_estimated = float(price) * refined_to_usd
+        elif can_convert_currencies:
+            usd_estimated = keys * key_to_usd + metal * refined_to_usd
+        else:
+            usd_estimated = None
+
+        append(
+            Listing(
+                price,
+                keys,
+                metal,
+                usd_estimated,
+                listing.get("bump", listing.get("timestamp", now)),
+                listing.get("steamid"),
+            )
+        )
+
+    return formatted_listings
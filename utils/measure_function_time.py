@@ -1,18 +1,6 @@
-import time
-
-from colorama import Fore, Style
+from utils.stage_timing import measure_stage
 
 
 def measure_time(func):
-    def wrapper(*args, **kwargs):
-
-        start_time = time.time()
-        result = func(*args, **kwargs)
-        end_time = time.time()
-        elapsed_time = end_time - start_time
-        message = f"{Fore.LIGHTBLACK_EX}[TIME] {Fore.BLUE}{func.__name__} took {elapsed_time} seconds"
-        message += Fore.RESET
-        print(message)
-        return result
-
-    return wrapper
+    """Kept for compatibility, records the function as a stage of utils.stage_timing."""
+    return measure_stage(func.__name__)(func)
@@ -0,0 +1,182 @@
+import math
+import time
+from collections import deque
+
+from utils.metrics import counter, gauge, histogram
+
+DAY_SECONDS = 24 * 3600
+
+# Configuração padrão da cadência, pode ser sobrescrita pela chave "polling" do config.json
+DEFAULT_POLLING_CONFIG = {
+    # menor e maior intervalo entre duas leituras da página
+    "min_interval_seconds": 1,
+    "max_interval_seconds": 30,
+    # depois de um restock a página é lida no intervalo mínimo por esse tempo
+    "burst_seconds": 120,
+    # cada leitura sem itens novos multiplica o intervalo por esse fator
+    "backoff": 1.5,
+    # chance aceitável de um restock acontecer entre duas leituras no horário atual
+    "restock_probability": 0.02,
+    # dias de histórico de restocks usados para aprender os horários movimentados
+    "history_days": 28,
+}
+
+# Tamanho de cada faixa de horário do dia (15 minutos)
+SLOT_SECONDS = 900
+SLOTS_PER_DAY = DAY_SECONDS // SLOT_SECONDS
+# Últimas latências de detecção usadas para os percentis
+LATENCY_SAMPLE_SIZE = 512
+
+POLLS = counter("polls_total", "Reads of the Loot.Farm page by result")
+RESTOCK_DETECTION_LATENCY = histogram(
+    "restock_detection_latency_seconds",
+    "Upper bound of the restock detection latency (time since the previous read of the page)",
+    buckets=(0.5, 1, 2, 5, 10, 20, 30, 60, 120),
+)
+
+
+class PollScheduler:
+    """
+    Chooses the interval between two reads of the Loot.Farm page from the restock history.
+
+    The restocks of the last history_days are counted per 15 minutes slot of the day, the
+    expected restock rate of the current slot gives the longest interval that keeps the
+    chance of a restock between two reads under restock_probability. Right after a restock
+    the page is read at min_interval for burst_seconds (restocks come in waves), then every
+    read without new items backs the interval off until that limit.
+    """
+
+    def __init__(self, config: dict = None, history: list = None):
+        """
+        Args:
+            config (dict, optional): Overrides of DEFAULT_POLLING_CONFIG.
+            history (list, optional): (detected_at epoch, items) of the previous restocks.
+        """
+        self.config = {**DEFAULT_POLLING_CONFIG, **(config or {})}
+        self.min_interval = float(self.config["min_interval_seconds"])
+        self.max_interval = max(float(self.config["max_interval_seconds"]), self.min_interval)
+        self.history_seconds = self.config["history_days"] * DAY_SECONDS
+
+        # restocks por faixa de horário dentro da janela de histórico
+        self.events = deque()
+        self.slot_counts = [0] * SLOTS_PER_DAY
+        for detected_at, items in sorted(history or []):
+            self._add_event(detected_at, items)
+
+        self.last_poll_at = None
+        self.last_restock_at = None
+        self.empty_polls = 0
+        self.interval = self.min_interval
+        self.polls = 0
+        self.restocks = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLE_SIZE)
+
+        gauge(
+            "poll_interval_seconds",
+            "Interval chosen for the next read of the Loot.Farm page",
+            function=lambda: self.interval,
+        )
+
+    def _add_event(self, detected_at: float, items: int) -> None:
+        self.events.append((detected_at, items))
+        self.slot_counts[int(detected_at % DAY_SECONDS) // SLOT_SECONDS] += 1
+
+    def _expire_events(self, now: float) -> None:
+        cutoff = now - self.history_seconds
+        while self.events and self.events[0][0] < cutoff:
+            detected_at, _ = self.events.popleft()
+            self.slot_counts[int(detected_at % DAY_SECONDS) // SLOT_SECONDS] -= 1
+
+    def restock_rate(self, now: float = None) -> float:
+        """
+        Expected restocks per second in the slot of the day of now (averaged with the
+        neighbour slots, so a sparse history does not give holes).
+        """
+        now = time.time() if now is None else now
+        if not self.events:
+            return 0.0
+        observed_days = min(
+            max((now - self.events[0][0]) / DAY_SECONDS, 1.0), self.config["history_days"]
+        )
+        slot = int(now % DAY_SECONDS) // SLOT_SECONDS
+        restocks = sum(
+            self.slot_counts[(slot + offset) % SLOTS_PER_DAY] for offset in (-1, 0, 1)
+        )
+        return restocks / (observed_days * 3 * SLOT_SECONDS)
+
+    def history_interval(self, now: float = None) -> float:
+        """Longest interval allowed by the restock rate of the current slot."""
+        rate = self.restock_rate(now)
+        if rate <= 0:
+            return self.max_interval
+        # P(restock no intervalo) = 1 - e^(-rate * intervalo)
+        interval = -math.log(1 - self.config["restock_probability"]) / rate
+        return min(max(interval, self.min_interval), self.max_interval)
+
+    def record_poll(self, new_items: int, now: float = None) -> float:
+        """
+        Records a read of the page and chooses the interval until the next one.
+
+        Args:
+            new_items (int): Items that were not in the page in the previous read.
+
+        Returns:
+            float: Seconds to wait before the next read.
+        """
+        now = time.time() if now is None else now
+        self.polls += 1
+
+        if new_items > 0:
+            POLLS.inc(result="restock")
+            self.restocks += 1
+            self._add_event(now, new_items)
+            self.last_restock_at = now
+            self.empty_polls = 0
+            if self.last_poll_at is not None:
+                # o restock aconteceu em algum momento desde a leitura anterior
+                latency = now - self.last_poll_at
+                self.latencies.append(latency)
+                RESTOCK_DETECTION_LATENCY.observe(latency)
+        else:
+            POLLS.inc(result="empty")
+            self.empty_polls += 1
+
+        self._expire_events(now)
+        self.last_poll_at = now
+
+        if self.last_restock_at is not None and now - self.last_restock_at < self.config["burst_seconds"]:
+            self.interval = self.min_interval
+        else:
+            backoff_interval = min(self.interval * self.config["backoff"], self.max_interval)
+            self.interval = max(min(backoff_interval, self.history_interval(now)), self.min_interval)
+        return self.interval
+
+    def stats(self) -> dict:
+        latencies = sorted(self.latencies)
+        return {
+            "interval": self.interval,
+            "history_interval": self.history_interval(),
+            "restocks_per_hour": self.restock_rate() * 3600,
+            "polls": self.polls,
+            "restocks": self.restocks,
+            "latency_p50": latencies[len(latencies) // 2] if latencies else None,
+            "latency_p95": latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)]
+            if latencies
+            else None,
+        }
+
+
+_scheduler = None
+
+
+def create_poll_scheduler(config: dict = None, history: list = None) -> PollScheduler:
+    global _scheduler
+    _scheduler = PollScheduler(config, history)
+    return _scheduler
+
+
+def poll_scheduler_stats() -> dict:
+    """Stats of the running scheduler, or None if the bot has not created one."""
+    if _scheduler is None:
+        return None
+    return _scheduler.stats()
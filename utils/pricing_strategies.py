@@ -0,0 +1,181 @@
+import heapq
+import math
+import statistics
+import time
+from operator import attrgetter
+
+from utils.listings import Listing
+
+
+_price_key = attrgetter("price")
+
+# Abaixo disso um sort completo é mais rápido do que o heap (menos chamadas em Python)
+PARTIAL_SELECTION_MIN_LISTINGS = 64
+
+
+def select_cheapest_listings(listings: list[Listing], listing_quantity: int) -> list[Listing]:
+    """
+    Selects the listing_quantity listings with the lowest price without sorting all of them.
+    heapq.nsmallest is stable, so the result is the same as sorted(...)[:listing_quantity].
+    """
+    priced_listings = [listing for listing in listings if listing.price is not None]
+    if len(priced_listings) < PARTIAL_SELECTION_MIN_LISTINGS:
+        priced_listings.sort(key=_price_key)
+        return priced_listings[:listing_quantity]
+    return heapq.nsmallest(listing_quantity, priced_listings, key=_price_key)
+
+
+def _usd_values(listings: list[Listing]) -> list[float]:
+    return [listing.usd_estimated for listing in listings if listing.usd_estimated is not None]
+
+
+class PricingStrategy:
+    """
+    Turns the buy listings of a snapshot into the price used to decide if an item is profitable.
+    Subclasses implement price_selection, the selection of the listing_quantity cheapest listings is shared.
+    """
+
+    name = None
+    # True when the result is the same as the top_avg_usd aggregate stored at ingest
+    uses_aggregates = False
+
+    def select(self, listings: list[Listing], listing_quantity: int) -> list[Listing]:
+        return select_cheapest_listings(listings, listing_quantity)
+
+    def price(self, listings: list[Listing], listing_quantity: int) -> float:
+        """
+        Returns:
+            float: The estimated price in USD or None if there are no valued listings.
+        """
+        return self.price_selection(self.select(listings, listing_quantity))
+
+    def price_selection(self, selected_listings: list[Listing]) -> float:
+        raise NotImplementedError
+
+
+class MeanStrategy(PricingStrategy):
+    """Arithmetic mean of the cheapest listings (the original behaviour)."""
+
+    name = "mean"
+    uses_aggregates = True
+
+    def price_selection(self, selected_listings):
+        values = _usd_values(selected_listings)
+        if not values:
+            return None
+        return sum(values) / len(values)
+
+
+class MedianStrategy(PricingStrategy):
+    """Median of the cheapest listings, ignores a single outlier."""
+
+    name = "median"
+
+    def price_selection(self, selected_listings):
+        values = _usd_values(selected_listings)
+        if not values:
+            return None
+        return statistics.median(values)
+
+
+class TrimmedMeanStrategy(PricingStrategy):
+    """
+    Mean of the cheapest listings without the `trim` fraction of values on each end.
+    The cut is rounded up so small samples are trimmed too (3 values with trim 0.2 keep
+    the middle one), but at least one value is kept: 2 values are a plain mean.
+    """
+
+    name = "trimmed_mean"
+
+    def __init__(self, trim: float = 0.2):
+        if not 0 <= trim < 0.5:
+            raise ValueError("trim must be between 0 and 0.5")
+        self.trim = trim
+
+    def price_selection(self, selected_listings):
+        values = sorted(_usd_values(selected_listings))
+        if not values:
+            return None
+        # round evita que um erro de ponto flutuante (10 * 0.3 = 3.0000000000000004) corte um valor a mais
+        cut = min(math.ceil(round(len(values) * self.trim, 9)), (len(values) - 1) // 2)
+        values = values[cut : len(values) - cut]
+        return sum(values) / len(values)
+
+
+class BumpRecencyStrategy(PricingStrategy):
+    """
+    Weighted mean of the cheapest listings, the weight of each listing halves every
+    half_life_hours since its last bump (stale buy orders count less).
+    """
+
+    name = "bump_recency"
+
+    def __init__(self, half_life_hours: float = 6):
+        if half_life_hours <= 0:
+            raise ValueError("half_life_hours must be greater than 0")
+        self.half_life_seconds = half_life_hours * 3600
+
+    def price_selection(self, selected_listings):
+        now = time.time()
+        total = 0.0
+        total_weight = 0.0
+        for listing in selected_listings:
+            if listing.usd_estimated is None:
+                continue
+            age = max(now - (listing.bumped_at or now), 0)
+            weight = math.pow(0.5, age / self.half_life_seconds)
+            total += listing.usd_estimated * weight
+            total_weight += weight
+        if total_weight == 0:
+            return None
+        return total / total_weight
+
+
+class SellerDedupStrategy(MeanStrategy):
+    """Mean of the cheapest listings keeping only one listing (the cheapest) per steamid."""
+
+    name = "seller_dedup"
+    uses_aggregates = False
+
+    def select(self, listings, listing_quantity):
+        cheapest_per_seller = {}
+        for listing in listings:
+            if listing.price is None:
+                continue
+            current = cheapest_per_seller.get(listing.steamid)
+            if current is None or listing.price < current.price:
+                cheapest_per_seller[listing.steamid] = listing
+        return heapq.nsmallest(
+            listing_quantity, cheapest_per_seller.values(), key=_price_key
+        )
+
+
+PRICING_STRATEGIES = {
+    strategy.name: strategy
+    for strategy in (
+        MeanStrategy,
+        MedianStrategy,
+        TrimmedMeanStrategy,
+        BumpRecencyStrategy,
+        SellerDedupStrategy,
+    )
+}
+
+
+def create_pricing_strategy(options: dict = None) -> PricingStrategy:
+    """
+    Creates the pricing strategy configured in the "pricing_strategy" option of config.json.
+
+    Args:
+        options (dict, optional): {"name": "...", **strategy parameters}. Defaults to the mean strategy.
+
+    Returns:
+        PricingStrategy: The strategy instance.
+    """
+    options = dict(options or {})
+    name = options.pop("name", MeanStrategy.name)
+    if name not in PRICING_STRATEGIES:
+        raise ValueError(
+            f"Unknown pricing strategy '{name}', available: {', '.join(PRICING_STRATEGIES)}"
+        )
+    return PRICING_STRATEGIES[name](**options)
@@ -0,0 +1,75 @@
+import statistics
+
+from utils.listings import Listing
+from utils.pricing_strategies import MeanStrategy
+
+# Quantidade de listings usada no preço médio pré-calculado de cada snapshot
+DEFAULT_TOP_N = 3
+
+_mean_strategy = MeanStrategy()
+
+
+def top_listings_average(listings: list[Listing], listing_quantity: int) -> float:
+    """
+    Averages usd_estimated of the listing_quantity listings with the lowest price.
+
+    Returns:
+        float: The average or None if there are no priced listings.
+    """
+    return _mean_strategy.price(listings, listing_quantity)
+
+
+def compute_snapshot_aggregates(listings: list[Listing], top_n: int = DEFAULT_TOP_N) -> dict:
+    """
+    Computes the aggregates stored next to each snapshot at ingest.
+
+    Args:
+        listings (list[Listing]): The snapshot listings.
+        top_n (int, optional): Number of listings used in top_avg_usd. Defaults to 3.
+
+    Returns:
+        dict: listing_count, min_price, median_usd, top_n, top_avg_usd and freshest_bump.
+    """
+    prices = [listing.price for listing in listings if listing.price is not None]
+    usd_values = [
+        listing.usd_estimated
+        for listing in listings
+        if listing.usd_estimated is not None
+    ]
+    bumps = [listing.bumped_at for listing in listings if listing.bumped_at]
+
+    return {
+        "listing_count": len(listings),
+        "min_price": min(prices) if prices else None,
+        "median_usd": statistics.median(usd_values) if usd_values else None,
+        "top_n": top_n,
+        "top_avg_usd": top_listings_average(listings, top_n),
+        "freshest_bump": max(bumps) if bumps else None,
+    }
+
+
+def store_snapshot_aggregates(cursor, item_name: str, listings: list[Listing], top_n: int = DEFAULT_TOP_N) -> dict:
+    """
+    Updates the aggregates columns of the snapshot_results row of an item. The caller commits.
+
+    Returns:
+        dict: The stored aggregates.
+    """
+    aggregates = compute_snapshot_aggregates(listings, top_n)
+    cursor.execute(
+        """
+        UPDATE snapshot_results
+        SET listing_count = ?, min_price = ?, median_usd = ?, top_n = ?, top_avg_usd = ?, freshest_bump = ?
+        WHERE name = ?
+        """,
+        (
+            aggregates["listing_count"],
+            aggregates["min_price"],
+            aggregates["median_usd"],
+            aggregates["top_n"],
+            aggregates["top_avg_usd"],
+            aggregates["freshest_bump"],
+            item_name,
+        ),
+    )
+    return aggregates
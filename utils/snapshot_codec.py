@@ -0,0 +1,136 @@
+import json
+import struct
+import zlib
+
+from utils.listings import Listing
+
+# Versão do formato das listings salvas no snapshot_results
+SNAPSHOT_SCHEMA_VERSION = 1
+
+# Campos mantidos de cada listing, o resto do payload do backpack.tf é descartado
+LISTING_FIELDS = Listing._fields
+
+# header: versão do schema (1 byte) + id do serializador (1 byte)
+_HEADER = struct.Struct("<BB")
+
+_serializers = {}
+
+
+def register_serializer(serializer_id: int, name: str, dumps, loads) -> None:
+    """
+    Registers a serializer that can be used to encode snapshot listings.
+
+    Args:
+        serializer_id (int): The id stored in the header of each encoded value (0-255).
+        name (str): The name used to choose the serializer.
+        dumps (callable): Converts a list of rows to bytes.
+        loads (callable): Converts bytes back to a list of rows.
+    """
+    _serializers[serializer_id] = (name, dumps, loads)
+
+
+def get_serializer_id(name: str) -> int:
+    for serializer_id, (serializer_name, _, _) in _serializers.items():
+        if serializer_name == name:
+            return serializer_id
+    raise ValueError(f"Unknown snapshot serializer: {name}")
+
+
+register_serializer(
+    0,
+    "json",
+    lambda rows: json.dumps(rows, separators=(",", ":")).encode(),
+    json.loads,
+)
+
+try:
+    import msgpack
+
+    register_serializer(1, "msgpack", msgpack.packb, msgpack.unpackb)
+    DEFAULT_SERIALIZER = "msgpack"
+except ImportError:
+    DEFAULT_SERIALIZER = "json"
+
+
+def compact_listing(listing) -> Listing:
+    """Converts a listing in the legacy dict format (full reformat_snapshot output) to a Listing."""
+    if isinstance(listing, Listing):
+        return listing
+    currencies = listing.get("currencies") or {}
+    return Listing(
+        listing.get("price"),
+        currencies.get("keys", listing.get("keys", 0)),
+        currencies.get("metal", listing.get("metal", 0)),
+        listing.get("usd_estimated"),
+        listing.get("bumped_at"),
+        listing.get("steamid"),
+    )
+
+
+def compact_listings(listings: list) -> list[Listing]:
+    return [compact_listing(listing) for listing in listings]
+
+
+def encode_listings(
+    listings: list[Listing], serializer: str = None, compression_level: int = 6
+) -> bytes:
+    """
+    Encodes snapshot listings to the compact binary format stored in snapshot_results.
+
+    Args:
+        listings (list[Listing]): The listings, legacy dicts are also accepted.
+        serializer (str, optional): The registered serializer to use. Defaults to msgpack when installed, json otherwise.
+        compression_level (int, optional): The zlib compression level. Defaults to 6.
+
+    Returns:
+        bytes: The header followed by the compressed rows.
+    """
+    serializer_id = get_serializer_id(serializer or DEFAULT_SERIALIZER)
+    dumps = _serializers[serializer_id][1]
+
+    rows = []
+    for listing in listings:
+        row = list(compact_listing(listing))
+        # steamid como inteiro ocupa bem menos espaço do que a string
+        if isinstance(row[-1], str) and row[-1].isdigit():
+            row[-1] = int(row[-1])
+        rows.append(row)
+
+    payload = zlib.compress(dumps(rows), compression_level)
+    return _HEADER.pack(SNAPSHOT_SCHEMA_VERSION, serializer_id) + payload
+
+
+def decode_listings(value) -> list[Listing]:
+    """
+    Decodes the listings stored in snapshot_results.
+
+    Args:
+        value (bytes | str): An encoded value or the legacy JSON text.
+
+    Returns:
+        list[Listing]: The listings.
+    """
+    if isinstance(value, str):
+        # formato antigo: json.dumps da saída completa do reformat_snapshot
+        return compact_listings(json.loads(value))
+
+    schema_version, serializer_id = _HEADER.unpack_from(value)
+    if schema_version != SNAPSHOT_SCHEMA_VERSION:
+        raise ValueError(f"Unsupported snapshot schema version: {schema_version}")
+    if serializer_id not in _serializers:
+        raise ValueError(f"Unknown snapshot serializer id: {serializer_id}")
+
+    loads = _serializers[serializer_id][2]
+    rows = loads(zlib.decompress(memoryview(value)[_HEADER.size :]))
+
+    return [
+        Listing(
+            price,
+            keys,
+            metal,
+            usd_estimated,
+            bumped_at,
+            str(steamid) if steamid is not None else None,
+        )
+        for price, keys, metal, usd_estimated, bumped_at, steamid in rows
+    ]
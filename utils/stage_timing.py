@@ -0,0 +1,155 @@
+import functools
+import inspect
+import math
+import time
+from collections import deque
+
+from utils.load_config import load_config
+from utils.metrics import histogram
+
+config = load_config("config.json")
+
+# Desligado, o decorator devolve a própria função e o context manager não faz nada
+STAGE_TIMING_ENABLED = config.get("stage_timing", True)
+# Últimas durações de cada etapa usadas para os percentis
+STAGE_SAMPLE_SIZE = 2048
+PERCENTILES = (50, 95, 99)
+
+STAGE_DURATION = histogram(
+    "stage_duration_seconds",
+    "Duration of each stage of the buy path",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60),
+)
+
+_samples = {}
+
+
+def record_stage(stage: str, elapsed: float) -> None:
+    """Records a duration (in seconds) of a stage."""
+    samples = _samples.get(stage)
+    if samples is None:
+        samples = _samples[stage] = deque(maxlen=STAGE_SAMPLE_SIZE)
+    samples.append(elapsed)
+    STAGE_DURATION.observe(elapsed, stage=stage)
+
+
+class _StageTimer:
+    __slots__ = ("stage", "started_at")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.started_at = None
+
+    def __enter__(self):
+        self.started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        record_stage(self.stage, time.perf_counter() - self.started_at)
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        return self.__exit__(exc_type, exc_value, traceback)
+
+    def __call__(self, func):
+        stage = self.stage
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                started_at = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    record_stage(stage, time.perf_counter() - started_at)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started_at = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record_stage(stage, time.perf_counter() - started_at)
+
+        return wrapper
+
+
+class _DisabledStageTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def __call__(self, func):
+        return func
+
+
+_DISABLED_TIMER = _DisabledStageTimer()
+
+
+def measure_stage(stage: str):
+    """
+    Measures the duration of a stage with a monotonic clock (time.perf_counter).
+    Works as a decorator of functions and coroutines and as a context manager (with / async with):
+
+        @measure_stage("scan")
+        async def scan_items_after_first(self): ...
+
+        with measure_stage("normalize"):
+            ...
+
+    Args:
+        stage (str): The name of the stage in the logs, the status message and the metrics.
+    """
+    if not STAGE_TIMING_ENABLED:
+        return _DISABLED_TIMER
+    return _StageTimer(stage)
+
+
+def _percentile(sorted_values: list, percentile: float) -> float:
+    # nearest-rank
+    index = max(math.ceil(percentile / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[index]
+
+
+def stage_percentiles() -> dict:
+    """
+    Returns:
+        dict: stage -> {"count": ..., "p50": ..., "p95": ..., "p99": ...} in seconds,
+            computed over the last STAGE_SAMPLE_SIZE durations of each stage.
+    """
+    result = {}
+    for stage, samples in list(_samples.items()):
+        values = sorted(samples)
+        if not values:
+            continue
+        result[stage] = {"count": len(values)}
+        for percentile in PERCENTILES:
+            result[stage][f"p{percentile}"] = _percentile(values, percentile)
+    return result
+
+
+def format_stage_percentiles(percentiles: dict = None) -> str:
+    """One line per stage with p50/p95/p99 in milliseconds."""
+    percentiles = stage_percentiles() if percentiles is None else percentiles
+    return "\n".join(
+        f"{stage}: "
+        + " ".join(f"p{p} {values[f'p{p}'] * 1000:.1f}ms" for p in PERCENTILES)
+        + f" (n={values['count']})"
+        for stage, values in percentiles.items()
+    )
@@ -0,0 +1,247 @@
+"""
+Per item tracing from the detection in the Loot.Farm page to the buy decision.
+
+Each detected item gets a trace (correlation id) and every stage adds a span to it.
+Sampled traces are queued when they finish and written to a rotating JSONL file by the
+logging listener thread (utils.config_logger side files), never by the event loop.
+
+Summary of the slowest traces (from the repository root):
+    python -m utils.tracing [logs/traces.jsonl] [--top 10]
+"""
+
+import argparse
+import contextvars
+import glob
+import json
+import random
+import time
+import uuid
+
+from utils.config_logger import SIDE_FILES, side_file_logger
+from utils.load_config import load_config
+
+config = load_config("config.json")
+
+# Fração dos itens detectados que são rastreados (0 desliga)
+TRACE_SAMPLE_RATE = config.get("trace_sample_rate", 0.1)
+TRACE_FILE = SIDE_FILES["traces"]
+TRACE_MAX_BYTES = config.get("trace_max_bytes", 5 * 1024 * 1024)
+TRACE_BACKUP_COUNT = 3
+
+_current = contextvars.ContextVar("trace_span", default=None)
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "started_at", "ended_at", "attributes")
+
+    def __init__(self, trace, name: str, parent_id: int = None, started_at: float = None, **attributes):
+        self.trace = trace
+        self.span_id = len(trace.spans)
+        self.parent_id = parent_id
+        self.name = name
+        self.started_at = time.perf_counter() if started_at is None else started_at
+        self.ended_at = None
+        self.attributes = attributes
+        trace.spans.append(self)
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def end(self, ended_at: float = None) -> None:
+        self.ended_at = time.perf_counter() if ended_at is None else ended_at
+
+    def to_dict(self) -> dict:
+        origin = self.trace.started_at
+        ended_at = self.ended_at if self.ended_at is not None else time.perf_counter()
+        return {
+            "id": self.span_id,
+            "parent": self.parent_id,
+            "name": self.name,
+            "start_ms": round((self.started_at - origin) * 1000, 3),
+            "duration_ms": round((ended_at - self.started_at) * 1000, 3),
+            **self.attributes,
+        }
+
+
+class Trace:
+    """A detected item, the root span covers the detection until finish()."""
+
+    def __init__(self, name: str, started_at: float = None, **attributes):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.created_at = time.time()
+        self.started_at = time.perf_counter() if started_at is None else started_at
+        self.spans = []
+        self.root = Span(self, name, started_at=self.started_at, **attributes)
+        self.finished = False
+
+    def add_span(self, name: str, started_at: float, ended_at: float, **attributes) -> Span:
+        """Adds a span measured before the item had a trace (e.g. the batch scan)."""
+        span = Span(self, name, parent_id=self.root.span_id, started_at=started_at, **attributes)
+        span.end(ended_at)
+        return span
+
+    def finish(self, **attributes) -> None:
+        if self.finished:
+            return
+        self.finished = True
+        self.root.set(**attributes)
+        self.root.end()
+        export_trace(self)
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "timestamp": self.created_at,
+            "duration_ms": round((self.root.ended_at - self.started_at) * 1000, 3),
+            "spans": [span.to_dict() for span in self.spans],
+        }
+
+
+def start_trace(name: str, started_at: float = None, **attributes) -> Trace:
+    """
+    Creates the trace of a detected item, or None if the item was not sampled.
+    Pass the returned value to activate_trace / finish_trace, both accept None.
+    """
+    if TRACE_SAMPLE_RATE <= 0 or random.random() >= TRACE_SAMPLE_RATE:
+        return None
+    return Trace(name, started_at=started_at, **attributes)
+
+
+def finish_trace(trace: Trace, **attributes) -> None:
+    if trace is not None:
+        trace.finish(**attributes)
+
+
+class _SpanContext:
+    __slots__ = ("name", "attributes", "span", "token")
+
+    def __init__(self, name, attributes):
+        self.name = name
+        self.attributes = attributes
+        self.span = None
+        self.token = None
+
+    def __enter__(self):
+        parent = _current.get()
+        if parent is not None:
+            self.span = Span(parent.trace, self.name, parent_id=parent.span_id, **self.attributes)
+            self.token = _current.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.span is not None:
+            if exc_type is not None:
+                self.span.set(error=exc_type.__name__)
+            self.span.end()
+            _current.reset(self.token)
+        return False
+
+
+class _ActivateContext:
+    __slots__ = ("trace", "token")
+
+    def __init__(self, trace):
+        self.trace = trace
+        self.token = None
+
+    def __enter__(self):
+        if self.trace is not None:
+            self.token = _current.set(self.trace.root)
+        return self.trace
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.token is not None:
+            _current.reset(self.token)
+        return False
+
+
+def activate_trace(trace: Trace):
+    """Makes the spans created inside the with block children of the trace."""
+    return _ActivateContext(trace)
+
+
+def span(name: str, **attributes):
+    """
+    Context manager that records a span in the active trace (does nothing without one).
+    Yields the Span (or None) so attributes can be added with span.set(...).
+    """
+    return _SpanContext(name, attributes)
+
+
+def annotate(**attributes) -> None:
+    """Adds attributes to the current span, if there is one."""
+    current = _current.get()
+    if current is not None:
+        current.set(**attributes)
+
+
+_trace_log = None
+
+
+def export_trace(trace: Trace) -> None:
+    """Queues the trace line, the listener thread writes and rotates the file."""
+    global _trace_log
+    if _trace_log is None:
+        # criado no primeiro trace, o resumo pela linha de comando não inicia o listener
+        _trace_log = side_file_logger("traces", TRACE_MAX_BYTES, TRACE_BACKUP_COUNT)
+    _trace_log.info(json.dumps(trace.to_dict(), default=str))
+
+
+def load_traces(path: str = TRACE_FILE) -> list:
+    """Reads the traces of the file and of its rotated backups."""
+    traces = []
+    for file_path in sorted(glob.glob(f"{path}*")):
+        with open(file_path) as f:
+            for line in f:
+                try:
+                    traces.append(json.loads(line))
+                except ValueError:
+                    continue
+    return traces
+
+
+def summarize_traces(traces: list, top: int = 10) -> str:
+    """The slowest traces with the time spent in each stage (direct children of the root)."""
+    if not traces:
+        return "No traces found"
+
+    durations = sorted(trace["duration_ms"] for trace in traces)
+    lines = [
+        f"{len(traces)} traces | p50 {durations[len(durations) // 2]:.1f}ms "
+        f"| max {durations[-1]:.1f}ms",
+        "",
+    ]
+    for trace in sorted(traces, key=lambda trace: trace["duration_ms"], reverse=True)[:top]:
+        root = trace["spans"][0]
+        item = root.get("item_name", root["name"])
+        decision = root.get("decision", "-")
+        lines.append(f"{trace['trace_id']}  {trace['duration_ms']:9.1f}ms  {item} ({decision})")
+        for span in trace["spans"][1:]:
+            depth = 1
+            parent = span["parent"]
+            while parent not in (None, 0):
+                depth += 1
+                parent = trace["spans"][parent]["parent"]
+            extra = {
+                key: value
+                for key, value in span.items()
+                if key not in ("id", "parent", "name", "start_ms", "duration_ms")
+            }
+            extra_str = " ".join(f"{key}={value}" for key, value in extra.items())
+            lines.append(
+                f"    {'  ' * (depth - 1)}{span['name']:<{24 - 2 * (depth - 1)}}"
+                f"{span['duration_ms']:9.1f}ms  {extra_str}"
+            )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize the slowest item traces.")
+    parser.add_argument("path", nargs="?", default=TRACE_FILE)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+    print(summarize_traces(load_traces(args.path), args.top))
+
+
+if __name__ == "__main__":
+    main()